@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Near-tie check for fuzzy scene and action names.
+
+With the shipped config.json, "uav" matches uav_patrol_yard and
+uav_return_home equally well, and "home" puts uav_return_home only a hair
+ahead of the two EV charging actions. Neither may fire anything, or be
+scheduled: the answer must ask which one was meant. A clear fuzzy match
+("patrol") and a batch item with a tied name are checked too. Deliveries
+are captured, not sent, and schedules go to a temporary file.
+
+Exits with status 1 when an ambiguous name triggers an event or is scheduled.
+
+Usage:
+    python benchmarks/bench_ambiguous_names.py
+"""
+
+import os
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plugin  # noqa: E402
+from homeflow.config import read_config  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    plugin.install_config(read_config(os.path.join(ROOT, "config.json")))
+    schedules = os.path.join(tempfile.mkdtemp(prefix="homeflow-names-"), "schedules.json")
+    plugin.get_schedules_path = lambda: schedules
+    sent: List[str] = []
+
+    def capture(event_name: str, payload: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        sent.append(event_name)
+        return {"success": True, "message": f"captured {event_name}"}
+
+    plugin.deliver_ifttt_event = capture
+    plugin.get_ifttt_api_key = lambda: "bench-key"
+
+    cases: List[tuple] = [
+        ("action 'uav'", lambda: plugin.run_mobility_action_command({"action": "uav"}), False),
+        ("action 'home'", lambda: plugin.run_mobility_action_command({"action": "home"}), False),
+        ("batch 'uav'", lambda: plugin.run_batch_command({"actions": ["uav"]}), False),
+        ("action 'patrol'", lambda: plugin.run_mobility_action_command({"action": "patrol"}), True),
+        (
+            "schedule 'uav'",
+            lambda: plugin.schedule_action_command({"action": "uav", "every": "1h"}),
+            False,
+        ),
+    ]
+    failures: List[str] = []
+    for label, run, should_fire in cases:
+        del sent[:]
+        result = run()  # type: Dict[str, Any]
+        first = result["message"].splitlines()
+        print(f"{label:>16}: sent {sent or 'nothing'} · {first[-1] if not should_fire else first[0]}")
+        if should_fire and not sent:
+            failures.append(f"{label} should have fired")
+        if not should_fire and (sent or result["success"] or "Did you mean" not in result["message"]):
+            failures.append(f"{label} is ambiguous but did not ask which one was meant")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Half-open circuit breaker check for the IFTTT path.
+
+Trips the breaker for the IFTTT stand-in, waits until it is half-open, then
+ends three calls before anything is sent: one rejected by the rate limiter,
+one whose command deadline has already run out, and one whose transport
+raises an unexpected error. None of them may keep the half-open probe, so
+the call after them must still reach the (now healthy) stand-in.
+
+Exits with status 1 when that last call is rejected as "circuit open".
+
+Usage:
+    python benchmarks/bench_circuit_breaker.py
+"""
+
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plugin  # noqa: E402
+from benchmarks.ifttt_standin import IftttStandIn  # noqa: E402
+from homeflow.config import compile_config  # noqa: E402
+from homeflow.resilience import Deadline, current_deadline  # noqa: E402
+
+RESET_SECONDS = 0.2
+
+
+def install(api_key: str, rate_limit: bool) -> None:
+    plugin.install_config(compile_config({
+        "IFTTT_API_KEY": api_key,
+        "HTTP_TRANSPORT": "http.client",
+        "RETRY": {"MAX_ATTEMPTS": 1},
+        "CIRCUIT_BREAKER": {"FAILURE_THRESHOLD": 1, "RESET_SECONDS": RESET_SECONDS},
+        "RATE_LIMIT": {"ENABLED": rate_limit},
+        "STATE_BUS": {"ENABLED": False},
+    }))
+
+
+def send(deadline: Optional[float] = None) -> Dict[str, Any]:
+    token = current_deadline.set(None if deadline is None else Deadline(deadline))
+    try:
+        return plugin._send_ifttt_event("bench_breaker", {})
+    finally:
+        current_deadline.reset(token)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    failures: List[str] = []
+    with IftttStandIn(error_rate=1.0) as server:
+        plugin.IFTTT_BASE_URL = server.url_template
+        install("bench-key-1", rate_limit=True)
+
+        tripped = send()
+        print(f"tripping call:         {tripped['message'].splitlines()[0]}")
+        time.sleep(RESET_SECONDS * 1.5)
+
+        # Half-open now. A paused limiter and a short deadline: rejected unsent.
+        plugin.get_ifttt_rate_limiter("bench-key-1").penalize(10)
+        limited = send(deadline=0.05)
+        print(f"rate limited:          {limited['message'].splitlines()[0]}")
+        if not limited["message"].startswith("🚦"):
+            failures.append("the half-open call was not stopped by the rate limiter")
+
+        install("bench-key-2", rate_limit=False)
+        expired = send(deadline=0.0)
+        print(f"deadline already gone: {expired['message'].splitlines()[1]}")
+        if "deadline" not in expired["message"]:
+            failures.append("the half-open call was not stopped by the deadline")
+
+        transport = plugin.get_ifttt_transport
+
+        class Broken:
+            def post(self, *args: Any, **kwargs: Any) -> Any:
+                raise RuntimeError("transport blew up")
+
+        plugin.get_ifttt_transport = Broken
+        try:
+            send()
+            failures.append("the transport error was swallowed")
+        except RuntimeError as e:
+            print(f"unexpected error:      {e}")
+        finally:
+            plugin.get_ifttt_transport = transport
+
+        server.error_rate = 0.0
+        server.reset_counters()
+        result = send()
+        print(f"next call:             {result['message'].splitlines()[0]}")
+        if not result["success"] or server.requests != 1:
+            failures.append("the next call was not attempted; the half-open probe leaked")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
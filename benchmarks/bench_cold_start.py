@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cold start check for the per-invocation plugin process.
+
+G-Assist may spawn the plugin once per command, so each of these is paid on
+every call:
+
+- import: time to `import plugin` (from `python -X importtime`, without
+  interpreter startup), and which heavy modules that import pulls in.
+- first response: wall time from spawning `plugin.py` to reading the
+  answer to `list_scenes` on its stdout.
+
+Fails (exit status 1) when either median exceeds its budget, or when
+importing the plugin and listing scenes/actions loaded an HTTP stack,
+sqlite3, the WebSocket client or concurrent.futures.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--runs 7] [--import-budget-ms 120]
+        [--response-budget-ms 400]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN = os.path.join(ROOT, "plugin.py")
+
+HEAVY_MODULES = (
+    "requests", "urllib3", "http.client", "sqlite3", "numpy", "homeflow.websocket",
+    "concurrent.futures",
+)
+
+_LIST_WITHOUT_NETWORK = """
+import json, sys
+import plugin
+plugin.list_scenes_command()
+plugin.list_mobility_actions_command()
+print(json.dumps([name for name in %r if name in sys.modules]))
+""" % (HEAVY_MODULES,)
+
+
+def import_time_ms(module: str) -> float:
+    """
+    Cumulative import time of `module` in a fresh interpreter.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1000
+    raise RuntimeError(f"no import time reported for {module}")
+
+
+def heavy_modules_loaded() -> List[str]:
+    result = subprocess.run(
+        [sys.executable, "-c", _LIST_WITHOUT_NETWORK],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def first_response_ms(args: List[str]) -> float:
+    """
+    Spawn the process, send one list_scenes command and time the answer.
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        args,
+        cwd=ROOT,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    assert process.stdin is not None and process.stdout is not None
+    process.stdin.write(b'{"tool_calls": [{"func": "list_scenes"}]}<<END>>')
+    process.stdin.flush()
+    received = b""
+    while not received.endswith(b"<<END>>"):
+        chunk = process.stdout.read1(65536)
+        if not chunk:
+            raise RuntimeError("plugin exited before answering")
+        received += chunk
+    elapsed = (time.perf_counter() - started) * 1000
+    process.stdin.close()
+    process.wait(timeout=10)
+    return elapsed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Plugin cold start budget check")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--import-budget-ms", type=float, default=120)
+    parser.add_argument("--response-budget-ms", type=float, default=400)
+    args = parser.parse_args(argv)
+
+    imports = [import_time_ms("plugin") for _ in range(args.runs)]
+    baseline = [first_response_ms([sys.executable, "-c", "import sys; sys.stdout.write('<<END>>')"])
+                for _ in range(args.runs)]
+    responses = [first_response_ms([sys.executable, PLUGIN]) for _ in range(args.runs)]
+    loaded = heavy_modules_loaded()
+
+    import_median = statistics.median(imports)
+    response_median = statistics.median(responses)
+    print(f"{'':>22}  {'median':>9}  {'min':>9}  {'budget':>9}")
+    print(f"{'import plugin':>22}  {import_median:>7.1f}ms  {min(imports):>7.1f}ms"
+          f"  {args.import_budget_ms:>7.0f}ms")
+    print(f"{'first response':>22}  {response_median:>7.1f}ms  {min(responses):>7.1f}ms"
+          f"  {args.response_budget_ms:>7.0f}ms")
+    print(f"{'bare interpreter':>22}  {statistics.median(baseline):>7.1f}ms  {min(baseline):>7.1f}ms")
+    print(f"{'(import requests)':>22}  {import_time_ms('requests'):>7.1f}ms")
+    print(f"heavy modules loaded by import + list commands: {', '.join(loaded) or 'none'}")
+
+    failures = []
+    if import_median > args.import_budget_ms:
+        failures.append(f"import plugin took {import_median:.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+    if response_median > args.response_budget_ms:
+        failures.append(
+            f"first response took {response_median:.1f} ms (budget {args.response_budget_ms:.0f} ms)"
+        )
+    if loaded:
+        failures.append(f"listing commands loaded {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+UAV coverage planning time, and what the path cache saves.
+
+Plans a lawnmower route over an irregular yard with keep-out zones, then
+reads the same plan back from the in-memory and on-disk path cache.
+
+Exits with status 1 when the patterns homeflow.config accepts are not the
+ones the planner knows.
+
+Usage:
+    python benchmarks/bench_coverage.py [--corners 40] [--size 200] [--swath 2] [--zones 6]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeflow.config import PATROL_PATTERNS  # noqa: E402
+from homeflow.coverage import PATTERNS, CoverageRequest, PathCache, plan_coverage  # noqa: E402
+
+
+def make_request(corners: int, size: float, swath: float, zones: int, seed: int) -> CoverageRequest:
+    """
+    A star-shaped yard (so it is a simple polygon) with square keep-outs
+    well inside it.
+    """
+    rng = random.Random(seed)
+    yard = []
+    for i in range(corners):
+        angle = 2 * math.pi * i / corners
+        radius = size / 2 * rng.uniform(0.7, 1.0)
+        yard.append((size / 2 + radius * math.cos(angle), size / 2 + radius * math.sin(angle)))
+    keep_out = []
+    for i in range(zones):
+        angle = 2 * math.pi * i / zones
+        cx, cy = size / 2 + size / 4 * math.cos(angle), size / 2 + size / 4 * math.sin(angle)
+        half = size / 30
+        keep_out.append(((cx - half, cy - half), (cx + half, cy - half), (cx + half, cy + half), (cx - half, cy + half)))
+    return CoverageRequest(
+        yard=tuple(yard),
+        home=(size / 2, size / 2),
+        swath_m=swath,
+        range_m=size * 20,
+        keep_out=tuple(keep_out),
+    )
+
+
+def best_of(repeat: int, call: Callable[[], object]) -> Tuple[float, object]:
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="UAV coverage planning and path cache")
+    parser.add_argument("--corners", type=int, default=40)
+    parser.add_argument("--size", type=float, default=200.0)
+    parser.add_argument("--swath", type=float, default=2.0)
+    parser.add_argument("--zones", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    request = make_request(args.corners, args.size, args.swath, args.zones, args.seed)
+    elapsed, plan = best_of(args.repeat, lambda: plan_coverage(request))
+    print(f"{'plan':>20}  {elapsed * 1000:>9.2f} ms")
+    print(
+        f"{'':>20}  {len(plan.waypoints)} waypoints, {len(plan.sorties)} sorties, "  # type: ignore[attr-defined]
+        f"{plan.total_m:,.0f} m at {plan.angle_degrees:g}°"  # type: ignore[attr-defined]
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PathCache(directory)
+        cache.plan(request)
+        elapsed, _ = best_of(args.repeat * 100, lambda: cache.plan(request))
+        print(f"{'cache hit (memory)':>20}  {elapsed * 1e6:>9.2f} us")
+        elapsed, _ = best_of(args.repeat * 10, lambda: PathCache(directory).plan(request))
+        print(f"{'cache hit (disk)':>20}  {elapsed * 1000:>9.2f} ms")
+
+    if PATROL_PATTERNS != PATTERNS:
+        print(f"FAIL: config accepts patterns {PATROL_PATTERNS}, the planner knows {PATTERNS}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Per-invocation latency with and without the HomeFlow daemon.
+
+Spawns `plugin.py` once per command, the way a non-persistent G-Assist
+plugin is run, and times each `run_scene` from process start to its answer
+against the local IFTTT stand-in:
+
+- in-process: every invocation imports, loads the config and opens a new
+  connection to IFTTT itself.
+- daemon: every invocation forwards the frame to a warm `plugin.py --daemon`,
+  which reuses its config snapshot and pooled connection.
+
+Also reports how many TCP connections each path opened to the stand-in.
+
+Usage:
+    python benchmarks/bench_daemon.py [--runs 10]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.ifttt_standin import IftttStandIn  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN = os.path.join(ROOT, "plugin.py")
+COMMAND = b'{"tool_calls": [{"func": "run_scene", "params": {"scene": "study"}}]}<<END>>'
+
+
+def write_config(path: str, address: str, daemon: bool) -> None:
+    config = {
+        "IFTTT_API_KEY": "bench-key",
+        "DEFAULT_TIMEOUT_SECONDS": 5,
+        "CONFIG_RELOAD_SECONDS": 0,
+        # Every run triggers the same event; nothing may be merged or paced.
+        "COALESCING": {"ENABLED": False},
+        "RATE_LIMIT": {"ENABLED": False},
+        "DAEMON": {"ENABLED": daemon, "ADDRESS": address, "AUTOSTART": False},
+        "SCENES": {"study": "aerovolt_study"},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+
+def invoke(env: Dict[str, str]) -> float:
+    """
+    One plugin process, one command; milliseconds until its answer arrived.
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, PLUGIN],
+        cwd=ROOT,
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    assert process.stdin is not None and process.stdout is not None
+    process.stdin.write(COMMAND)
+    process.stdin.flush()
+    received = b""
+    while not received.endswith(b"<<END>>"):
+        chunk = process.stdout.read1(65536)
+        if not chunk:
+            raise RuntimeError("plugin exited before answering")
+        received += chunk
+    elapsed = (time.perf_counter() - started) * 1000
+    process.stdin.close()
+    process.wait(timeout=10)
+    response = json.loads(received[: -len(b"<<END>>")])
+    if not response.get("success"):
+        raise RuntimeError(response.get("message"))
+    return elapsed
+
+
+def wait_for_socket(path: str, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"daemon did not start listening on {path}")
+        time.sleep(0.02)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Daemon vs in-process invocation latency")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if sys.platform == "win32":
+        print("This benchmark uses a Unix domain socket; run it on Linux or macOS.")
+        return 1
+
+    with tempfile.TemporaryDirectory() as workdir, IftttStandIn() as server:
+        address = os.path.join(workdir, "daemon.sock")
+        inproc_config = os.path.join(workdir, "inproc.json")
+        daemon_config = os.path.join(workdir, "daemon.json")
+        write_config(inproc_config, address, daemon=False)
+        write_config(daemon_config, address, daemon=True)
+        base_env = dict(os.environ, IFTTT_BASE_URL=server.url_template)
+
+        results = {}
+        inproc_env = dict(base_env, HOMEFLOW_CONFIG_PATH=inproc_config)
+        results["in-process"] = ([invoke(inproc_env) for _ in range(args.runs)], server.connections)
+
+        daemon_env = dict(base_env, HOMEFLOW_CONFIG_PATH=daemon_config)
+        daemon = subprocess.Popen(
+            [sys.executable, PLUGIN, "--daemon"],
+            cwd=ROOT,
+            env=daemon_env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_socket(address)
+            invoke(daemon_env)  # the daemon's first IFTTT call opens its connection
+            server.reset_counters()
+            results["daemon"] = ([invoke(daemon_env) for _ in range(args.runs)], server.connections)
+        finally:
+            daemon.terminate()
+            daemon.wait(timeout=10)
+
+    print(f"{'path':>11}  {'median':>9}  {'p90':>9}  {'min':>9}  {'connections':>11}")
+    for label, (timings, connections) in results.items():
+        ordered = sorted(timings)
+        p90 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))]
+        print(
+            f"{label:>11}  {statistics.median(ordered):>7.1f}ms  {p90:>7.1f}ms  "
+            f"{ordered[0]:>7.1f}ms  {connections:>11}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
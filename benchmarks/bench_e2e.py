@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+End-to-end benchmark: `plugin.py` as G-Assist runs it, against the local
+IFTTT stand-in.
+
+For each scenario the stand-in is started with that scenario's latency,
+jitter and error/429 rates, and one plugin process is spawned with
+IFTTT_BASE_URL pointing at it. `<<END>>`-framed commands (a mix of
+run_scene, run_mobility_action, trigger_ifttt_event and list_scenes) are
+piped into its stdin:
+
+- latency: one command at a time, timed from writing the frame to reading
+  its response; reported as mean and p50/p95/p99, overall and per function.
+- throughput: a batch of commands written back to back; commands per second
+  until the last response arrived.
+- stages: mean time per stage (frame read, JSON parse, dispatch wait,
+  handler, IFTTT request) from the plugin's own metrics, dumped to a
+  Prometheus file when it exits.
+
+Everything is written to a JSON results file. Pass an earlier file with
+`--compare` to print the changes; with `--max-regression` the run fails
+when any scenario's p95 got worse by more than that percentage.
+
+Usage:
+    python benchmarks/bench_e2e.py [--commands 200] [--scenario local --scenario wan]
+        [--output e2e_results.json] [--compare old.json --max-regression 20]
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.ifttt_standin import IftttStandIn  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN = os.path.join(ROOT, "plugin.py")
+END = b"<<END>>"
+
+# Stand-in settings per scenario: latency/jitter in seconds, rates as fractions.
+SCENARIOS: Dict[str, Dict[str, float]] = {
+    "local": {"latency": 0.0, "jitter": 0.0, "error_rate": 0.0, "throttle_rate": 0.0},
+    "wan": {"latency": 0.08, "jitter": 0.03, "error_rate": 0.0, "throttle_rate": 0.0},
+    "flaky": {"latency": 0.08, "jitter": 0.03, "error_rate": 0.05, "throttle_rate": 0.02},
+}
+
+COMMAND_MIX: List[Tuple[str, Dict[str, Any]]] = [
+    ("run_scene", {"scene": "study"}),
+    ("run_mobility_action", {"action": "start_ev_charging_home"}),
+    ("trigger_ifttt_event", {"event_name": "aerovolt_bench", "value1": "42"}),
+    ("list_scenes", {}),
+]
+
+# Plugin metric families -> stage names in the results.
+STAGES = {
+    "homeflow_frame_read_seconds": "frame_read",
+    "homeflow_parse_seconds": "parse",
+    "homeflow_dispatch_seconds": "dispatch",
+    "homeflow_handler_seconds": "handler",
+    "homeflow_ifttt_request_seconds": "ifttt_request",
+}
+SAMPLE_LINE = re.compile(r"^(?P<name>\w+?)_(?P<kind>sum|count)(?:\{[^}]*\})? (?P<value>\S+)$")
+
+
+def frame(function: str, params: Dict[str, Any]) -> bytes:
+    return json.dumps({"tool_calls": [{"func": function, "params": params}]}).encode() + END
+
+
+def write_config(path: str, metrics_path: str, transport: str) -> None:
+    config = {
+        "IFTTT_API_KEY": "bench-key",
+        "HTTP_TRANSPORT": transport,
+        "CONFIG_RELOAD_SECONDS": 0,
+        # Every command repeats a handful of events; nothing may be merged or paced.
+        "COALESCING": {"ENABLED": False},
+        "RATE_LIMIT": {"ENABLED": False},
+        "RETRY": {"BASE_DELAY_SECONDS": 0.05, "MAX_DELAY_SECONDS": 0.5},
+        "IDEMPOTENT_EVENTS": ["aerovolt_study", "aerovolt_start_ev_charging_home"],
+        "METRICS": {"PROMETHEUS_FILE": metrics_path, "DUMP_INTERVAL_SECONDS": 3600},
+        "SCENES": {"study": "aerovolt_study", "sleep": "aerovolt_sleep"},
+        "MOBILITY_ACTIONS": {"start_ev_charging_home": "aerovolt_start_ev_charging_home"},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+
+class PluginProcess:
+    """
+    One `plugin.py` subprocess, fed frames on stdin and read frame by frame.
+    """
+
+    def __init__(self, env: Dict[str, str]) -> None:
+        self._process = subprocess.Popen(
+            [sys.executable, PLUGIN],
+            cwd=ROOT,
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._buffer = b""
+
+    def send(self, data: bytes) -> None:
+        assert self._process.stdin is not None
+        self._process.stdin.write(data)
+        self._process.stdin.flush()
+
+    def receive(self) -> Dict[str, Any]:
+        assert self._process.stdout is not None
+        while END not in self._buffer:
+            chunk = self._process.stdout.read1(65536)
+            if not chunk:
+                raise RuntimeError("plugin exited before answering")
+            self._buffer += chunk
+        payload, self._buffer = self._buffer.split(END, 1)
+        return json.loads(payload)
+
+    def close(self) -> None:
+        assert self._process.stdin is not None
+        self._process.stdin.close()
+        self._process.wait(timeout=30)
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    ordered = sorted(timings)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 3)
+
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": pick(0.5),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+    }
+
+
+def read_stages(path: str) -> Dict[str, float]:
+    """
+    Mean milliseconds per stage, over all label combinations.
+    """
+    sums: Dict[str, float] = {}
+    counts: Dict[str, float] = {}
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            match = SAMPLE_LINE.match(line.strip())
+            if not match or match.group("name") not in STAGES:
+                continue
+            totals = sums if match.group("kind") == "sum" else counts
+            name = match.group("name")
+            totals[name] = totals.get(name, 0.0) + float(match.group("value"))
+    return {
+        STAGES[name]: round(sums.get(name, 0.0) / count * 1000, 4)
+        for name, count in counts.items()
+        if count
+    }
+
+
+def run_scenario(name: str, settings: Dict[str, float], args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as workdir, IftttStandIn(
+        retry_after=0.1, seed=args.seed, **settings
+    ) as server:
+        config_path = os.path.join(workdir, "config.json")
+        metrics_path = os.path.join(workdir, "metrics.prom")
+        write_config(config_path, metrics_path, args.transport)
+        env = dict(
+            os.environ,
+            IFTTT_BASE_URL=server.url_template,
+            HOMEFLOW_CONFIG_PATH=config_path,
+            # Keep the user's own log file out of it.
+            HOME=workdir,
+            USERPROFILE=workdir,
+        )
+        plugin = PluginProcess(env)
+        try:
+            frames = [frame(function, params) for function, params in COMMAND_MIX]
+            for i in range(len(frames)):  # warm-up: imports, first connection
+                plugin.send(frames[i])
+                plugin.receive()
+
+            by_function: Dict[str, List[float]] = {}
+            failures = 0
+            for i in range(args.commands):
+                function = COMMAND_MIX[i % len(COMMAND_MIX)][0]
+                started = time.perf_counter()
+                plugin.send(frames[i % len(frames)])
+                response = plugin.receive()
+                by_function.setdefault(function, []).append((time.perf_counter() - started) * 1000)
+                failures += not response.get("success")
+
+            batch = b"".join(frames[i % len(frames)] for i in range(args.batch))
+            started = time.perf_counter()
+            # Written from another thread so a full stdout pipe cannot block us.
+            writer = threading.Thread(target=plugin.send, args=(batch,))
+            writer.start()
+            for _ in range(args.batch):
+                failures += not plugin.receive().get("success")
+            elapsed = time.perf_counter() - started
+            writer.join()
+        finally:
+            plugin.close()
+
+        timings = [t for values in by_function.values() for t in values]
+        return {
+            "stand_in": settings,
+            "commands": args.commands + args.batch,
+            "failures": failures,
+            "latency_ms": {
+                "all": summarize(timings),
+                **{function: summarize(values) for function, values in sorted(by_function.items())},
+            },
+            "throughput_per_s": round(args.batch / elapsed, 1),
+            "stages_ms": read_stages(metrics_path),
+            "ifttt_requests": server.requests,
+            "ifttt_connections": server.connections,
+        }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: Optional[float]) -> bool:
+    """
+    Print the change against `baseline`. Returns False if a p95 regressed
+    by more than `max_regression` percent.
+    """
+    ok = True
+    print(f"\nvs {baseline.get('git_commit') or 'baseline'} ({baseline.get('timestamp', '?')}):")
+    for name, current in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        old_p95 = before["latency_ms"]["all"]["p95"]
+        new_p95 = current["latency_ms"]["all"]["p95"]
+        change = (new_p95 - old_p95) / old_p95 * 100 if old_p95 else 0.0
+        throughput = current["throughput_per_s"] - before["throughput_per_s"]
+        regressed = max_regression is not None and change > max_regression
+        ok &= not regressed
+        print(
+            f"{name:>8}  p95 {old_p95:.1f} -> {new_p95:.1f} ms ({change:+.0f}%)  "
+            f"throughput {throughput:+.1f}/s{'  REGRESSION' if regressed else ''}"
+        )
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="End-to-end plugin benchmark")
+    parser.add_argument("--commands", type=int, default=200, help="commands timed one at a time")
+    parser.add_argument("--batch", type=int, default=100, help="commands sent back to back")
+    parser.add_argument(
+        "--scenario", action="append", choices=sorted(SCENARIOS), help="default: all"
+    )
+    parser.add_argument("--transport", default="http.client", choices=["requests", "http.client"])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="e2e_results.json")
+    parser.add_argument("--compare", help="earlier results file")
+    parser.add_argument("--max-regression", type=float, help="allowed p95 increase, in percent")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Any] = {
+        "version": 1,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "transport": args.transport,
+        "scenarios": {},
+    }
+    for name in args.scenario or list(SCENARIOS):
+        results["scenarios"][name] = run_scenario(name, SCENARIOS[name], args)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'scenario':>8}  {'p50':>8}  {'p95':>8}  {'p99':>8}  {'cmd/s':>7}  {'fail':>4}  stages (mean ms)")
+    for name, scenario in results["scenarios"].items():
+        latency = scenario["latency_ms"]["all"]
+        stages = ", ".join(f"{stage} {value:g}" for stage, value in scenario["stages_ms"].items())
+        print(
+            f"{name:>8}  {latency['p50']:>6.1f}ms  {latency['p95']:>6.1f}ms  {latency['p99']:>6.1f}ms  "
+            f"{scenario['throughput_per_s']:>7.1f}  {scenario['failures']:>4}  {stages}"
+        )
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            if not compare(results, json.load(f), args.max_regression):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
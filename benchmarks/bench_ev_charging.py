@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Charge planning time for a fleet behind one meter.
+
+Plans a random fleet (battery sizes, charger rates, SOC and deadlines vary)
+over a day of 15-minute slots under a four-band time-of-use tariff, with
+the NumPy implementation and the pure-Python fallback, and checks both give
+the same plan within the import limit.
+
+Exits with status 1 when either takes longer than `--budget-ms`.
+
+Usage:
+    python benchmarks/bench_ev_charging.py [--vehicles 1000] [--repeat 5] [--budget-ms 500]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeflow.charging import Vehicle, _numpy, plan_charging, tariff_prices  # noqa: E402
+
+TARIFF = ((0, 0.12), (7 * 60, 0.28), (16 * 60, 0.45), (21 * 60, 0.28))
+SLOTS = 96
+
+
+def make_fleet(count: int, seed: int) -> List[Vehicle]:
+    rng = random.Random(seed)
+    return [
+        Vehicle(
+            name=f"ev_{n}",
+            soc=rng.uniform(5, 60),
+            target_soc=rng.uniform(70, 100),
+            capacity_kwh=rng.choice([40, 60, 75, 100]),
+            max_kw=rng.choice([3.7, 7.4, 11.0, 22.0]),
+            deadline_slot=rng.randrange(24, SLOTS + 1),
+        )
+        for n in range(count)
+    ]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="EV fleet charge planning time")
+    parser.add_argument("--vehicles", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=500.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    fleet = make_fleet(args.vehicles, args.seed)
+    prices = tariff_prices(TARIFF, time.time() // 900 * 900, SLOTS)
+    # A shared feeder: roughly a quarter of the fleet can charge at full rate at once.
+    limit = sum(vehicle.max_kw for vehicle in fleet) / 4
+    base_load = [limit * 0.1] * SLOTS
+
+    implementations = [False]
+    if _numpy() is not None:
+        implementations.insert(0, True)
+    else:
+        print("NumPy is not installed; timing the pure-Python planner only")
+
+    plans = {}
+    failed = False
+    for use_numpy in implementations:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            plan = plan_charging(prices, fleet, limit, base_load_kw=base_load, use_numpy=use_numpy)
+            timings.append(time.perf_counter() - started)
+        plans[use_numpy] = plan
+        best = min(timings) * 1000
+        over = best > args.budget_ms
+        failed |= over
+        print(
+            f"{'numpy' if use_numpy else 'python':>8}  {best:>8.1f} ms  "
+            f"cost {plan.total_cost:,.2f} · peak {plan.peak_kw:,.0f}/{limit - base_load[0]:,.0f} kW · "
+            f"short {sum(plan.shortfall_kwh):,.0f} kWh{'  OVER BUDGET' if over else ''}"
+        )
+        if plan.peak_kw > limit - base_load[0] + 1e-6:
+            print("         plan exceeds the import limit")
+            failed = True
+
+    if len(plans) == 2:
+        drift = max(
+            abs(a - b) for rows in zip(plans[True].kw, plans[False].kw) for a, b in zip(*rows)
+        )
+        print(f"max difference between implementations: {drift:.2e} kW")
+        failed |= drift > 1e-6
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Microbenchmark: per-character `<<END>>` reader vs. the buffered FrameReader.
+
+Usage:
+    python benchmarks/bench_framing.py [--repeat N]
+
+Each case builds one `tool_calls` command whose value1 payload pads the frame
+to roughly 1 KB, 64 KB and 1 MB, then times how long each reader takes to
+return it.
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from typing import Callable, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeflow.framing import FrameReader  # noqa: E402
+
+SIZES = [
+    ("1 KB", 1024),
+    ("64 KB", 64 * 1024),
+    ("1 MB", 1024 * 1024),
+]
+
+
+def legacy_read_frame(stream: io.StringIO) -> Optional[str]:
+    """
+    The reader `plugin.read_command` used before FrameReader: one
+    `read(1)` per character and an `endswith` check after every append.
+    """
+    buffer = ""
+    terminator = "<<END>>"
+
+    while True:
+        chunk = stream.read(1)
+        if chunk == "":
+            return buffer if buffer.strip() else None
+        buffer += chunk
+        if buffer.endswith(terminator):
+            return buffer[: -len(terminator)]
+
+
+def build_frame(size: int) -> str:
+    command = {
+        "tool_calls": [
+            {
+                "func": "trigger_ifttt_event",
+                "params": {"event_name": "aerovolt_bench", "value1": ""},
+            }
+        ]
+    }
+    overhead = len(json.dumps(command))
+    command["tool_calls"][0]["params"]["value1"] = "x" * max(0, size - overhead)
+    return json.dumps(command)
+
+
+def time_reader(read: Callable[[], Optional[str]], expected: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frame = read()
+        elapsed = time.perf_counter() - start
+        if frame != expected:
+            raise AssertionError("reader returned a different frame")
+        best = min(best, elapsed)
+    return best
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case (best is kept)")
+    args = parser.parse_args(argv)
+
+    print(f"{'frame':>8}  {'legacy':>12}  {'FrameReader':>12}  {'speedup':>8}")
+    for label, size in SIZES:
+        frame = build_frame(size)
+        wire = frame + "<<END>>"
+        wire_bytes = wire.encode("utf-8")
+
+        legacy = time_reader(
+            lambda: legacy_read_frame(io.StringIO(wire)), frame, args.repeat
+        )
+        buffered = time_reader(
+            lambda: FrameReader(io.BytesIO(wire_bytes)).read_frame(), frame, args.repeat
+        )
+        print(
+            f"{label:>8}  {legacy * 1000:>10.3f}ms  {buffered * 1000:>10.3f}ms  "
+            f"{legacy / buffered:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Home Assistant backend check against the local stand-ins.
+
+Routes one event to the Home Assistant stand-in through BACKENDS and leaves
+another on the IFTTT stand-in, both answering after `--latency-ms`, then:
+
+- fires `--triggers` of each one after the other through the plugin and
+  compares the time per trigger (one persistent WebSocket against pooled
+  HTTP keep-alive);
+- fires `--concurrent` Home Assistant triggers at once, which should take
+  about one round trip on the single connection, not one each;
+- cuts the connection and checks that it comes back by itself and the next
+  trigger succeeds;
+- checks that a refused service call and a wrong token fail cleanly, and
+  that the reload to the wrong token closes the old connection;
+- points the backend at a server that accepts but never answers and, while
+  a prewarm is stuck connecting to it, checks that a trigger with a
+  `--deadline-ms` budget gives up within that budget.
+
+Exits with status 1 when any of these does not hold.
+
+Usage:
+    python benchmarks/bench_home_assistant.py [--triggers 200] [--concurrent 50] [--latency-ms 5]
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plugin  # noqa: E402
+from benchmarks.ha_standin import HomeAssistantStandIn  # noqa: E402
+from benchmarks.ifttt_standin import IftttStandIn  # noqa: E402
+from homeflow.backends import close_connections  # noqa: E402
+from homeflow.config import compile_config  # noqa: E402
+from homeflow.resilience import Deadline, current_deadline  # noqa: E402
+
+HA_EVENT = "bench_ha_event"
+REFUSED_EVENT = "bench_ha_refused"
+IFTTT_EVENT = "bench_ifttt_event"
+
+
+def install(url: str, token: str) -> None:
+    plugin.install_config(compile_config({
+        "IFTTT_API_KEY": "bench-key",
+        "DEFAULT_TIMEOUT_SECONDS": 5,
+        "RATE_LIMIT": {"ENABLED": False},
+        "STATE_BUS": {"ENABLED": False},
+        "BACKENDS": {
+            "bench_ha": {
+                "TYPE": "home_assistant",
+                "URL": url,
+                "TOKEN": token,
+                "TIMEOUT_SECONDS": 5,
+                "EVENTS": {
+                    HA_EVENT: {
+                        "SERVICE": "light.turn_on",
+                        "DATA": {"entity_id": "light.study"},
+                        "VALUES": ["brightness_pct"],
+                    },
+                    REFUSED_EVENT: {"SERVICE": "switch.turn_off", "DATA": {"entity_id": "switch.gone"}},
+                },
+            },
+        },
+    }))
+
+
+def sequential(event: str, triggers: int) -> float:
+    started = time.perf_counter()
+    for i in range(triggers):
+        result = plugin.deliver_ifttt_event(event, {"value1": str(i)})
+        if not result["success"]:
+            raise SystemExit(f"{event} failed: {result['message']}")
+    return (time.perf_counter() - started) / triggers
+
+
+def wait_for(condition: Any, seconds: float = 5) -> bool:
+    deadline = time.monotonic() + seconds
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Home Assistant backend latency and reconnect check")
+    parser.add_argument("--triggers", type=int, default=200)
+    parser.add_argument("--concurrent", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--deadline-ms", type=float, default=500.0)
+    args = parser.parse_args(argv)
+    latency = args.latency_ms / 1000
+    failures: List[str] = []
+
+    with IftttStandIn(latency=latency) as ifttt, HomeAssistantStandIn(
+        latency=latency, failing_services=("switch.turn_off",)
+    ) as ha:
+        plugin.IFTTT_BASE_URL = ifttt.url_template
+        install(ha.url, ha.token)
+        backend = plugin.get_backend(HA_EVENT)
+        connection = backend.connection  # type: ignore[attr-defined]
+
+        plugin.prewarm_backends()
+        ha_seconds = sequential(HA_EVENT, args.triggers)
+        ifttt_seconds = sequential(IFTTT_EVENT, args.triggers)
+        print(f"{'backend':>16}  {'per trigger':>11}  {'connections':>11}")
+        print(f"{'home assistant':>16}  {ha_seconds * 1000:>9.2f}ms  {ha.connections:>11}")
+        print(f"{'ifttt':>16}  {ifttt_seconds * 1000:>9.2f}ms  {ifttt.connections:>11}")
+        if ha.connections != 1:
+            failures.append(f"{ha.connections} WebSocket connections for sequential triggers, expected 1")
+        if ha.calls[-1].get("service_data") != {"entity_id": "light.study", "brightness_pct": str(args.triggers - 1)}:
+            failures.append(f"unexpected service data {ha.calls[-1].get('service_data')}")
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrent) as pool:
+            results: List[Dict[str, Any]] = list(pool.map(
+                lambda i: plugin.deliver_ifttt_event(HA_EVENT, {"value1": str(i)}), range(args.concurrent)
+            ))
+        burst = time.perf_counter() - started
+        ok = sum(1 for result in results if result["success"])
+        print(
+            f"{args.concurrent} concurrent triggers: {burst * 1000:.1f} ms, {ok} ok, "
+            f"{ha.max_in_flight} in flight at the stand-in at once, {ha.connections} connection(s)"
+        )
+        if ok != args.concurrent or ha.connections != 1:
+            failures.append("concurrent triggers did not all succeed on the one connection")
+        if latency and ha.max_in_flight < 2:
+            failures.append("concurrent triggers were not multiplexed")
+
+        dropped = ha.drop_connections()
+        reconnected = wait_for(lambda: ha.connections == 2 and connection.connected)
+        result = plugin.deliver_ifttt_event(HA_EVENT, {})
+        print(
+            f"dropped {dropped} connection(s): reconnected in the background: {reconnected}, "
+            f"next trigger ok: {result['success']}"
+        )
+        if not reconnected or not result["success"]:
+            failures.append(f"no recovery after a dropped connection: {result['message']}")
+
+        refused = plugin.deliver_ifttt_event(REFUSED_EVENT, {})
+        print(f"refused service: {refused['message'].splitlines()[0]}")
+        if refused["success"]:
+            failures.append("a refused service call was reported as a success")
+
+        install(ha.url, "wrong-token")
+        rejected = plugin.deliver_ifttt_event(HA_EVENT, {})
+        print(f"wrong token: {rejected['message'].splitlines()[-1]}")
+        if rejected["success"] or ha.auth_failures != 1:
+            failures.append("a wrong token was not rejected")
+        closed = wait_for(lambda: not connection.connected and len(ha._open) == 0)
+        print(f"old connection closed after the reload: {closed}")
+        if not closed:
+            failures.append("the reload left the old backend's connection open")
+        close_connections()
+
+    # Accepted by the kernel, never answered: the upgrade waits for the
+    # whole connect timeout.
+    with socket.socket() as silent:
+        silent.bind(("127.0.0.1", 0))
+        silent.listen(8)
+        install("ws://127.0.0.1:%d/api/websocket" % silent.getsockname()[1], "bench-token")
+        prewarm = threading.Thread(target=plugin.prewarm_backends, daemon=True)
+        prewarm.start()
+        time.sleep(0.1)
+        budget = args.deadline_ms / 1000
+        token = current_deadline.set(Deadline(budget))
+        started = time.perf_counter()
+        try:
+            stuck = plugin.get_backend(HA_EVENT).trigger(HA_EVENT, {})
+        finally:
+            current_deadline.reset(token)
+        waited = time.perf_counter() - started
+        print(
+            f"unresponsive server: trigger gave up after {waited * 1000:.0f} ms "
+            f"(budget {args.deadline_ms:.0f} ms), sent: {stuck.get('sent')}"
+        )
+        if stuck["success"] or stuck.get("sent") is not False:
+            failures.append("a trigger to an unresponsive server was not reported as unsent")
+        if waited > budget * 1.5:
+            failures.append(f"a trigger waited {waited * 1000:.0f} ms for a connection, past its deadline")
+        close_connections()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Startup check for invalid config.json values.
+
+Loads the shipped config.json and, one value at a time, replaces every leaf
+with something of the wrong type, plus an unknown choice for each enum
+setting (LOGGING.MODE, UAV_PATROL.PATTERN, HTTP_TRANSPORT, ...). Compiled
+the way startup does it, each broken config must still come up with its
+API key, its scenes and its mobility actions; only the bad value (and
+anything that depends on it, such as a macro step using a dropped scene)
+may go.
+
+Exits with status 1 when a single bad value takes more than that down.
+
+Usage:
+    python benchmarks/bench_lenient_config.py
+"""
+
+import copy
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeflow.config import ConfigError, ConfigSnapshot, compile_config, compile_config_leniently  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENUMS = (
+    ("LOGGING", "MODE"),
+    ("UAV_PATROL", "PATTERN"),
+    ("HTTP_TRANSPORT",),
+    ("DELIVERY_MODE",),
+    ("TOOL_CALL_RESPONSE_ORDER",),
+)
+
+# A bad value may take at most this many names with it (itself plus a macro
+# that uses it).
+MAX_LOST_NAMES = 2
+
+
+def _leaves(value: Any, path: Tuple[str, ...] = ()) -> Iterator[Tuple[str, ...]]:
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield from _leaves(child, path + (key,))
+    else:
+        yield path
+
+
+def _with(raw: Dict[str, Any], path: Tuple[str, ...], value: Any) -> Dict[str, Any]:
+    broken = copy.deepcopy(raw)
+    container = broken
+    for key in path[:-1]:
+        container = container.setdefault(key, {})
+    container[path[-1]] = value
+    return broken
+
+
+def _get(raw: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    for key in path:
+        raw = raw[key]
+    return raw
+
+
+def _names(snapshot: ConfigSnapshot) -> int:
+    return len(snapshot.scenes) + len(snapshot.macros) + len(snapshot.mobility_actions)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    with open(os.path.join(ROOT, "config.json"), encoding="utf-8") as f:
+        raw: Dict[str, Any] = json.load(f)
+    raw["IFTTT_API_KEY"] = "bench-key"
+    baseline = compile_config(raw)
+    logging.disable(logging.ERROR)
+
+    cases = [(path, "bogus") for path in ENUMS]
+    for path in _leaves(raw):
+        cases.append((path, ["bogus"] if not isinstance(_get(raw, path), list) else "bogus"))
+
+    failures: List[str] = []
+    for path, value in cases:
+        label = ".".join(path)
+        try:
+            snapshot = compile_config_leniently(_with(raw, path, value))
+        except ConfigError as e:
+            failures.append(f"{label} = {value!r} failed the whole config: {e}")
+            continue
+        lost = _names(baseline) - _names(snapshot)
+        if path in ENUMS:
+            print(f"{label:>26} = {value!r}: {_names(snapshot)} of {_names(baseline)} names kept")
+        if path != ("IFTTT_API_KEY",) and snapshot.ifttt_api_key != baseline.ifttt_api_key:
+            failures.append(f"{label} = {value!r} lost the API key")
+        elif lost > MAX_LOST_NAMES:
+            failures.append(f"{label} = {value!r} lost {lost} scenes and actions")
+    print(f"{len(cases)} broken values checked, {len(failures)} took down more than themselves")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
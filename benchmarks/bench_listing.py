@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cost of the listing and initialize answers with a large generated inventory.
+
+Compiles a config with `--names` scenes and as many mobility actions, then
+times list_scenes, list_mobility_actions and initialize, each encoded the
+way it goes to stdout. The first call after a config (re)load renders and
+encodes the answer; the calls after it write the cached frame. A filtered
+listing is timed too: it is rendered on every call from the cached entries.
+
+Usage:
+    python benchmarks/bench_listing.py [--names 5000] [--calls 1000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plugin  # noqa: E402
+from benchmarks.bench_nameindex import generate_names  # noqa: E402
+from homeflow.config import compile_config  # noqa: E402
+
+RAW: Dict[str, Any] = {}
+
+
+def timed(label: str, calls: int, call: Callable[[], Dict[str, Any]]) -> None:
+    # A fresh snapshot, as after a config reload: nothing is cached for it yet.
+    plugin.install_config(compile_config(RAW))
+    started = time.perf_counter()
+    first = plugin.encode_response(call())
+    cold = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        plugin.encode_response(call())
+    warm = (time.perf_counter() - started) / calls
+    print(f"{label:>28}  first {cold * 1000:>7.2f} ms  then {warm * 1e6:>8.2f} us/call  {len(first):>7} bytes")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Listing and initialize response cost")
+    parser.add_argument("--names", type=int, default=5000)
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    names = generate_names(args.names)
+    RAW.update({
+        "IFTTT_API_KEY": "bench",
+        "SCENES": names,
+        "MOBILITY_ACTIONS": {f"{name}_action": event for name, event in names.items()},
+    })
+    # initialize also prewarms the IFTTT connection on a thread; point it nowhere.
+    plugin.get_ifttt_transport = lambda: type("Idle", (), {"prewarm": lambda self, url: None})()
+
+    timed("list_scenes", args.calls, lambda: plugin.list_scenes_command({}))
+    timed("list_scenes page 7", args.calls, lambda: plugin.list_scenes_command({"page": 7}))
+    timed("list_mobility_actions", args.calls, lambda: plugin.list_mobility_actions_command({}))
+    timed("list_scenes filter=lamp_2", args.calls, lambda: plugin.list_scenes_command({"filter": "lamp_2"}))
+    timed("initialize", args.calls, lambda: plugin.initialize_command({}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Per-command logging overhead: the original synchronous file logging next to
+the queue-based mode.
+
+Each simulated command goes through `plugin.parse_command` and
+`plugin.write_response` (stdout is discarded). Both log their payload, as the
+main loop does for every command. The G-Assist context is made a few KB long,
+like a real conversation. Commands are spaced `--interval-ms` apart, as real
+traffic is. Each one is run twice back to back, once with logging disabled
+and once with it enabled (alternating which goes first), and each run is
+timed on its own. Reported per mode:
+
+- without / with: p50 and p99 of the time spent on the command's own thread
+  with logging disabled and enabled.
+- overhead: mean, p50 and p99 of the per-command difference (with minus
+  without). A difference of two separate p99s could come out negative; the
+  p99 of the paired differences cannot hide the cost that way.
+- drain: time `flush_logging()` then needed to get the rest onto disk.
+- log bytes: size of the log file afterwards (truncation and sampling).
+
+"old" is the original setup: synchronous writes of untruncated payloads.
+
+Usage:
+    python benchmarks/bench_logging.py [--commands 2000] [--interval-ms 1]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plugin  # noqa: E402
+from homeflow.config import compile_config  # noqa: E402
+from homeflow.logs import flush_logging  # noqa: E402
+
+MODES = {
+    "old": {"MODE": "sync", "MAX_PAYLOAD_CHARS": 0},
+    "sync": {"MODE": "sync"},
+    "queue": {"MODE": "queue"},
+    "queue+sample": {"MODE": "queue", "SAMPLE_EVERY": 10},
+}
+
+
+def make_frame() -> str:
+    messages = [
+        {"role": "user" if i % 2 else "assistant", "content": "Turn on the study scene please. " * 6}
+        for i in range(20)
+    ]
+    return json.dumps({
+        "tool_calls": [{"func": "run_scene", "params": {"scene": "study"}}],
+        "context": messages,
+        "system_info": "GPU: RTX 4090 · Driver 560.94 · Windows 11",
+    })
+
+
+def run(commands: int, frame: str, interval: float) -> Tuple[List[float], List[float]]:
+    """
+    Per-command times with logging disabled and enabled, pairwise.
+    """
+    response = {"success": True, "message": "✅ Triggered IFTTT event **aerovolt_study**.\nHTTP status: 200"}
+    without: List[float] = []
+    with_logging: List[float] = []
+    for n in range(commands):
+        for enabled in (n % 2 == 0, n % 2 == 1):
+            logging.disable(logging.NOTSET if enabled else logging.CRITICAL)
+            started = time.perf_counter()
+            plugin.parse_command(frame)
+            plugin.write_response(response)
+            (with_logging if enabled else without).append(time.perf_counter() - started)
+        time.sleep(interval)
+    logging.disable(logging.NOTSET)
+    return without, with_logging
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Logging overhead per command")
+    parser.add_argument("--commands", type=int, default=2000)
+    parser.add_argument("--interval-ms", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    frame = make_frame()
+    stdout, stderr = sys.stdout, sys.stderr
+    rows = []
+    # The last log file is still open when the directory is removed.
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as workdir, open(os.devnull, "w", encoding="utf-8") as devnull:
+        for label, settings in MODES.items():
+            plugin.LOG_FILE_PATH = os.path.join(workdir, f"{label}.log")
+            plugin.install_config(compile_config({"LOGGING": settings}))
+            sys.stdout = sys.stderr = devnull
+            try:
+                plugin.setup_logging(plugin.get_config().logging)
+                interval = args.interval_ms / 1000
+                run(min(200, args.commands), frame, interval)  # warm-up
+                without, with_logging = run(args.commands, frame, interval)
+                started = time.perf_counter()
+                flush_logging()
+                drain = time.perf_counter() - started
+            finally:
+                sys.stdout, sys.stderr = stdout, stderr
+            rows.append((label, without, with_logging, drain, os.path.getsize(plugin.LOG_FILE_PATH)))
+
+    print(f"{len(frame)} byte frames, {args.commands} commands, times in us")
+    print(
+        f"{'':>14}  {'without':>15}  {'with':>15}  {'overhead':>23}\n"
+        f"{'mode':>14}  {'p50':>7} {'p99':>7}  {'p50':>7} {'p99':>7}  {'mean':>7} {'p50':>7} {'p99':>7}"
+        f"  {'drain':>9}  {'log bytes':>11}"
+    )
+    for label, without, with_logging, drain, size in rows:
+        overhead = [b - a for a, b in zip(without, with_logging)]
+        columns = [
+            percentile(without, 0.5), percentile(without, 0.99),
+            percentile(with_logging, 0.5), percentile(with_logging, 0.99),
+            sum(overhead) / len(overhead), percentile(overhead, 0.5), percentile(overhead, 0.99),
+        ]
+        us = [f"{value * 1e6:>7.1f}" for value in columns]
+        print(
+            f"{label:>14}  {us[0]} {us[1]}  {us[2]} {us[3]}  {us[4]} {us[5]} {us[6]}"
+            f"  {drain * 1000:>7.1f}ms  {size:>11,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cost of recording a metric, and of rendering the Prometheus text file.
+
+Times the calls the plugin makes on its hot paths: an unlabelled histogram
+observation (frame reads), a labelled one (handlers, IFTTT requests) and a
+labelled counter increment. Rendering is timed for a registry holding as
+many series as a busy plugin would.
+
+Exits with status 1 when a recording call costs more than `--budget-us`.
+
+Usage:
+    python benchmarks/bench_metrics.py [--ops 200000] [--budget-us 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Callable, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeflow.metrics import MetricsRegistry  # noqa: E402
+
+
+def per_op(ops: int, call: Callable[[int], None]) -> float:
+    """
+    Microseconds per call, with the cost of the empty loop taken out.
+    """
+    started = time.perf_counter()
+    for i in range(ops):
+        pass
+    empty = time.perf_counter() - started
+    started = time.perf_counter()
+    for i in range(ops):
+        call(i)
+    return (time.perf_counter() - started - empty) / ops * 1e6
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Metrics recording overhead")
+    parser.add_argument("--ops", type=int, default=200_000)
+    parser.add_argument("--budget-us", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    registry = MetricsRegistry()
+    frames = registry.histogram("frame_read_seconds", "bench")
+    handlers = registry.histogram("handler_seconds", "bench", ("function", "outcome"))
+    rejected = registry.counter("rejected_total", "bench", ("event", "reason"))
+    functions = ["run_scene", "list_scenes", "run_mobility_action", "trigger_ifttt_event"]
+
+    results = {
+        "observe (no labels)": per_op(args.ops, lambda i: frames.observe(0.0004)),
+        "observe (2 labels)": per_op(
+            args.ops, lambda i: handlers.labels(functions[i & 3], "success").observe(0.012)
+        ),
+        "counter inc (2 labels)": per_op(
+            args.ops, lambda i: rejected.labels("aerovolt_study", "rate_limited").inc()
+        ),
+    }
+
+    for function in functions:
+        for outcome in ("success", "failure", "error"):
+            handlers.labels(function, outcome).observe(0.01)
+    events = registry.histogram("ifttt_seconds", "bench", ("event", "outcome"))
+    for n in range(50):
+        events.labels(f"aerovolt_event_{n}", "ok").observe(0.2)
+    renders = 200
+    started = time.perf_counter()
+    for _ in range(renders):
+        text = registry.render_prometheus()
+    render_ms = (time.perf_counter() - started) / renders * 1000
+
+    failed = False
+    for label, micros in results.items():
+        over = micros > args.budget_us
+        failed |= over
+        print(f"{label:>24}  {micros:>6.2f} us{'  OVER BUDGET' if over else ''}")
+    print(f"{'render':>24}  {render_ms:>6.2f} ms  ({text.count(chr(10))} lines)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Lookup latency of the scene/action NameIndex with 10k generated names.
+
+Names look like the ones generated from a home inventory
+("garage_ev_2_start_charging", "kitchen_lights_dim"). Reports the index build
+time and the mean/p99 lookup time for exact, spoken ("kitchen lights dim"),
+partial and misspelled queries, next to the old linear substring scan, and
+how many misspelled queries resolve to the intended name.
+
+Usage:
+    python benchmarks/bench_nameindex.py [--names 10000]
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeflow.nameindex import NameIndex, classify_mobility_action  # noqa: E402
+
+ROOMS = [
+    "kitchen", "living_room", "bedroom", "guest_room", "study", "garage", "porch",
+    "backyard", "hallway", "basement", "attic", "office", "nursery", "laundry",
+    "patio", "pool", "gym", "cinema", "pantry", "driveway",
+]
+DEVICES = [
+    "lights", "lamp", "ac", "heater", "fan", "blinds", "plug", "speaker", "tv",
+    "ev", "charger", "drone", "uav", "camera", "sprinkler", "lock", "vacuum",
+    "purifier", "humidifier", "doorbell",
+]
+ACTIONS = [
+    "on", "off", "dim", "bright", "open", "close", "start_charging",
+    "stop_charging", "patrol", "return_home", "schedule", "boost", "eco",
+    "night", "away", "morning", "evening", "lock", "unlock", "status",
+]
+
+
+def generate_names(count: int) -> Dict[str, str]:
+    names: Dict[str, str] = {}
+    for room, device, action, unit in itertools.product(ROOMS, DEVICES, ACTIONS, range(1, 100)):
+        name = f"{room}_{device}_{unit}_{action}" if unit > 1 else f"{room}_{device}_{action}"
+        names[name] = f"aerovolt_{name}"
+        if len(names) >= count:
+            break
+    return names
+
+
+def linear_lookup(entries: Dict[str, str], query: str) -> Optional[str]:
+    """
+    The lookup run_scene_command used before the index: exact get, then the
+    first key in dict order that contains (or is contained in) the query.
+    """
+    key = query.strip().lower()
+    if key in entries:
+        return key
+    for name in entries:
+        if key in name.lower() or name.lower() in key:
+            return name
+    return None
+
+
+def measure(func: Callable[[str], object], queries: List[str]) -> List[float]:
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        func(query)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def summarize(timings: List[float]) -> str:
+    ordered = sorted(timings)
+    mean = sum(ordered) / len(ordered)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"{mean * 1e6:>9.1f}us  {p99 * 1e6:>9.1f}us"
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    chars = list(name.replace("_", " "))
+    pos = rng.randrange(len(chars))
+    if chars[pos] == " ":
+        pos = max(0, pos - 1)
+    del chars[pos]
+    return "".join(chars)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="NameIndex lookup benchmark")
+    parser.add_argument("--names", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(42)
+    entries = generate_names(args.names)
+    started = time.perf_counter()
+    index = NameIndex(entries, classify_mobility_action)
+    build = time.perf_counter() - started
+    print(f"{len(index)} names, index built in {build * 1000:.1f} ms")
+
+    sample = rng.sample(list(entries), args.queries)
+    cases = {
+        "exact": sample,
+        "spoken": [name.replace("_", " ").title() for name in sample],
+        "partial": [" ".join(name.split("_")[:3]) for name in sample],
+        "misspelled": [misspell(name, rng) for name in sample],
+    }
+
+    print(f"{'query':>11}  {'index mean':>11}  {'index p99':>11}  {'linear mean':>11}  {'linear p99':>11}")
+    for label, queries in cases.items():
+        indexed = measure(index.lookup, queries)
+        linear = measure(lambda q: linear_lookup(entries, q), queries)
+        print(f"{label:>11}  {summarize(indexed)}  {summarize(linear)}")
+
+    hits = taken = 0
+    for name, query in zip(sample, cases["misspelled"]):
+        best = index.best(query)
+        if best is not None and best.name == name:
+            hits += 1
+        elif best is not None and best.score == 1.0:
+            taken += 1  # "kitchen_ac_53_on" minus a 3 is kitchen_ac_5_on
+    print(
+        f"misspelled queries resolved to the intended name: {hits}/{len(sample)} "
+        f"({taken} spell another name exactly)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Retry and retention check for the outbox.
+
+Queues events in a temporary outbox and flushes it by hand against the IFTTT
+stand-in:
+
+- a non-idempotent event answered with a 500 (it may have run) must be
+  marked failed after that one attempt, not sent again;
+- the same event listed in IDEMPOTENT_EVENTS stays pending for a retry;
+- a non-idempotent event whose connection is refused (it certainly did not
+  go out) stays pending for a retry;
+- finished rows past the retention period are pruned, pending ones kept,
+  and the recent-deliveries query uses an index.
+
+Exits with status 1 when any of these does not hold.
+
+Usage:
+    python benchmarks/bench_outbox.py
+"""
+
+import logging
+import os
+import socket
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plugin  # noqa: E402
+from benchmarks.ifttt_standin import IftttStandIn  # noqa: E402
+from homeflow.config import compile_config  # noqa: E402
+from homeflow.outbox import DELIVERED, FAILED, PENDING, Outbox, OutboxFlusher  # noqa: E402
+
+IDEMPOTENT_EVENT = "bench_lights_off"
+UNSAFE_EVENT = "bench_open_garage"
+
+
+def install() -> None:
+    plugin.install_config(compile_config({
+        "IFTTT_API_KEY": "bench-key",
+        "HTTP_TRANSPORT": "http.client",
+        "RETRY": {"MAX_ATTEMPTS": 1},
+        "CIRCUIT_BREAKER": {"FAILURE_THRESHOLD": 100},
+        "RATE_LIMIT": {"ENABLED": False},
+        "STATE_BUS": {"ENABLED": False},
+        "IDEMPOTENT_EVENTS": [IDEMPOTENT_EVENT],
+    }))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.disable(logging.ERROR)
+    install()
+    failures: List[str] = []
+    with tempfile.TemporaryDirectory() as workdir, IftttStandIn(error_rate=1.0) as server:
+        outbox = Outbox(os.path.join(workdir, "outbox.db"))
+        flusher = OutboxFlusher(outbox, plugin._deliver_from_outbox, max_attempts=5)
+
+        cases = [
+            ("500, not idempotent", server.url_template, UNSAFE_EVENT, FAILED, 1),
+            ("500, idempotent", server.url_template, IDEMPOTENT_EVENT, PENDING, 1),
+            (
+                "refused, not idempotent",
+                f"http://127.0.0.1:{free_port()}/trigger/{{event_name}}/with/key/{{api_key}}",
+                UNSAFE_EVENT, PENDING, 0,
+            ),
+        ]
+        for label, url, event, expected, requests in cases:
+            plugin.IFTTT_BASE_URL = url
+            server.reset_counters()
+            delivery_id = outbox.enqueue(event, {})
+            flusher.flush_once()
+            delivery = outbox.get(delivery_id)
+            assert delivery is not None
+            seen = server.requests + server.errors
+            print(f"{label:>24}: {delivery.status} after {seen} request(s)")
+            if delivery.status != expected or seen != requests:
+                failures.append(f"{label}: {delivery.status} after {seen} request(s), expected {expected}")
+            # Out of the way of the next case.
+            outbox.record([(delivery_id, FAILED, delivery.attempts, time.time(), None)])
+
+        old = time.time() - 30 * 86400
+        kept_id = outbox.enqueue(UNSAFE_EVENT, {})
+        for delivery_id in [outbox.enqueue(UNSAFE_EVENT, {}) for _ in range(3)] + [kept_id]:
+            status = PENDING if delivery_id == kept_id else DELIVERED
+            outbox.record([(delivery_id, status, 1, time.time(), None)])
+        with outbox._lock:
+            outbox._db.execute("UPDATE deliveries SET created_at = ?", (old,))
+            plan = outbox._db.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM deliveries ORDER BY created_at DESC LIMIT 5"
+            ).fetchall()
+        deleted = outbox.prune(time.time() - 7 * 86400)
+        print(f"pruned {deleted} finished rows, {outbox.counts()} left; recent() plan: {plan[0][-1]}")
+        if deleted != 6 or outbox.counts() != {PENDING: 1}:
+            failures.append("pruning did not drop exactly the old finished rows")
+        if "deliveries_created" not in plan[0][-1]:
+            failures.append("recent() scans the whole table")
+        outbox.close()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
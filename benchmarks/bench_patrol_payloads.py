@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Patrol route check for every path that runs the UAV patrol action.
+
+Loads the shipped config.json (with the macro delays cut to zero) and runs
+the patrol action four ways: the run_mobility_action command, the
+`leave_home` macro's `patrol` step, a run_batch ACTION item and a scheduled
+job. Deliveries are captured instead of sent. Each patrol trigger must carry
+the planned route (waypoints in value1, length in value2, plan key in
+value3) just like the command does.
+
+Exits with status 1 when any path sends the patrol without its route.
+
+Usage:
+    python benchmarks/bench_patrol_payloads.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plugin  # noqa: E402
+from homeflow.config import compile_config  # noqa: E402
+from homeflow.scheduler import Job  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    with open(os.path.join(ROOT, "config.json"), encoding="utf-8") as f:
+        raw: Dict[str, Any] = json.load(f)
+    for step in raw["SCENES"]["leave_home"]["STEPS"].values():
+        step.pop("DELAY_SECONDS", None)
+    cache_dir = tempfile.mkdtemp(prefix="homeflow-paths-")
+    raw["UAV_PATROL"]["CACHE_DIR"] = cache_dir
+    raw.update({
+        "IFTTT_API_KEY": "bench-key",
+        "DELIVERY_MODE": "sync",
+        "COALESCING": {"ENABLED": False},
+        "STATE_BUS": {"ENABLED": False},
+    })
+    plugin.install_config(compile_config(raw))
+    patrol_event = raw["MOBILITY_ACTIONS"][raw["UAV_PATROL"]["ACTION"]]
+
+    sent: List[Tuple[str, Dict[str, Optional[str]]]] = []
+
+    def capture(event_name: str, payload: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        sent.append((event_name, dict(payload)))
+        return {"success": True, "message": f"captured {event_name}"}
+
+    plugin.deliver_ifttt_event = capture
+    job = Job("bench", "action", "uav_patrol_yard", None, 0.0, 0.0)  # type: ignore[arg-type]
+    runs = {
+        "command": lambda: plugin.run_mobility_action_command({"action": "uav_patrol_yard"}),
+        "macro step": lambda: plugin.run_scene_command({"scene": "leave_home"}),
+        "batch item": lambda: plugin.run_batch_command({"actions": ["uav_patrol_yard"]}),
+        "scheduled job": lambda: plugin._run_scheduled_job(job),
+    }
+
+    failures: List[str] = []
+    for label, run in runs.items():
+        del sent[:]
+        result = run()
+        patrols = [payload for event, payload in sent if event == patrol_event]
+        routed = bool(patrols) and all(
+            payload.get("value1") and payload.get("value2") and payload.get("value3")
+            for payload in patrols
+        )
+        detail = patrols[0].get("value3") if routed else patrols
+        print(f"{label:>14}: success {result['success']}, patrol route: {detail}")
+        if not routed:
+            failures.append(f"{label} sent the patrol without its route")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Burst check for the client-side IFTTT rate limiter.
+
+Starts the IFTTT stand-in with a per-key token bucket, configures the plugin
+with the same limit and fires 5x the allowed burst at once from parallel
+threads. Every trigger must succeed and the stand-in must not have rejected a
+single request; exits non-zero otherwise.
+
+Usage:
+    python benchmarks/bench_rate_limit.py [--rate 20] [--burst 10] [--factor 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plugin  # noqa: E402
+from benchmarks.ifttt_standin import IftttStandIn  # noqa: E402
+from homeflow.config import compile_config  # noqa: E402
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rate limiter burst check")
+    parser.add_argument("--rate", type=float, default=20, help="allowed requests/s per key")
+    parser.add_argument("--burst", type=int, default=10, help="allowed burst per key")
+    parser.add_argument("--factor", type=int, default=5, help="burst multiple to send")
+    args = parser.parse_args(argv)
+
+    total = args.burst * args.factor
+    with IftttStandIn(rate_limit=args.rate, burst=args.burst) as server:
+        plugin.IFTTT_BASE_URL = server.url_template
+        plugin.install_config(compile_config({
+            "IFTTT_API_KEY": "bench-key",
+            "DEFAULT_TIMEOUT_SECONDS": 5,
+            "HTTP_POOL_SIZE": 8,
+            "RATE_LIMIT": {
+                "ENABLED": True,
+                "REQUESTS_PER_SECOND": args.rate,
+                # One token of headroom absorbs arrival jitter between the
+                # client's bucket and the server's.
+                "BURST": max(1, args.burst - 1),
+                "MAX_QUEUE": total,
+            },
+        }))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=total) as pool:
+            # Distinct values so the coalescing layer does not merge them.
+            results = list(
+                pool.map(lambda i: plugin.call_ifttt_event("bench_burst", value1=str(i)), range(total))
+            )
+        elapsed = time.perf_counter() - started
+
+    failed = [r["message"] for r in results if not r["success"]]
+    ideal = max(0.0, (total - args.burst) / args.rate)
+    print(f"sent {total} triggers (burst {args.burst}, {args.rate:g}/s) in {elapsed:.2f}s "
+          f"(ideal {ideal:.2f}s)")
+    print(f"succeeded: {total - len(failed)}  failed: {len(failed)}  "
+          f"rejected by server (429): {server.rejected}")
+
+    if failed or server.rejected:
+        print("FAIL")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Scheduler cost with many jobs: add, cancel, find the next due job, pop due
+jobs, list the upcoming ones, and reload everything from SQLite.
+
+Runs against a fake clock, so nothing is actually triggered and the timings
+are the data structure and storage alone. Jobs are a mix of one-shot,
+interval and cron schedules spread over a week.
+
+Exits with status 1 when `upcoming` does not list the jobs due soonest, in
+order.
+
+Usage:
+    python benchmarks/bench_scheduler.py [--jobs 100000] [--cancel 10000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeflow.scheduler import Cron, Interval, JobStore, OneShot, Scheduler, Trigger  # noqa: E402
+
+WEEK = 7 * 86400
+
+
+def make_triggers(count: int, now: float, seed: int) -> List[Trigger]:
+    rng = random.Random(seed)
+    triggers: List[Trigger] = []
+    for n in range(count):
+        offset = rng.uniform(1, WEEK)
+        if n % 10 == 0:
+            triggers.append(Cron(f"{rng.randrange(60)} {rng.randrange(24)} * * *"))
+        elif n % 3 == 0:
+            triggers.append(Interval(rng.choice([900, 3600, 7200, 86400]), now + offset))
+        else:
+            triggers.append(OneShot(now + offset))
+    return triggers
+
+
+def timed(label: str, ops: int, call: Callable[[], object]) -> object:
+    started = time.perf_counter()
+    result = call()
+    elapsed = time.perf_counter() - started
+    per_op = f"{elapsed / ops * 1e6:>8.2f} us/op" if ops else ""
+    print(f"{label:>28}  {elapsed * 1000:>9.1f} ms  {per_op}")
+    return result
+
+
+def run(jobs: int, cancel: int, store: Optional[JobStore], seed: int) -> List[str]:
+    now = [1_800_000_000.0]
+    scheduler = Scheduler(lambda job: {"success": True}, store=store, clock=lambda: now[0])
+    triggers = make_triggers(jobs, now[0], seed)
+
+    added = timed(
+        f"add {jobs}", jobs,
+        lambda: [scheduler.add("scene", f"scene_{n % 50}", trigger) for n, trigger in enumerate(triggers)],
+    )
+    job_ids = [job.job_id for job in added]  # type: ignore[attr-defined]
+    random.Random(seed).shuffle(job_ids)
+    timed(f"cancel {cancel}", cancel, lambda: [scheduler.cancel(job_id) for job_id in job_ids[:cancel]])
+    timed("next_run_at", 1, scheduler.next_run_at)
+    upcoming = timed("upcoming(20)", 1, lambda: scheduler.upcoming(20))
+    failures: List[str] = []
+    soonest = sorted(job.next_run for job in scheduler._jobs.values())[:20]
+    listed = [job for job in upcoming if scheduler.get(job.job_id) == job]  # type: ignore[attr-defined]
+    if [job.next_run for job in listed] != soonest or len(listed) != len(soonest):
+        failures.append("upcoming(20) did not list the 20 jobs due soonest, in order")
+
+    if store is not None:
+        timed(f"reload {len(scheduler)}", len(scheduler), lambda: Scheduler(lambda job: {}, store=store))
+
+    # Walk the clock through the first day an hour at a time.
+    def drain() -> int:
+        popped = 0
+        for _ in range(24):
+            now[0] += 3600
+            due, missed = scheduler.pop_due(now[0])
+            popped += len(due) + len(missed)
+        return popped
+
+    started = time.perf_counter()
+    popped = drain()
+    elapsed = time.perf_counter() - started
+    print(f"{f'pop_due x24 ({popped} runs)':>28}  {elapsed * 1000:>9.1f} ms  {elapsed / max(popped, 1) * 1e6:>8.2f} us/op")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Scheduler throughput with many jobs")
+    parser.add_argument("--jobs", type=int, default=100_000)
+    parser.add_argument("--cancel", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    print("in memory:")
+    failures = run(args.jobs, args.cancel, None, args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        store = JobStore(os.path.join(directory, "schedules.db"))
+        print("with SQLite store:")
+        try:
+            failures += run(args.jobs, args.cancel, store, args.seed)
+        finally:
+            store.close()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Headless simulation speed with many agents.
+
+Steps `--agents` EVs and `--agents` drones on a 20-waypoint patrol path: all
+EVs charge, every drone patrols, and every tenth one is sent home halfway
+through. Reports the time per step and how many times faster than real time
+the run was, with the NumPy implementation and the pure-Python fallback, and
+checks both end in the same state.
+
+Exits with status 1 when the NumPy run (or the Python one without NumPy) is
+not at least `--min-speedup` times faster than real time.
+
+Usage:
+    python benchmarks/bench_simulation.py [--agents 10000] [--seconds 60] [--python-seconds 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeflow.simulation import Simulation, _numpy  # noqa: E402
+
+
+def make_path(seed: int) -> List[tuple]:
+    rng = random.Random(seed)
+    return [(rng.uniform(0, 300), rng.uniform(0, 200)) for _ in range(20)]
+
+
+def simulate(agents: int, seconds: float, path: List[tuple], use_numpy: bool) -> Simulation:
+    sim = Simulation(evs=agents, drones=agents, path=path, use_numpy=use_numpy)
+    sim.start_charging()
+    sim.start_patrol()
+    sim.run(seconds / 2)
+    for index in range(0, agents, 10):
+        sim.return_home(index)
+    sim.run(seconds / 2)
+    return sim
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Headless EV/UAV simulation speed")
+    parser.add_argument("--agents", type=int, default=10_000, help="EVs, and as many drones")
+    parser.add_argument("--seconds", type=float, default=60.0, help="simulated time for NumPy")
+    parser.add_argument("--python-seconds", type=float, default=5.0, help="simulated time for the fallback")
+    parser.add_argument("--min-speedup", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    path = make_path(args.seed)
+    runs = [(False, args.python_seconds)]
+    if _numpy() is not None:
+        runs.insert(0, (True, args.seconds))
+    else:
+        print("NumPy is not installed; timing the pure-Python simulation only")
+
+    failed = False
+    for use_numpy, seconds in runs:
+        started = time.perf_counter()
+        sim = simulate(args.agents, seconds, path, use_numpy)
+        elapsed = time.perf_counter() - started
+        speedup = seconds / elapsed
+        checked = use_numpy or len(runs) == 1
+        over = checked and speedup < args.min_speedup
+        failed |= over
+        print(
+            f"{'numpy' if use_numpy else 'python':>8}  {sim.steps} steps  "
+            f"{elapsed / sim.steps * 1000:>7.3f} ms/step  {speedup:>8.1f}x real time"
+            f"{'  TOO SLOW' if over else ''}"
+        )
+
+    if len(runs) == 2:
+        # Same scenario over the fallback's (shorter) duration.
+        short = args.python_seconds
+        numpy_state = simulate(args.agents, short, path, True).snapshot()
+        python_state = simulate(args.agents, short, path, False).snapshot()
+        drift = max(
+            abs(a - b) for got, want in zip(numpy_state, python_state) for a, b in zip(got, want)
+        )
+        print(f"max difference between implementations: {drift:.2e}")
+        failed |= drift > 1e-6
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+State bus cost on the publishing side, and what subscribers see.
+
+Publishes `--messages` command-sized messages in a tight loop three times:
+with nobody listening, with a subscriber draining on its own thread, and with
+a stalled subscriber that never reads. The time per publish should be about
+the same in all three, since a slow subscriber must not hold the plugin up.
+The stalled one should lose messages instead.
+
+Exits with status 1 when publishing to the stalled subscriber is more than
+`--max-slowdown` times slower than publishing to nobody.
+
+Usage:
+    python benchmarks/bench_statebus.py [--messages 50000] [--max-slowdown 3]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeflow.statebus import StateBusPublisher, StateBusSubscriber  # noqa: E402
+
+PARAMS = {"action": "uav_patrol_yard", "value1": "4,4 8,4 8,16 12,16"}
+MESSAGE = "✅ Triggered IFTTT event **aerovolt_uav_patrol_yard**.\nHTTP status: 200 · attempts: 1"
+
+
+def unused_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def publish_all(bus: StateBusPublisher, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        bus.publish(
+            "command", func="run_mobility_action", params=PARAMS, success=True,
+            message=MESSAGE, seconds=0.0123,
+        )
+    return time.perf_counter() - started
+
+
+def drain(subscriber: StateBusSubscriber, stop: threading.Event, lags: List[float]) -> None:
+    while not stop.is_set():
+        for message in subscriber.poll():
+            lags.append(time.time() - message["ts"])
+        time.sleep(0.0005)
+    for message in subscriber.poll():
+        lags.append(time.time() - message["ts"])
+
+
+def run(label: str, count: int, subscriber: Optional[StateBusSubscriber], reader: bool) -> Tuple[float, str]:
+    address = subscriber.address if subscriber is not None else ("127.0.0.1", unused_port())
+    bus = StateBusPublisher([address])
+    lags: List[float] = []
+    stop = threading.Event()
+    thread = None
+    if subscriber is not None and reader:
+        thread = threading.Thread(target=drain, args=(subscriber, stop, lags))
+        thread.start()
+    try:
+        elapsed = publish_all(bus, count)
+    finally:
+        time.sleep(0.05)
+        stop.set()
+        if thread is not None:
+            thread.join()
+        bus.close()
+
+    seen = ""
+    if subscriber is not None:
+        if not reader:
+            subscriber.poll()
+        seen = f"received {subscriber.received} · missed {subscriber.missed}"
+        if lags:
+            seen += f" · lag p50 {statistics.median(lags) * 1e6:.0f} us"
+    print(f"{label:>18}  {elapsed / count * 1e6:>6.2f} us/publish  {seen}")
+    return elapsed, seen
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="State bus publish cost and subscriber drops")
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--max-slowdown", type=float, default=3.0)
+    args = parser.parse_args(argv)
+
+    nobody, _ = run("no subscriber", args.messages, None, reader=False)
+    with StateBusSubscriber(("127.0.0.1", 0)) as subscriber:
+        run("draining", args.messages, subscriber, reader=True)
+    # A small receive buffer, never read until the end: a stalled consumer.
+    with StateBusSubscriber(("127.0.0.1", 0), buffer_bytes=16 * 1024) as subscriber:
+        stalled, _ = run("stalled", args.messages, subscriber, reader=False)
+        # The tail is lost too, so count against what was sent, not by gaps.
+        lost = args.messages - subscriber.received
+
+    slowdown = stalled / nobody
+    print(f"stalled subscriber: {slowdown:.2f}x the publish time with nobody listening, {lost} messages dropped")
+    return 1 if slowdown > args.max_slowdown or lost == 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Connection reuse check for the pooled IFTTT transport.
+
+Fires 100 triggers through `plugin.call_ifttt_event` against the local
+IFTTT stand-in and counts how many TCP connections the server accepted,
+then does the same with one-off `requests.post` calls for comparison.
+Exits non-zero if the pooled path opened more connections than its pool size.
+`--transport http.client` checks the standard-library transport instead.
+
+Usage:
+    python benchmarks/bench_transport.py [--triggers N] [--transport requests|http.client]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+import plugin  # noqa: E402
+from benchmarks.ifttt_standin import IftttStandIn  # noqa: E402
+from homeflow.config import compile_config  # noqa: E402
+from homeflow.transport import REQUESTS, TRANSPORTS  # noqa: E402
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pooled transport connection reuse check")
+    parser.add_argument("--triggers", type=int, default=100)
+    parser.add_argument("--transport", choices=TRANSPORTS, default=REQUESTS)
+    args = parser.parse_args(argv)
+
+    with IftttStandIn() as server:
+        plugin.IFTTT_BASE_URL = server.url_template
+        # Rate limiting would pace the triggers; only connection reuse is measured here.
+        plugin.install_config(compile_config({
+            "IFTTT_API_KEY": "bench-key",
+            "DEFAULT_TIMEOUT_SECONDS": 5,
+            "HTTP_TRANSPORT": args.transport,
+            "RATE_LIMIT": {"ENABLED": False},
+        }))
+
+        # The prewarm connection from initialize counts too: it is the one
+        # the triggers are expected to reuse.
+        plugin.initialize_command()
+        started = time.perf_counter()
+        deadline = started + 5
+        while server.connections == 0 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+
+        started = time.perf_counter()
+        for i in range(args.triggers):
+            result = plugin.call_ifttt_event("bench_event", value1=str(i))
+            if not result["success"]:
+                print(result["message"])
+                return 1
+        pooled_elapsed = time.perf_counter() - started
+        pooled_connections = server.connections
+
+        server.reset_counters()
+        started = time.perf_counter()
+        url = server.url_template.format(event_name="bench_event", api_key="bench-key")
+        for i in range(args.triggers):
+            requests.post(url, json={"value1": str(i)}, timeout=5).raise_for_status()
+        bare_elapsed = time.perf_counter() - started
+        bare_connections = server.connections
+
+    pool_size = plugin.get_http_pool_size()
+    print(f"{'path':>14}  {'connections':>11}  {'per trigger':>12}")
+    print(
+        f"{args.transport:>14}  {pooled_connections:>11}  "
+        f"{pooled_elapsed / args.triggers * 1000:>10.2f}ms"
+    )
+    print(
+        f"{'requests.post':>14}  {bare_connections:>11}  "
+        f"{bare_elapsed / args.triggers * 1000:>10.2f}ms"
+    )
+
+    if pooled_connections > pool_size:
+        print(f"FAIL: pooled transport opened {pooled_connections} connections (pool size {pool_size})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
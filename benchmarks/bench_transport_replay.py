@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Replay check for the standard-library transport's pooled connections.
+
+A raw keep-alive server answers the first request on each connection. Then,
+depending on the case, it either reads the second request and hangs up
+without answering (the request may have been acted on), or closes the
+connection while it sits idle in the pool:
+
+- lost after sending, `replay=False`: the call fails and the server saw the
+  request once (a non-idempotent IFTTT event must not fire twice);
+- lost after sending, `replay=True`: the request is sent again on a fresh
+  connection and succeeds;
+- closed while idle: the dead connection is skipped before use, so even a
+  `replay=False` call succeeds.
+
+Exits with status 1 when any of these does not hold.
+
+Usage:
+    python benchmarks/bench_transport_replay.py
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeflow.transport import HTTPClientTransport, TransportError  # noqa: E402
+
+_OK = (
+    b"HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\nContent-Length: 2\r\n"
+    b"Connection: keep-alive\r\n\r\nok"
+)
+
+
+class _KeepAliveServer:
+    """
+    Answers one request per connection, then either drops the connection
+    after reading the next request (`mode="lost"`) or closes it right away
+    (`mode="idle"`).
+    """
+
+    def __init__(self, mode: str) -> None:
+        self.mode = mode
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._sock = socket.socket()
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen(8)
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return "http://127.0.0.1:%d/trigger" % self._sock.getsockname()[1]
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _read_request(self, conn: socket.socket) -> bool:
+        data = b""
+        while b"\r\n\r\n" not in data:
+            chunk = conn.recv(65536)
+            if not chunk:
+                return False
+            data += chunk
+        head, _, body = data.partition(b"\r\n\r\n")
+        length = 0
+        for line in head.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length":
+                length = int(value)
+        while len(body) < length:
+            body += conn.recv(65536)
+        with self._lock:
+            self.requests += 1
+        return True
+
+    def _serve(self, conn: socket.socket) -> None:
+        with conn:
+            if not self._read_request(conn):
+                return
+            conn.sendall(_OK)
+            if self.mode == "lost":
+                self._read_request(conn)
+            conn.shutdown(socket.SHUT_RDWR)
+
+    def close(self) -> None:
+        self._sock.close()
+
+
+def _post(transport: HTTPClientTransport, url: str, replay: bool) -> Optional[str]:
+    try:
+        transport.post(url, json={"value1": "x"}, timeout=5, replay=replay).raise_for_status()
+    except TransportError as e:
+        return str(e) or type(e).__name__
+    return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    failures: List[str] = []
+    for mode, replay, should_succeed, expected_requests in (
+        ("lost", False, False, 2),
+        ("lost", True, True, 3),
+        ("idle", False, True, 2),
+    ):
+        server = _KeepAliveServer(mode)
+        transport = HTTPClientTransport(pool_size=1)
+        try:
+            first = _post(transport, server.url, replay)
+            if mode == "idle":
+                time.sleep(0.1)  # let the close reach the pooled connection
+            error = _post(transport, server.url, replay)
+        finally:
+            transport.close()
+            server.close()
+        label = f"{mode}, replay={replay}"
+        print(f"{label:>19}: {error or 'ok'} · server saw {server.requests} request(s)")
+        if first is not None:
+            failures.append(f"{label}: the first request failed: {first}")
+        elif (error is None) != should_succeed:
+            failures.append(f"{label}: expected {'success' if should_succeed else 'a failure'}")
+        if server.requests != expected_requests:
+            failures.append(
+                f"{label}: the server saw {server.requests} requests, expected {expected_requests}"
+            )
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Local stand-in for the Home Assistant WebSocket API.
+
+Serves `/api/websocket` the way Home Assistant does: `auth_required`, then
+`auth` with an access token answered by `auth_ok` or `auth_invalid`, then
+`call_service` and `ping` commands whose answers carry the command's id.
+Ids must increase on each connection, as Home Assistant insists; a repeated
+or lower one is answered with an `id_reuse` error.
+
+Each connection handles its commands concurrently, so with `latency` set,
+answers come back out of order the way they can from a real instance. Calls
+are recorded for checks, and `drop_connections()` cuts every open connection
+without a close frame, as a restart or network blip would.
+
+Run standalone:
+    python benchmarks/ha_standin.py --port 8123 [--token secret --latency-ms 20]
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from socketserver import BaseRequestHandler, ThreadingTCPServer
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeflow.websocket import WebSocket, WebSocketError, accept  # noqa: E402
+
+HA_VERSION = "2024.6.0"
+
+
+class _StandInHandler(BaseRequestHandler):
+    server: "_StandInServer"
+
+    def handle(self) -> None:
+        stand_in = self.server.stand_in
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            ws = accept(self.request)
+        except (OSError, WebSocketError):
+            return
+        stand_in.count_connection(ws)
+        try:
+            self._serve(stand_in, ws)
+        except (OSError, WebSocketError, ValueError):
+            pass
+        finally:
+            stand_in.forget(ws)
+            ws.close()
+
+    def _serve(self, stand_in: "HomeAssistantStandIn", ws: WebSocket) -> None:
+        send = lambda message: ws.send_text(json.dumps(message))  # noqa: E731
+        send({"type": "auth_required", "ha_version": HA_VERSION})
+        auth = json.loads(ws.recv())
+        if auth.get("type") != "auth" or auth.get("access_token") != stand_in.token:
+            stand_in.count_auth_failure()
+            send({"type": "auth_invalid", "message": "Invalid access token or password"})
+            return
+        send({"type": "auth_ok", "ha_version": HA_VERSION})
+
+        last_id = 0
+        while True:
+            message = json.loads(ws.recv())
+            request_id = message.get("id")
+            if not isinstance(request_id, int) or request_id <= last_id:
+                send({
+                    "id": request_id, "type": "result", "success": False,
+                    "error": {"code": "id_reuse", "message": "Identifier values have to increase."},
+                })
+                continue
+            last_id = request_id
+            threading.Thread(target=stand_in.answer, args=(message, send), daemon=True).start()
+
+
+class _StandInServer(ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    stand_in: "HomeAssistantStandIn"
+
+
+class HomeAssistantStandIn:
+    """
+    In-process Home Assistant stand-in. Use as a context manager or call
+    `start()`/`stop()`; `url` is a drop-in BACKENDS URL.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        token: str = "standin-token",
+        latency: float = 0.0,
+        failing_services: Tuple[str, ...] = (),
+    ) -> None:
+        self._server = _StandInServer((host, port), _StandInHandler)
+        self._server.stand_in = self
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._open: Set[WebSocket] = set()
+        self.token = token
+        self.latency = latency
+        self.failing_services = set(failing_services)
+        self.connections = 0
+        self.auth_failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls: List[Dict[str, Any]] = []
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"ws://{host}:{port}/api/websocket"
+
+    def count_connection(self, ws: WebSocket) -> None:
+        with self._lock:
+            self.connections += 1
+            self._open.add(ws)
+
+    def forget(self, ws: WebSocket) -> None:
+        with self._lock:
+            self._open.discard(ws)
+
+    def count_auth_failure(self) -> None:
+        with self._lock:
+            self.auth_failures += 1
+
+    def answer(self, message: Dict[str, Any], send: Any) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency > 0:
+                time.sleep(self.latency)
+            if message.get("type") == "ping":
+                reply: Dict[str, Any] = {"id": message["id"], "type": "pong"}
+            elif message.get("type") != "call_service":
+                reply = {
+                    "id": message["id"], "type": "result", "success": False,
+                    "error": {"code": "unknown_command", "message": "Unknown command."},
+                }
+            elif f"{message.get('domain')}.{message.get('service')}" in self.failing_services:
+                reply = {
+                    "id": message["id"], "type": "result", "success": False,
+                    "error": {"code": "home_assistant_error", "message": "Entity is unavailable."},
+                }
+            else:
+                with self._lock:
+                    self.calls.append(message)
+                reply = {
+                    "id": message["id"], "type": "result", "success": True,
+                    "result": {"context": {"id": f"standin-{message['id']}"}},
+                }
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        try:
+            send(reply)
+        except WebSocketError:
+            pass
+
+    def drop_connections(self) -> int:
+        """
+        Cut every open connection without a close frame. Returns how many.
+        """
+        with self._lock:
+            open_now = list(self._open)
+        for ws in open_now:
+            try:
+                ws.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        return len(open_now)
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.connections = 0
+            self.auth_failures = 0
+            self.max_in_flight = 0
+            self.calls = []
+
+    def start(self) -> "HomeAssistantStandIn":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="ha-standin", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.drop_connections()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "HomeAssistantStandIn":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local Home Assistant WebSocket API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--token", default="standin-token")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stand_in = HomeAssistantStandIn(args.host, args.port, args.token, args.latency_ms / 1000)
+    print(f"Home Assistant stand-in listening on {stand_in.url} (token {args.token!r})")
+    stand_in.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stand_in.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Local stand-in for maker.ifttt.com Webhooks.
+
+Serves `POST /trigger/{event}/with/key/{key}` over plain HTTP/1.1 with
+keep-alive, and counts accepted TCP connections and requests so benchmarks can
+check how the plugin's transport behaves. It can also enforce a per-key
+token-bucket rate limit, answering 429 with Retry-After like IFTTT does.
+
+To look like the real service over a real network, each trigger can be
+delayed by `latency` ± `jitter` seconds, and a fraction of them answered with
+a 500 (`error_rate`) or a 429 (`throttle_rate`) at random.
+
+Run standalone:
+    python benchmarks/ifttt_standin.py --port 8765 [--latency-ms 80 --jitter-ms 30]
+"""
+
+import argparse
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+TRIGGER_PATH = re.compile(r"^/trigger/(?P<event>[^/]+)/with/key/(?P<key>[^/]+)/?$")
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "_StandInHTTPServer"
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def _reply(self, status: int, body: str, headers: Optional[Dict[str, str]] = None) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def do_HEAD(self) -> None:
+        self._reply(200, "")
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        match = TRIGGER_PATH.match(self.path)
+        if not match:
+            self._reply(404, "Not found")
+            return
+
+        stand_in = self.server.stand_in
+        retry_after = stand_in.throttle(match.group("key"))
+        if retry_after is not None:
+            self._reply(429, "Too Many Requests", {"Retry-After": f"{retry_after:.3f}"})
+            return
+
+        delay, fault = stand_in.simulate()
+        if delay > 0:
+            time.sleep(delay)
+        if fault == 429:
+            self._reply(429, "Too Many Requests", {"Retry-After": f"{stand_in.retry_after:.3f}"})
+            return
+        if fault == 500:
+            self._reply(500, "Internal Server Error")
+            return
+
+        stand_in.count_request(match.group("event"))
+        self._reply(200, f"Congratulations! You've fired the {match.group('event')} event")
+
+
+class _StandInHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    stand_in: "IftttStandIn"
+
+    def process_request(self, request, client_address):  # type: ignore[no-untyped-def]
+        self.stand_in.count_connection()
+        super().process_request(request, client_address)
+
+
+class IftttStandIn:
+    """
+    In-process IFTTT stand-in server. Use as a context manager or call
+    `start()`/`stop()`; `url_template` is a drop-in `IFTTT_BASE_URL`.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        rate_limit: Optional[float] = None,
+        burst: int = 1,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self._server = _StandInHTTPServer((host, port), _StandInHandler)
+        self._server.stand_in = self
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self.connections = 0
+        self.requests = 0
+        self.rejected = 0
+        self.errors = 0
+        self.events: Dict[str, int] = {}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def url_template(self) -> str:
+        return self.base_url + "/trigger/{event_name}/with/key/{api_key}"
+
+    def count_connection(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def count_request(self, event: str) -> None:
+        with self._lock:
+            self.requests += 1
+            self.events[event] = self.events.get(event, 0) + 1
+
+    def throttle(self, key: str) -> Optional[float]:
+        """
+        Take a token for `key`. Returns None if allowed, otherwise the seconds
+        until the next token (sent as Retry-After).
+        """
+        if not self.rate_limit:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated_at) * self.rate_limit)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return None
+            self._buckets[key] = (tokens, now)
+            self.rejected += 1
+            return (1 - tokens) / self.rate_limit
+
+    def simulate(self) -> Tuple[float, Optional[int]]:
+        """
+        Draw the delay for one trigger, and the injected status code (429 or
+        500) if it is to fail, else None.
+        """
+        with self._lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            roll = self._random.random()
+            if roll < self.throttle_rate:
+                self.rejected += 1
+                return delay, 429
+            if roll < self.throttle_rate + self.error_rate:
+                self.errors += 1
+                return delay, 500
+            return delay, None
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+            self.rejected = 0
+            self.errors = 0
+            self.events = {}
+
+    def start(self) -> "IftttStandIn":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="ifttt-standin", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "IftttStandIn":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local IFTTT Webhooks stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests/s per key")
+    parser.add_argument("--burst", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction answered 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction answered 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of injected 429s")
+    args = parser.parse_args()
+
+    server = IftttStandIn(
+        args.host,
+        args.port,
+        rate_limit=args.rate_limit,
+        burst=args.burst,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+    )
+    print(f"IFTTT stand-in listening; set IFTTT_BASE_URL={server.url_template}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,114 @@
+import json
+import os
+import time
 import tkinter as tk
 from tkinter import ttk
 
+from homeflow.coverage import CoverageError, CoverageRequest, PathCache
+from homeflow.simulation import PATROL, RETURN, Simulation
+from homeflow.statebus import DEFAULT_PORT, StateBusSubscriber, parse_address
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+PATHS_DIR = os.path.join(os.path.expanduser("~"), "HomeFlow_paths")
+
+# Canvas area the yard is drawn into.
+YARD_BOX = (40, 40, 340, 240)
+
+# The simulation steps at its own fixed timestep; the view samples it at most
+# this often (about 30 frames per second).
+FRAME_MS = 33
+
+# Battery body on the EV canvas, and the margin of the fill inside it.
+BATTERY_BOX = (60, 60, 300, 200)
+BATTERY_MARGIN = 6
+
+
+# What the simulation does when the live plugin fires a mobility action.
+LIVE_ACTIONS = {
+    "start_ev_charging_home": "start_charging",
+    "stop_ev_charging_home": "stop_charging",
+    "uav_patrol_yard": "start_patrol",
+    "uav_return_home": "return_home",
+}
+
+
+def connect_to_plugin():
+    """
+    Subscribe to the plugin's state bus on the first STATE_BUS subscriber
+    address in config.json. Returns the subscriber and a map from IFTTT event
+    name to mobility action, or (None, {}) when the bus is off or the port is
+    taken (another demo, say).
+    """
+    try:
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        bus = raw.get("STATE_BUS") or {}
+        if not bus.get("ENABLED", False):
+            return None, {}
+        subscribers = bus.get("SUBSCRIBERS", [f"127.0.0.1:{DEFAULT_PORT}"])
+        subscriber = StateBusSubscriber(parse_address(subscribers[0]))
+    except (OSError, ValueError, IndexError, TypeError) as e:
+        print(f"Not following the live plugin: {e}")
+        return None, {}
+    actions = {event: action for action, event in (raw.get("MOBILITY_ACTIONS") or {}).items()}
+    return subscriber, actions
+
+
+class FrameTimer:
+    """
+    Time spent drawing frames, for the counter in the corner of the UAV
+    canvas. Frames that had nothing to draw are counted as skipped.
+    """
+
+    def __init__(self, window=50):
+        self.window = window
+        self.samples = []
+        self.drawn = 0
+        self.skipped = 0
+
+    def record(self, seconds):
+        self.drawn += 1
+        self.samples.append(seconds)
+        if len(self.samples) > self.window:
+            del self.samples[0]
+
+    def skip(self):
+        self.skipped += 1
+
+    def summary(self):
+        if not self.samples:
+            return f"frame: - · skipped {self.skipped}"
+        average = sum(self.samples) / len(self.samples) * 1000
+        return f"frame: {average:.2f} ms avg · {max(self.samples) * 1000:.2f} ms max · skipped {self.skipped}"
+
+
+def load_patrol_route():
+    """
+    Plan (or read from the path cache) the route from UAV_PATROL in
+    config.json, the same one uav_patrol_yard sends. Returns the yard,
+    keep-out zones and waypoints in metres, or None without a yard.
+    """
+    try:
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            patrol = json.load(f).get("UAV_PATROL") or {}
+        if "YARD" not in patrol:
+            return None
+        request = CoverageRequest(
+            yard=tuple(tuple(p) for p in patrol["YARD"]),
+            home=tuple(patrol.get("HOME", [0, 0])),
+            swath_m=patrol.get("SWATH_METERS", 4),
+            range_m=patrol.get("RANGE_METERS", 800),
+            keep_out=tuple(tuple(tuple(p) for p in zone) for zone in patrol.get("KEEP_OUT", [])),
+            pattern=patrol.get("PATTERN", "lawnmower"),
+            angle_degrees=patrol.get("ANGLE_DEGREES"),
+        )
+        plan, _ = PathCache(os.path.expanduser(patrol.get("CACHE_DIR") or PATHS_DIR)).plan(request)
+    except (OSError, ValueError, TypeError, CoverageError) as e:
+        print(f"Using the default patrol rectangle: {e}")
+        return None
+    return request.yard, request.keep_out, plan.waypoints
+
+
 class AeroVoltDemo(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -13,17 +121,8 @@ class AeroVoltDemo(tk.Tk):
         self._create_styles()
         self._create_layout()
 
-        # EV state
-        self.ev_soc = 20  # %
-        self.ev_charging = False
-
-        # UAV state
-        self.uav_x = 80
-        self.uav_y = 80
+        # UAV route
         self.uav_radius = 10
-        self.uav_patrolling = False
-        self.uav_returning = False
-        self.uav_path_index = 0
         self.uav_path_points = [
             (80, 80),
             (320, 80),
@@ -31,13 +130,35 @@ class AeroVoltDemo(tk.Tk):
             (80, 260),
             (80, 80),
         ]
-
+        self.uav_yard = [(40, 40), (340, 40), (340, 240), (40, 240)]
+        self.uav_keep_out = []
+        route = load_patrol_route()
+        if route is not None:
+            self._use_planned_route(*route)
+
+        # One EV and one drone; the view only samples their state.
+        self.sim = Simulation(evs=1, drones=1, path=self.uav_path_points)
+        self.bus, self.bus_actions = connect_to_plugin()
+        if self.bus is not None:
+            self.bus_label.config(
+                text=f"Live plugin: listening on {self.bus.address[0]}:{self.bus.address[1]}"
+            )
+        self._last_tick = time.perf_counter()
+
+        # What is on the canvases now, so unchanged frames are not redrawn.
+        self.frame_timer = FrameTimer()
+        self._drawn_ev_soc = None
+        self._drawn_uav_pos = None
+        self._shown_frame_stats = None
+
+        self._build_ev_battery()
+        self._build_uav_scene()
         self._draw_ev_battery()
         self._draw_uav_scene()
 
-        # start animation loops
-        self.after(200, self._ev_loop)
-        self.after(80, self._uav_loop)
+        # start animation loop
+        self.after(FRAME_MS, self._tick)
+        self.after(1000, self._show_frame_stats)
 
     def _create_styles(self):
         style = ttk.Style()
@@ -138,16 +259,25 @@ class AeroVoltDemo(tk.Tk):
         )
         self.uav_label.pack(anchor="w", pady=(4, 0))
 
+        # Live plugin events (state bus)
+        self.bus_label = ttk.Label(
+            root_frame, text="Live plugin: not connected", style="Small.TLabel"
+        )
+        self.bus_label.grid(row=1, column=0, columnspan=2, sticky="w", pady=(12, 0))
+
         # Make columns expand equally
         root_frame.columnconfigure(0, weight=1)
         root_frame.columnconfigure(1, weight=1)
 
     # -------- EV drawing & loop --------
-    def _draw_ev_battery(self):
-        self.ev_canvas.delete("all")
+    def _build_ev_battery(self):
+        """
+        Create the battery items once; _draw_ev_battery only moves the fill
+        and changes the text.
+        """
+        x0, y0, x1, y1 = BATTERY_BOX
 
         # Battery body
-        x0, y0, x1, y1 = 60, 60, 300, 200
         self.ev_canvas.create_rectangle(
             x0, y0, x1, y1, outline="#cccccc", width=3
         )
@@ -156,34 +286,13 @@ class AeroVoltDemo(tk.Tk):
             x1, 100, x1 + 12, 160, outline="#cccccc", width=3, fill="#1e1e1e"
         )
 
-        # Fill level
-        fill_margin = 6
-        inner_x0 = x0 + fill_margin
-        inner_y0 = y0 + fill_margin
-        inner_x1 = x1 - fill_margin
-        inner_y1 = y1 - fill_margin
-
-        soc_frac = max(0.0, min(1.0, self.ev_soc / 100.0))
-        w = inner_x1 - inner_x0
-        fill_x1 = inner_x0 + w * soc_frac
-
-        # Color changes with SOC
-        if soc_frac < 0.3:
-            fill_color = "#d16969"  # red
-        elif soc_frac < 0.7:
-            fill_color = "#dcdcaa"  # yellow
-        else:
-            fill_color = "#6a9955"  # green
-
-        self.ev_canvas.create_rectangle(
-            inner_x0, inner_y0, fill_x1, inner_y1, fill=fill_color, width=0
-        )
+        # Fill level, sized by _draw_ev_battery
+        self.ev_fill = self.ev_canvas.create_rectangle(0, 0, 0, 0, width=0)
 
         # Text
-        self.ev_canvas.create_text(
+        self.ev_soc_text = self.ev_canvas.create_text(
             (x0 + x1) / 2,
             y1 + 30,
-            text=f"State of Charge: {self.ev_soc:.0f}%",
             fill="white",
             font=("Segoe UI", 12, "bold"),
         )
@@ -197,36 +306,78 @@ class AeroVoltDemo(tk.Tk):
             font=("Segoe UI", 9),
         )
 
-    def _ev_loop(self):
-        if self.ev_charging:
-            # slow charge
-            self.ev_soc += 0.6
-            if self.ev_soc >= 100:
-                self.ev_soc = 100
-                self.ev_charging = False
-            self._draw_ev_battery()
-
-        status = "Charging" if self.ev_charging else "Idle"
-        self.ev_label.config(
-            text=f"Status: {status} · SOC: {self.ev_soc:.0f}%"
-        )
-        self.after(300, self._ev_loop)
+    def _draw_ev_battery(self):
+        if self.ev_soc == self._drawn_ev_soc:
+            self.frame_timer.skip()
+            return
+        started = time.perf_counter()
+
+        x0, y0, x1, y1 = BATTERY_BOX
+        inner_x0 = x0 + BATTERY_MARGIN
+        inner_y0 = y0 + BATTERY_MARGIN
+        inner_x1 = x1 - BATTERY_MARGIN
+        inner_y1 = y1 - BATTERY_MARGIN
+
+        soc_frac = max(0.0, min(1.0, self.ev_soc / 100.0))
+        w = inner_x1 - inner_x0
+        fill_x1 = inner_x0 + w * soc_frac
+
+        # Color changes with SOC
+        if soc_frac < 0.3:
+            fill_color = "#d16969"  # red
+        elif soc_frac < 0.7:
+            fill_color = "#dcdcaa"  # yellow
+        else:
+            fill_color = "#6a9955"  # green
+
+        self.ev_canvas.coords(self.ev_fill, inner_x0, inner_y0, fill_x1, inner_y1)
+        self.ev_canvas.itemconfig(self.ev_fill, fill=fill_color)
+        self.ev_canvas.itemconfig(self.ev_soc_text, text=f"State of Charge: {self.ev_soc:.0f}%")
+
+        self._drawn_ev_soc = self.ev_soc
+        self.frame_timer.record(time.perf_counter() - started)
+
+    @property
+    def ev_soc(self):
+        return self.sim.ev_soc(0)
 
     def _start_ev_charging(self):
-        self.ev_charging = True
+        self.sim.start_charging(0)
 
     def _stop_ev_charging(self):
-        self.ev_charging = False
+        self.sim.stop_charging(0)
 
     # -------- UAV drawing & loop --------
-    def _draw_uav_scene(self):
-        self.uav_canvas.delete("all")
-
-        # Yard rectangle
-        yard_x0, yard_y0, yard_x1, yard_y1 = 40, 40, 340, 240
-        self.uav_canvas.create_rectangle(
-            yard_x0, yard_y0, yard_x1, yard_y1, outline="#cccccc", width=2
+    def _use_planned_route(self, yard, keep_out, waypoints):
+        """
+        Fit the yard (metres, y north) into YARD_BOX and follow the planned
+        waypoints instead of the default rectangle.
+        """
+        x0, y0, x1, y1 = YARD_BOX
+        min_x, max_x = min(x for x, _ in yard), max(x for x, _ in yard)
+        min_y, max_y = min(y for _, y in yard), max(y for _, y in yard)
+        scale = min((x1 - x0) / max(max_x - min_x, 1e-6), (y1 - y0) / max(max_y - min_y, 1e-6))
+
+        def to_canvas(point):
+            return (x0 + (point[0] - min_x) * scale, y1 - (point[1] - min_y) * scale)
+
+        self.uav_yard = [to_canvas(p) for p in yard]
+        self.uav_keep_out = [[to_canvas(p) for p in zone] for zone in keep_out]
+        self.uav_path_points = [to_canvas(p) for p in waypoints]
+
+    def _build_uav_scene(self):
+        """
+        Create the yard, path, home marker and labels once, plus the drone
+        items that _draw_uav_scene moves each frame.
+        """
+        # Yard outline and keep-out zones
+        self.uav_canvas.create_polygon(
+            *[c for point in self.uav_yard for c in point], outline="#cccccc", fill="", width=2
         )
+        for zone in self.uav_keep_out:
+            self.uav_canvas.create_polygon(
+                *[c for point in zone for c in point], outline="#d16969", fill="#3a2626", width=1
+            )
         self.uav_canvas.create_text(
             70,
             30,
@@ -236,52 +387,28 @@ class AeroVoltDemo(tk.Tk):
             font=("Segoe UI", 9),
         )
 
-        # Patrol path (simple rectangle)
+        # Patrol path
         self.uav_canvas.create_line(
-            80,
-            80,
-            320,
-            80,
-            320,
-            260,
-            80,
-            260,
-            80,
-            80,
+            *[c for point in self.uav_path_points for c in point],
             fill="#3fc6ff",
             dash=(4, 2),
         )
 
         # Home position
-        self.uav_canvas.create_oval(72, 72, 88, 88, outline="#6a9955", width=2)
+        home_x, home_y = self.uav_path_points[0]
+        self.uav_canvas.create_oval(home_x - 8, home_y - 8, home_x + 8, home_y + 8, outline="#6a9955", width=2)
         self.uav_canvas.create_text(
-            95,
-            78,
+            home_x + 15,
+            home_y - 2,
             text="Home",
             fill="#6a9955",
             anchor="w",
             font=("Segoe UI", 9),
         )
 
-        # UAV (drone)
-        r = self.uav_radius
-        self.uav_canvas.create_oval(
-            self.uav_x - r,
-            self.uav_y - r,
-            self.uav_x + r,
-            self.uav_y + r,
-            fill="#3fc6ff",
-            outline="white",
-        )
-        # heading indicator
-        self.uav_canvas.create_line(
-            self.uav_x,
-            self.uav_y,
-            self.uav_x,
-            self.uav_y - r * 1.8,
-            fill="white",
-            width=2,
-        )
+        # UAV (drone) and heading indicator, placed by _draw_uav_scene
+        self.uav_body = self.uav_canvas.create_oval(0, 0, 0, 0, fill="#3fc6ff", outline="white")
+        self.uav_heading = self.uav_canvas.create_line(0, 0, 0, 0, fill="white", width=2)
 
         self.uav_canvas.create_text(
             200,
@@ -291,61 +418,101 @@ class AeroVoltDemo(tk.Tk):
             font=("Segoe UI", 9),
         )
 
-    def _uav_loop(self):
-        if self.uav_patrolling:
-            self._step_along_path()
-            self.uav_label.config(text="Status: Patrolling backyard perimeter")
-        elif self.uav_returning:
-            self._step_towards_home()
-            self.uav_label.config(text="Status: Returning to home")
-        else:
-            self.uav_label.config(text="Status: On standby at home")
+        # Frame-time counter
+        self.frame_text = self.uav_canvas.create_text(
+            354,
+            252,
+            fill="#808080",
+            anchor="se",
+            font=("Segoe UI", 8),
+        )
 
-        self._draw_uav_scene()
-        self.after(80, self._uav_loop)
+    @property
+    def uav_position(self):
+        return self.sim.drone_position(0)
 
-    def _start_uav_patrol(self):
-        self.uav_patrolling = True
-        self.uav_returning = False
-        self.uav_path_index = 0
+    def _draw_uav_scene(self):
+        position = self.uav_position
+        if position == self._drawn_uav_pos:
+            self.frame_timer.skip()
+            return
+        started = time.perf_counter()
 
-    def _return_uav_home(self):
-        self.uav_patrolling = False
-        self.uav_returning = True
+        x, y = position
+        r = self.uav_radius
+        self.uav_canvas.coords(self.uav_body, x - r, y - r, x + r, y + r)
+        self.uav_canvas.coords(self.uav_heading, x, y, x, y - r * 1.8)
+
+        self._drawn_uav_pos = position
+        self.frame_timer.record(time.perf_counter() - started)
+
+    def _show_frame_stats(self):
+        text = self.frame_timer.summary()
+        if text != self._shown_frame_stats:
+            self.uav_canvas.itemconfig(self.frame_text, text=text)
+            self._shown_frame_stats = text
+        self.after(1000, self._show_frame_stats)
+
+    @staticmethod
+    def _set_label(label, text):
+        # Tk relays out a label on every config, even with the same text.
+        if label.cget("text") != text:
+            label.config(text=text)
+
+    def _tick(self):
+        """
+        Advance the simulation by the wall time since the last frame, then
+        draw whatever changed.
+        """
+        self._follow_plugin()
+        now = time.perf_counter()
+        self.sim.advance(now - self._last_tick)
+        self._last_tick = now
+
+        status = "Charging" if self.sim.is_charging(0) else "Idle"
+        self._set_label(self.ev_label, f"Status: {status} · SOC: {self.ev_soc:.0f}%")
+        mode = self.sim.drone_mode(0)
+        if mode == PATROL:
+            self._set_label(self.uav_label, "Status: Patrolling backyard")
+        elif mode == RETURN:
+            self._set_label(self.uav_label, "Status: Returning to home")
+        else:
+            self._set_label(self.uav_label, "Status: On standby at home")
 
-    def _step_along_path(self):
-        if not self.uav_path_points:
-            return
+        self._draw_ev_battery()
+        self._draw_uav_scene()
+        self.after(FRAME_MS, self._tick)
 
-        target_x, target_y = self.uav_path_points[self.uav_path_index]
-        dx = target_x - self.uav_x
-        dy = target_y - self.uav_y
-        dist = max((dx ** 2 + dy ** 2) ** 0.5, 1e-6)
-        step = 4.0
+    def _follow_plugin(self):
+        """
+        Apply the mobility actions the live plugin fired since the last frame.
+        """
+        if self.bus is None:
+            return
+        messages = self.bus.poll(limit=200)
+        for message in messages:
+            if message.get("kind") != "ifttt" or not message.get("success"):
+                continue
+            action = self.bus_actions.get(message.get("event"))
+            if action in LIVE_ACTIONS:
+                getattr(self.sim, LIVE_ACTIONS[action])(0)
+        if messages:
+            last = messages[-1]
+            mark = "✅" if last.get("success") else "❌"
+            name = last.get("event") or last.get("func")
+            missed = f" · missed {self.bus.missed}" if self.bus.missed else ""
+            self._set_label(
+                self.bus_label,
+                f"Live plugin: {mark} {last.get('kind')} {name} · {self.bus.received} events{missed}",
+            )
 
-        if dist < step:
-            # reached this waypoint
-            self.uav_x, self.uav_y = target_x, target_y
-            self.uav_path_index = (self.uav_path_index + 1) % len(self.uav_path_points)
-        else:
-            self.uav_x += step * dx / dist
-            self.uav_y += step * dy / dist
+    def _start_uav_patrol(self):
+        self.sim.start_patrol(0)
 
-    def _step_towards_home(self):
-        home_x, home_y = self.uav_path_points[0]
-        dx = home_x - self.uav_x
-        dy = home_y - self.uav_y
-        dist = max((dx ** 2 + dy ** 2) ** 0.5, 1e-6)
-        step = 5.0
-
-        if dist < step:
-            self.uav_x, self.uav_y = home_x, home_y
-            self.uav_returning = False
-        else:
-            self.uav_x += step * dx / dist
-            self.uav_y += step * dy / dist
+    def _return_uav_home(self):
+        self.sim.return_home(0)
 
 
 if __name__ == "__main__":
     app = AeroVoltDemo()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
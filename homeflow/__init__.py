@@ -0,0 +1,6 @@
+"""
+Support modules for the AeroVolt HomeFlow G-Assist plugin.
+
+`plugin.py` stays the entry point (and the PyInstaller target); the modules in
+this package hold the pieces it is built from.
+"""
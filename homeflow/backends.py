@@ -0,0 +1,466 @@
+"""
+Automation backends: where a triggered event is actually sent.
+
+Every event goes to IFTTT Webhooks unless BACKENDS routes it elsewhere. The
+IFTTT backend lives in the plugin, next to the HTTP transport, retry and
+circuit breaker rules it shares. The one other kind is Home Assistant, which
+is called over its WebSocket API:
+
+- one authenticated connection per URL and token, opened on first use (or by
+  the initialize prewarm) and shared by every command and thread;
+- calls are multiplexed on it by message id, so concurrent triggers do not
+  queue behind each other and no call pays for a handshake;
+- when the connection drops, a background thread reconnects with backoff,
+  and a call whose request never went out is retried once on the new one.
+
+The WebSocket client is imported with the first connection, so a config
+without BACKENDS never loads it.
+"""
+
+import itertools
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from homeflow.resilience import current_deadline
+
+if TYPE_CHECKING:
+    from homeflow.websocket import WebSocket
+
+IFTTT = "ifttt"
+HOME_ASSISTANT = "home_assistant"
+BACKEND_TYPES = (HOME_ASSISTANT,)
+
+RECONNECT_BASE_SECONDS = 0.5
+RECONNECT_MAX_SECONDS = 30.0
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+class BackendError(Exception):
+    """
+    A backend call failed before an answer came back.
+    """
+
+
+class BackendUnavailable(BackendError):
+    """
+    The backend could not be reached; the call was not made.
+    """
+
+
+class BackendConnectionLost(BackendError):
+    """
+    The call was sent but no answer came back (the connection dropped or the
+    timeout passed); it may or may not have run.
+    """
+
+
+@dataclass(frozen=True)
+class ServiceCall:
+    """
+    The Home Assistant service an event is routed to. `value_fields` name the
+    service data keys that receive value1, value2 and value3.
+    """
+
+    domain: str
+    service: str
+    data: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+    value_fields: Tuple[str, ...] = ()
+
+    @property
+    def name(self) -> str:
+        return f"{self.domain}.{self.service}"
+
+    def service_data(self, values: Mapping[str, Optional[str]]) -> Dict[str, Any]:
+        data = dict(self.data)
+        for number, key in enumerate(self.value_fields, 1):
+            value = values.get(f"value{number}")
+            if value is not None:
+                data[key] = value
+        return data
+
+
+@dataclass(frozen=True)
+class HomeAssistantSettings:
+    name: str
+    url: str
+    token: str
+    timeout_seconds: float = 10.0
+    events: Mapping[str, ServiceCall] = field(default_factory=lambda: MappingProxyType({}))
+
+
+class Backend:
+    """
+    Somewhere events can be sent. `trigger` answers like a command handler,
+    {"success": ..., "message": ...}, and never raises for a failed call. A
+    failed answer carries "sent": False when the event certainly did not go
+    out, so that sending it again cannot run it twice.
+    """
+
+    name = ""
+    kind = ""
+
+    def describe(self, event_name: str) -> str:
+        """
+        What the event does here, for listings.
+        """
+        raise NotImplementedError
+
+    def trigger(self, event_name: str, values: Mapping[str, Optional[str]]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def prewarm(self) -> None:
+        """
+        Open connections ahead of the first trigger. Never raises.
+        """
+
+
+# -------------------------
+# Home Assistant
+# -------------------------
+
+class _Pending:
+    __slots__ = ("done", "message", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.message: Dict[str, Any] = {}
+        self.error: Optional[BackendError] = None
+
+
+class _Session:
+    """
+    One authenticated WebSocket and the calls waiting for an answer on it.
+    Message ids must increase per connection, so they are taken and sent
+    under `send_lock`.
+    """
+
+    def __init__(self, ws: "WebSocket", ha_version: str) -> None:
+        self.ws = ws
+        self.ha_version = ha_version
+        self.alive = True
+        self.ids = itertools.count(1)
+        self.pending: Dict[int, _Pending] = {}
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+
+
+class HomeAssistantConnection:
+    """
+    A shared, self-healing connection to one Home Assistant WebSocket API.
+    Safe to use from many threads at once.
+    """
+
+    def __init__(self, url: str, token: str, connect_timeout: float = 10.0) -> None:
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.connects = 0
+        self._token = token
+        self._session: Optional[_Session] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._reconnecting = False
+
+    @property
+    def connected(self) -> bool:
+        session = self._session
+        return session is not None and session.alive
+
+    def connect(self) -> None:
+        """
+        Make sure the connection is open. Raises BackendUnavailable.
+        """
+        self._session_or_open()
+
+    def _session_or_open(self, timeout: Optional[float] = None) -> _Session:
+        """
+        The open session, opening one if needed within `timeout` seconds
+        (default: `connect_timeout`). Raises BackendUnavailable.
+        """
+        session = self._session
+        if session is not None and session.alive:
+            return session
+        timeout = self.connect_timeout if timeout is None else min(timeout, self.connect_timeout)
+        started = time.monotonic()
+        # Callers arriving while a connection is being opened wait for it
+        # rather than opening their own, but no longer than their own budget.
+        if timeout <= 0 or not self._lock.acquire(timeout=timeout):
+            raise BackendUnavailable(f"no connection to {self.url} within {timeout:.2f} s")
+        try:
+            if self._closed:
+                raise BackendUnavailable("connection was closed")
+            session = self._session
+            if session is None or not session.alive:
+                left = timeout - (time.monotonic() - started)
+                if left <= 0:
+                    raise BackendUnavailable(f"no connection to {self.url} within {timeout:.2f} s")
+                session = self._open(left)
+                self._session = session
+            return session
+        finally:
+            self._lock.release()
+
+    def _open(self, timeout: float) -> _Session:
+        from homeflow.websocket import WebSocketError, connect
+
+        started = time.monotonic()
+        try:
+            ws = connect(self.url, timeout=timeout)
+        except (OSError, WebSocketError) as e:
+            raise BackendUnavailable(f"cannot connect to {self.url}: {e}")
+        try:
+            # The auth exchange gets what the connect and upgrade left over.
+            ws.settimeout(max(0.001, timeout - (time.monotonic() - started)))
+            hello = json.loads(ws.recv())
+            if hello.get("type") != "auth_required":
+                raise BackendUnavailable(f"unexpected greeting from {self.url}: {hello.get('type')!r}")
+            ws.send_text(_ENCODER.encode({"type": "auth", "access_token": self._token}))
+            answer = json.loads(ws.recv())
+            if answer.get("type") != "auth_ok":
+                raise BackendUnavailable(
+                    f"authentication failed: {answer.get('message') or answer.get('type')}"
+                )
+            ws.settimeout(None)
+        except (WebSocketError, ValueError, AttributeError) as e:
+            ws.close()
+            raise BackendUnavailable(f"handshake with {self.url} failed: {e}")
+        except BackendUnavailable:
+            ws.close()
+            raise
+
+        session = _Session(ws, str(answer.get("ha_version", "")))
+        self.connects += 1
+        logging.info("Connected to Home Assistant %s at %s", session.ha_version, self.url)
+        threading.Thread(
+            target=self._read, args=(session,), name="homeflow-ha-reader", daemon=True
+        ).start()
+        return session
+
+    def _read(self, session: _Session) -> None:
+        from homeflow.websocket import WebSocketError
+
+        try:
+            while True:
+                message = json.loads(session.ws.recv())
+                if not isinstance(message, dict):
+                    continue
+                with session.lock:
+                    pending = session.pending.pop(message.get("id"), None)
+                # Anything unasked for (events, late answers) is dropped.
+                if pending is not None:
+                    pending.message = message
+                    pending.done.set()
+        except (WebSocketError, ValueError) as e:
+            self._lost(session, e)
+
+    def _lost(self, session: _Session, reason: Exception) -> None:
+        with session.lock:
+            session.alive = False
+            waiting = list(session.pending.values())
+            session.pending.clear()
+        session.ws.close()
+        for pending in waiting:
+            pending.error = BackendConnectionLost(
+                f"connection lost before the answer ({reason}); the call may or may not have run"
+            )
+            pending.done.set()
+
+        with self._lock:
+            if self._session is session:
+                self._session = None
+            reconnect = not self._closed and not self._reconnecting
+            if reconnect:
+                self._reconnecting = True
+        if reconnect:
+            logging.warning("Home Assistant connection to %s lost: %s", self.url, reason)
+            self._reconnect()
+
+    def _reconnect(self) -> None:
+        # Runs on the dead session's reader thread, so nobody waits for it.
+        delay = RECONNECT_BASE_SECONDS
+        try:
+            while not self._closed and not self.connected:
+                try:
+                    self._session_or_open()
+                except BackendUnavailable as e:
+                    logging.warning("Reconnecting to Home Assistant failed, retry in %.1f s: %s", delay, e)
+                    time.sleep(delay)
+                    delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+        finally:
+            with self._lock:
+                self._reconnecting = False
+
+    def call(self, message: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """
+        Send one command and return Home Assistant's answer to it. A request
+        that could not be sent is retried once on a fresh connection.
+
+        Raises BackendUnavailable (not sent, including no connection within
+        `timeout`) or BackendConnectionLost (sent, no answer within
+        `timeout`).
+        """
+        from homeflow.websocket import WebSocketClosed, WebSocketError
+
+        started = time.monotonic()
+        for attempt in (1, 2):
+            session = self._session_or_open(timeout - (time.monotonic() - started))
+            pending = _Pending()
+            with session.send_lock:
+                request_id = next(session.ids)
+                with session.lock:
+                    sendable = session.alive
+                    if sendable:
+                        session.pending[request_id] = pending
+                try:
+                    if not sendable:
+                        raise WebSocketClosed()
+                    session.ws.send_text(_ENCODER.encode({"id": request_id, **message}))
+                except WebSocketError as e:
+                    with session.lock:
+                        session.alive = False
+                        session.pending.pop(request_id, None)
+                    # The reader notices too, fails the other calls and reconnects.
+                    session.ws.close()
+                    if attempt == 2:
+                        raise BackendUnavailable(f"connection lost while sending: {e}")
+                    continue
+
+            left = max(0.0, timeout - (time.monotonic() - started))
+            if not pending.done.wait(left):
+                with session.lock:
+                    session.pending.pop(request_id, None)
+                raise BackendConnectionLost(
+                    f"no answer within {timeout:g} s; the call may or may not have run"
+                )
+            if pending.error is not None:
+                raise pending.error
+            return pending.message
+        raise AssertionError("unreachable")
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            session = self._session
+            self._session = None
+        if session is not None:
+            session.ws.close()
+
+
+_CONNECTIONS: Dict[Tuple[str, str], HomeAssistantConnection] = {}
+_CONNECTIONS_LOCK = threading.Lock()
+
+
+def get_home_assistant_connection(url: str, token: str, connect_timeout: float) -> HomeAssistantConnection:
+    """
+    The shared connection for `url` and `token`. A config reload that keeps
+    both keeps the open connection.
+    """
+    key = (url, token)
+    with _CONNECTIONS_LOCK:
+        connection = _CONNECTIONS.get(key)
+        if connection is None:
+            connection = HomeAssistantConnection(url, token, connect_timeout)
+            _CONNECTIONS[key] = connection
+        return connection
+
+
+def close_unused_connections(in_use: Iterable[Tuple[str, str]]) -> None:
+    """
+    Close the shared connections whose (url, token) is not in `in_use`, e.g.
+    after a config reload changed or removed their backend.
+    """
+    keep = set(in_use)
+    with _CONNECTIONS_LOCK:
+        stale = [_CONNECTIONS.pop(key) for key in list(_CONNECTIONS) if key not in keep]
+    for connection in stale:
+        connection.close()
+
+
+def close_connections() -> None:
+    close_unused_connections(())
+
+
+class HomeAssistantBackend(Backend):
+    """
+    Sends each routed event as a `call_service` on the shared connection.
+    """
+
+    kind = HOME_ASSISTANT
+
+    def __init__(self, settings: HomeAssistantSettings) -> None:
+        self.name = settings.name
+        self.settings = settings
+        self.connection = get_home_assistant_connection(
+            settings.url, settings.token, settings.timeout_seconds
+        )
+
+    def describe(self, event_name: str) -> str:
+        return f"Home Assistant service `{self.settings.events[event_name].name}`"
+
+    def prewarm(self) -> None:
+        try:
+            self.connection.connect()
+        except BackendUnavailable as e:
+            logging.warning("Home Assistant prewarm for %s failed: %s", self.name, e)
+
+    def trigger(self, event_name: str, values: Mapping[str, Optional[str]]) -> Dict[str, Any]:
+        call = self.settings.events[event_name]
+        timeout = self.settings.timeout_seconds
+        deadline = current_deadline.get()
+        if deadline is not None:
+            timeout = min(timeout, deadline.allot())
+
+        logging.info("Calling Home Assistant service %s for event '%s'", call.name, event_name)
+        started = time.monotonic()
+        try:
+            answer = self.connection.call(
+                {
+                    "type": "call_service",
+                    "domain": call.domain,
+                    "service": call.service,
+                    "service_data": call.service_data(values),
+                },
+                timeout,
+            )
+        except BackendError as e:
+            logging.error("Home Assistant service %s for event '%s' failed: %s", call.name, event_name, e)
+            result: Dict[str, Any] = {
+                "success": False,
+                "message": (
+                    f"❌ Failed to call Home Assistant service **{call.name}** for event **{event_name}**.\n"
+                    f"Error: `{e}`"
+                ),
+            }
+            if isinstance(e, BackendUnavailable):
+                result["sent"] = False
+            return result
+        elapsed = time.monotonic() - started
+
+        if not answer.get("success"):
+            error = answer.get("error") or {}
+            logging.error(
+                "Home Assistant refused service %s for event '%s': %s", call.name, event_name, error
+            )
+            return {
+                "success": False,
+                "message": (
+                    f"❌ Home Assistant refused **{call.name}** for event **{event_name}**: "
+                    f"{error.get('message', 'no reason given')} (`{error.get('code', 'unknown')}`)"
+                ),
+            }
+        return {
+            "success": True,
+            "message": (
+                f"✅ Called Home Assistant service **{call.name}** for event **{event_name}**.\n"
+                f"Round trip: {elapsed * 1000:.0f} ms · backend: {self.name}"
+            ),
+        }
+
+
+def create_backend(settings: HomeAssistantSettings) -> Backend:
+    return HomeAssistantBackend(settings)
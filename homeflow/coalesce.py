@@ -0,0 +1,158 @@
+"""
+Coalescing of identical IFTTT triggers.
+
+Voice recognition often delivers the same intent twice and scripts may loop
+the same action. `Coalescer` lets identical calls (same key) that arrive while
+one is in flight, or within a short window after it succeeded, share that
+call's result instead of sending another request.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+# Per-key counts kept for `most_coalesced`; the least recently coalesced keys
+# are forgotten beyond this, so distinct values cannot grow it without bound.
+MAX_TRACKED_KEYS = 1000
+
+
+class CoalescingTimeout(TimeoutError):
+    """
+    The identical call this one waited on did not finish in time. It is still
+    in flight and may or may not succeed; nothing was sent for this caller.
+    """
+
+
+class CoalescingStats(NamedTuple):
+    calls: int
+    sent: int
+    shared_in_flight: int
+    shared_in_window: int
+
+    @property
+    def coalesced(self) -> int:
+        return self.shared_in_flight + self.shared_in_window
+
+
+def _succeeded(result: Any) -> bool:
+    # Command results are dicts with a "success" flag.
+    if isinstance(result, dict):
+        return bool(result.get("success"))
+    return True
+
+
+class _Entry:
+    # An Event rather than a concurrent.futures.Future: the thin client that
+    # forwards to the daemon imports this module and should not load that
+    # package.
+    __slots__ = ("done", "result", "error", "finished_at")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.finished_at: Optional[float] = None
+
+
+class Coalescer:
+    """
+    Thread-safe single-flight cache keyed by trigger identity.
+
+    Failed calls are shared with callers that were already waiting on them,
+    but are not kept for the window, so a retry after a failure goes out.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+        max_tracked_keys: int = MAX_TRACKED_KEYS,
+    ) -> None:
+        self.window_seconds = window_seconds
+        self.max_tracked_keys = max_tracked_keys
+        self._clock = clock
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._sent = 0
+        self._shared_in_flight = 0
+        self._shared_in_window = 0
+        self._per_key: "OrderedDict[Hashable, int]" = OrderedDict()
+
+    def _prune(self, now: float) -> None:
+        expired = [
+            key for key, entry in self._entries.items()
+            if entry.finished_at is not None and now - entry.finished_at > self.window_seconds
+        ]
+        for key in expired:
+            del self._entries[key]
+
+    def call(
+        self, key: Hashable, func: Callable[[], Any], timeout: Optional[float] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Run `func` unless an identical call can be shared.
+        Returns (result, shared) where `shared` tells whether the result came
+        from another caller's request. A caller sharing an in-flight call waits
+        at most `timeout` seconds for it, then raises CoalescingTimeout.
+        """
+        with self._lock:
+            now = self._clock()
+            self._calls += 1
+            self._prune(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.finished_at is None:
+                    self._shared_in_flight += 1
+                else:
+                    self._shared_in_window += 1
+                self._per_key[key] = self._per_key.get(key, 0) + 1
+                self._per_key.move_to_end(key)
+                if len(self._per_key) > self.max_tracked_keys:
+                    self._per_key.popitem(last=False)
+                leader = False
+            else:
+                entry = self._entries[key] = _Entry()
+                self._sent += 1
+                leader = True
+
+        if not leader:
+            if not entry.done.wait(timeout):
+                raise CoalescingTimeout(f"identical call still in flight after {timeout:g} s")
+            if entry.error is not None:
+                raise entry.error
+            return entry.result, True
+
+        try:
+            result = func()
+        except BaseException as e:
+            with self._lock:
+                self._entries.pop(key, None)
+            entry.error = e
+            entry.done.set()
+            raise
+
+        with self._lock:
+            if _succeeded(result) and self.window_seconds > 0:
+                entry.finished_at = self._clock()
+            else:
+                self._entries.pop(key, None)
+        entry.result = result
+        entry.done.set()
+        return result, False
+
+    def stats(self) -> CoalescingStats:
+        with self._lock:
+            return CoalescingStats(
+                self._calls, self._sent, self._shared_in_flight, self._shared_in_window
+            )
+
+    def most_coalesced(self, limit: int = 5) -> List[Tuple[Hashable, int]]:
+        """
+        Keys that were coalesced most often, with their counts.
+        """
+        with self._lock:
+            items = list(self._per_key.items())
+        items.sort(key=lambda item: item[1], reverse=True)
+        return items[:limit]
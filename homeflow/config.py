@@ -0,0 +1,742 @@
+"""
+Validated, immutable view of `config.json`.
+
+`compile_config` turns the raw JSON dict into a `ConfigSnapshot`: every value
+is type-checked and converted once, mappings are read-only, and the scene and
+mobility action name indexes and sorted listings are built up front, as are
+the dependency graphs of macro scenes. Handlers read the snapshot instead of
+re-validating the raw dict on every call.
+
+`ConfigWatcher` polls the file's mtime and swaps in a freshly compiled
+snapshot when it changes. An edit that fails to parse or validate is logged
+and ignored, so the last good snapshot keeps running. At startup there is no
+earlier snapshot to keep, so `read_config(strict=False)` drops just the
+invalid values (their defaults apply) instead of the whole file.
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+from homeflow.backends import BACKEND_TYPES, IFTTT, HomeAssistantSettings, ServiceCall
+from homeflow.daemon import DEFAULT_RESPONSE_TIMEOUT_SECONDS, default_address
+from homeflow.logs import MODES as LOG_MODES
+from homeflow.nameindex import NameIndex, classify_mobility_action
+from homeflow.resilience import RetryPolicy
+from homeflow.statebus import DEFAULT_PORT as DEFAULT_STATE_BUS_PORT
+from homeflow.statebus import is_loopback, parse_address
+from homeflow.transport import DEFAULT_POOL_SIZE, REQUESTS, TRANSPORTS
+
+if TYPE_CHECKING:
+    from homeflow.macros import Macro
+
+DEFAULT_MAX_CONCURRENT_TOOL_CALLS = 4
+DEFAULT_RELOAD_SECONDS = 2.0
+DEFAULT_LISTING_PAGE_SIZE = 50
+
+RESPONSE_ORDERS = ("request", "completion")
+DELIVERY_MODES = ("sync", "outbox")
+
+# The patterns homeflow.coverage plans, named here as well so that reading the
+# config does not import the planner. bench_coverage checks that they agree.
+LAWNMOWER = "lawnmower"
+PERIMETER = "perimeter"
+PATROL_PATTERNS = (LAWNMOWER, PERIMETER)
+
+
+class ConfigError(ValueError):
+    """
+    Raised when config.json holds a value of the wrong type or range.
+
+    Messages start with the dotted location of the bad value
+    ("RETRY.MAX_ATTEMPTS must be ..."); `location` is that prefix, unless
+    given explicitly.
+    """
+
+    def __init__(self, message: str, location: Optional[str] = None) -> None:
+        super().__init__(message)
+        self.location = location if location is not None else message.split(" ", 1)[0].rstrip(":")
+
+
+@dataclass(frozen=True)
+class OutboxSettings:
+    path: Optional[str] = None
+    batch_size: int = 10
+    max_attempts: int = 8
+    retry_base_seconds: float = 2.0
+    retry_max_seconds: float = 300.0
+    retention_hours: float = 168.0
+
+
+@dataclass(frozen=True)
+class SchedulerSettings:
+    path: Optional[str] = None
+    concurrency: int = 2
+    misfire_grace_seconds: float = 300.0
+
+
+@dataclass(frozen=True)
+class EvChargingSettings:
+    slot_minutes: int = 15
+    horizon_hours: float = 24.0
+    import_limit_kw: float = 11.0
+    base_load_kw: float = 0.0
+    tariff: Tuple[Tuple[int, float], ...] = ((0, 1.0),)  # (minute of the day, price per kWh)
+    start_action: str = "start_ev_charging_home"
+    stop_action: str = "stop_ev_charging_home"
+    # name -> (capacity kWh, max charge kW, charger efficiency)
+    vehicles: Mapping[str, Tuple[float, float, float]] = field(
+        default_factory=lambda: MappingProxyType({})
+    )
+
+
+@dataclass(frozen=True)
+class UavPatrolSettings:
+    action: str = "uav_patrol_yard"
+    yard: Tuple[Tuple[float, float], ...] = ()  # metres; no yard, no planned route
+    keep_out: Tuple[Tuple[Tuple[float, float], ...], ...] = ()
+    home: Tuple[float, float] = (0.0, 0.0)
+    swath_m: float = 4.0
+    range_m: float = 800.0
+    pattern: str = LAWNMOWER
+    angle_degrees: Optional[float] = None
+    cache_dir: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class RateLimitSettings:
+    requests_per_second: float = 5.0
+    burst: int = 10
+    max_queue: int = 100
+
+
+@dataclass(frozen=True)
+class BatchSettings:
+    max_concurrency: int = 8
+    max_items: int = 50
+
+
+@dataclass(frozen=True)
+class DaemonSettings:
+    enabled: bool = False
+    address: str = field(default_factory=default_address)
+    autostart: bool = True
+    response_timeout_seconds: float = DEFAULT_RESPONSE_TIMEOUT_SECONDS
+
+
+@dataclass(frozen=True)
+class LoggingSettings:
+    mode: str = "queue"
+    max_bytes: int = 5 * 1024 * 1024
+    backup_count: int = 3
+    max_payload_chars: int = 2000
+    sample_every: int = 1
+
+
+@dataclass(frozen=True)
+class MetricsSettings:
+    prometheus_file: Optional[str] = None
+    dump_interval_seconds: float = 15.0
+
+
+@dataclass(frozen=True)
+class StateBusSettings:
+    enabled: bool = False
+    subscribers: Tuple[Tuple[str, int], ...] = (("127.0.0.1", DEFAULT_STATE_BUS_PORT),)
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    One compiled version of the config. Never mutated after it is built;
+    a reload produces a new snapshot with a higher `version`.
+    """
+
+    version: int = 0
+    ifttt_api_key: str = ""
+    timeout_seconds: float = 10.0
+    http_pool_size: int = DEFAULT_POOL_SIZE
+    http_transport: str = REQUESTS
+    max_concurrent_tool_calls: int = DEFAULT_MAX_CONCURRENT_TOOL_CALLS
+    tool_call_response_order: str = "request"
+    command_deadline_seconds: float = 15.0
+    adaptive_timeout: Tuple[float, float] = (1.0, 3.0)
+    retry_policy: RetryPolicy = field(default_factory=RetryPolicy)
+    circuit_breaker: Tuple[int, float] = (5, 30.0)
+    idempotent_events: FrozenSet[str] = frozenset()
+    delivery_mode: str = "sync"
+    outbox: OutboxSettings = OutboxSettings()
+    scheduler: SchedulerSettings = SchedulerSettings()
+    ev_charging: EvChargingSettings = EvChargingSettings()
+    uav_patrol: UavPatrolSettings = UavPatrolSettings()
+    coalescing: Tuple[bool, float, FrozenSet[str]] = (True, 2.0, frozenset())
+    rate_limit: Optional[RateLimitSettings] = RateLimitSettings()
+    batch: BatchSettings = BatchSettings()
+    listing_page_size: int = DEFAULT_LISTING_PAGE_SIZE
+    reload_seconds: float = DEFAULT_RELOAD_SECONDS
+    daemon: DaemonSettings = field(default_factory=DaemonSettings)
+    logging: LoggingSettings = LoggingSettings()
+    metrics: MetricsSettings = MetricsSettings()
+    state_bus: StateBusSettings = StateBusSettings()
+    backends: Mapping[str, HomeAssistantSettings] = field(default_factory=lambda: MappingProxyType({}))
+    # Event name -> BACKENDS entry; every other event goes to IFTTT.
+    backend_routes: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    scenes: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    mobility_actions: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    macros: Mapping[str, "Macro"] = field(default_factory=lambda: MappingProxyType({}))
+    sorted_scenes: Tuple[Tuple[str, str], ...] = ()
+    sorted_mobility_actions: Tuple[Tuple[str, str], ...] = ()
+    scene_index: NameIndex = field(default_factory=lambda: NameIndex({}))
+    mobility_action_index: NameIndex = field(
+        default_factory=lambda: NameIndex({}, classify_mobility_action)
+    )
+
+
+# -------------------------
+# Validation
+# -------------------------
+
+def _section(raw: Mapping[str, Any], name: str) -> Mapping[str, Any]:
+    section = raw.get(name, {})
+    if section is None:
+        return {}
+    if not isinstance(section, dict):
+        raise ConfigError(f"{name} must be an object")
+    return section
+
+
+def _number(
+    container: Mapping[str, Any],
+    key: str,
+    default: float,
+    label: str,
+    minimum: float = 0.0,
+    integer: bool = False,
+) -> Any:
+    value = container.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ConfigError(f"{label} must be a number")
+    if integer and value != int(value):
+        raise ConfigError(f"{label} must be a whole number")
+    if value < minimum:
+        raise ConfigError(f"{label} must be at least {minimum:g}")
+    return int(value) if integer else float(value)
+
+
+def _choice(
+    raw: Mapping[str, Any],
+    key: str,
+    choices: Tuple[str, ...],
+    label: Optional[str] = None,
+) -> str:
+    value = raw.get(key, choices[0])
+    if not isinstance(value, str) or value.strip().lower() not in choices:
+        raise ConfigError(f"{label or key} must be one of: {', '.join(choices)}")
+    return value.strip().lower()
+
+
+def _names(container: Mapping[str, Any], key: str, label: str) -> FrozenSet[str]:
+    values = container.get(key, [])
+    if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+        raise ConfigError(f"{label} must be a list of event names")
+    return frozenset(values)
+
+
+def _event_map(raw: Mapping[str, Any], key: str, macros: bool = False) -> Dict[str, Any]:
+    """
+    Validate a name -> IFTTT event mapping. With `macros`, object values
+    (macro definitions, checked later) are let through as well.
+    """
+    entries = raw.get(key, {})
+    if not isinstance(entries, dict):
+        raise ConfigError(f"{key} must be an object mapping names to IFTTT events")
+    for name, event in entries.items():
+        if macros and isinstance(event, dict):
+            continue
+        if not isinstance(event, str) or not event.strip():
+            raise ConfigError(f"{key}.{name} must be a non-empty IFTTT event name")
+    return dict(entries)
+
+
+def _ev_charging(raw: Mapping[str, Any], actions: Mapping[str, str]) -> EvChargingSettings:
+    section = _section(raw, "EV_CHARGING")
+
+    bands = section.get("TARIFF", {"00:00": 1.0})
+    if not isinstance(bands, dict) or not bands:
+        raise ConfigError("EV_CHARGING.TARIFF must map start times (\"HH:MM\") to prices")
+    tariff = []
+    for start in bands:
+        hour, _, minute = str(start).partition(":")
+        if not (hour.isdigit() and minute.isdigit() and int(hour) < 24 and int(minute) < 60):
+            raise ConfigError(f"EV_CHARGING.TARIFF start {start!r} must be a time \"HH:MM\"")
+        tariff.append((int(hour) * 60 + int(minute), _number(bands, start, 0, f"EV_CHARGING.TARIFF.{start}")))
+
+    roles = {}
+    for key, default in (("START_ACTION", "start_ev_charging_home"), ("STOP_ACTION", "stop_ev_charging_home")):
+        name = section.get(key, default)
+        if not isinstance(name, str) or (name not in actions and key in section):
+            raise ConfigError(f"EV_CHARGING.{key} must name one of MOBILITY_ACTIONS")
+        roles[key] = name
+
+    vehicles = _section(section, "VEHICLES")
+    profiles = {}
+    for name, spec in vehicles.items():
+        label = f"EV_CHARGING.VEHICLES.{name}"
+        if not isinstance(spec, dict):
+            raise ConfigError(f"{label} must be an object")
+        profiles[name] = (
+            _number(spec, "CAPACITY_KWH", 60, f"{label}.CAPACITY_KWH", 1),
+            _number(spec, "MAX_KW", 7.4, f"{label}.MAX_KW", 0.1),
+            _number(spec, "EFFICIENCY", 0.9, f"{label}.EFFICIENCY", 0.1),
+        )
+        if profiles[name][2] > 1:
+            raise ConfigError(f"{label}.EFFICIENCY must be at most 1")
+
+    slot_minutes = _number(section, "SLOT_MINUTES", 15, "EV_CHARGING.SLOT_MINUTES", 1, True)
+    if 1440 % slot_minutes:
+        raise ConfigError("EV_CHARGING.SLOT_MINUTES must divide a day evenly")
+    return EvChargingSettings(
+        slot_minutes=slot_minutes,
+        horizon_hours=_number(section, "HORIZON_HOURS", 24, "EV_CHARGING.HORIZON_HOURS", 1),
+        import_limit_kw=_number(section, "IMPORT_LIMIT_KW", 11, "EV_CHARGING.IMPORT_LIMIT_KW", 0.1),
+        base_load_kw=_number(section, "BASE_LOAD_KW", 0, "EV_CHARGING.BASE_LOAD_KW"),
+        tariff=tuple(sorted(tariff)),
+        start_action=roles["START_ACTION"],
+        stop_action=roles["STOP_ACTION"],
+        vehicles=MappingProxyType(profiles),
+    )
+
+
+def _point(value: Any, label: str) -> Tuple[float, float]:
+    if (
+        not isinstance(value, list)
+        or len(value) != 2
+        or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value)
+    ):
+        raise ConfigError(f"{label} must be a point [x, y] in metres")
+    return float(value[0]), float(value[1])
+
+
+def _polygon(value: Any, label: str) -> Tuple[Tuple[float, float], ...]:
+    if not isinstance(value, list) or len(value) < 3:
+        raise ConfigError(f"{label} must be a list of at least 3 points [x, y]")
+    return tuple(_point(corner, f"{label}[{i}]") for i, corner in enumerate(value))
+
+
+def _state_bus(raw: Mapping[str, Any]) -> StateBusSettings:
+    section = _section(raw, "STATE_BUS")
+    entries = section.get("SUBSCRIBERS", [f"127.0.0.1:{DEFAULT_STATE_BUS_PORT}"])
+    if not isinstance(entries, list) or not all(isinstance(entry, str) for entry in entries):
+        raise ConfigError('STATE_BUS.SUBSCRIBERS must be a list of "host:port" strings')
+    subscribers = []
+    for entry in entries:
+        try:
+            host, port = parse_address(entry)
+        except ValueError as e:
+            raise ConfigError(f"STATE_BUS.SUBSCRIBERS entry {entry!r} is not a valid address: {e}")
+        if not is_loopback(host):
+            raise ConfigError(f"STATE_BUS.SUBSCRIBERS entry {entry!r} must be a loopback address")
+        subscribers.append((host, port))
+    return StateBusSettings(
+        # Off unless asked for: any local process can bind a subscriber port.
+        enabled=bool(section.get("ENABLED", False)) and bool(subscribers),
+        subscribers=tuple(subscribers),
+    )
+
+
+def _service_call(target: Any, label: str) -> ServiceCall:
+    if not isinstance(target, dict):
+        raise ConfigError(f"{label} must be an object")
+    service = target.get("SERVICE")
+    domain, _, name = service.partition(".") if isinstance(service, str) else ("", "", "")
+    if not domain.strip() or not name.strip():
+        raise ConfigError(f'{label}.SERVICE must be a "domain.service" name')
+    data = target.get("DATA", {})
+    if not isinstance(data, dict):
+        raise ConfigError(f"{label}.DATA must be an object")
+    fields = target.get("VALUES", [])
+    if not isinstance(fields, list) or not all(isinstance(f, str) for f in fields) or len(fields) > 3:
+        raise ConfigError(f"{label}.VALUES must list up to 3 service data keys")
+    return ServiceCall(domain.strip(), name.strip(), MappingProxyType(dict(data)), tuple(fields))
+
+
+def _backends(raw: Mapping[str, Any]) -> Tuple[Mapping[str, HomeAssistantSettings], Mapping[str, str]]:
+    """
+    The enabled BACKENDS entries, and the event -> backend name routes.
+    """
+    backends: Dict[str, HomeAssistantSettings] = {}
+    routes: Dict[str, str] = {}
+    for name, entry in _section(raw, "BACKENDS").items():
+        label = f"BACKENDS.{name}"
+        if name == IFTTT:
+            raise ConfigError(f"{label}: the name {IFTTT!r} is taken by the default backend")
+        if not isinstance(entry, dict):
+            raise ConfigError(f"{label} must be an object")
+        if entry.get("TYPE") not in BACKEND_TYPES:
+            raise ConfigError(f"{label}.TYPE must be one of: {', '.join(BACKEND_TYPES)}")
+        if not entry.get("ENABLED", True):
+            continue
+
+        url = entry.get("URL")
+        if not isinstance(url, str) or urlsplit(url.strip()).scheme not in ("ws", "wss"):
+            raise ConfigError(f"{label}.URL must be a ws:// or wss:// URL")
+        token = entry.get("TOKEN")
+        if not isinstance(token, str) or not token.strip():
+            raise ConfigError(f"{label}.TOKEN must be a long-lived access token")
+        events = entry.get("EVENTS", {})
+        if not isinstance(events, dict):
+            raise ConfigError(f"{label}.EVENTS must be an object mapping event names to services")
+
+        calls = {}
+        for event, target in events.items():
+            if event in routes:
+                raise ConfigError(f"{label}.EVENTS.{event} is already routed to BACKENDS.{routes[event]}")
+            calls[event] = _service_call(target, f"{label}.EVENTS.{event}")
+            routes[event] = name
+        backends[name] = HomeAssistantSettings(
+            name=name,
+            url=url.strip(),
+            token=token.strip(),
+            timeout_seconds=_number(entry, "TIMEOUT_SECONDS", 10, f"{label}.TIMEOUT_SECONDS", 0.1),
+            events=MappingProxyType(calls),
+        )
+    return MappingProxyType(backends), MappingProxyType(routes)
+
+
+def _uav_patrol(raw: Mapping[str, Any], actions: Mapping[str, str]) -> UavPatrolSettings:
+    section = _section(raw, "UAV_PATROL")
+
+    action = section.get("ACTION", "uav_patrol_yard")
+    if not isinstance(action, str) or (action not in actions and "ACTION" in section):
+        raise ConfigError("UAV_PATROL.ACTION must name one of MOBILITY_ACTIONS")
+    keep_out = section.get("KEEP_OUT", [])
+    if not isinstance(keep_out, list):
+        raise ConfigError("UAV_PATROL.KEEP_OUT must be a list of polygons")
+    angle = section.get("ANGLE_DEGREES")
+    cache_dir = section.get("CACHE_DIR")
+    if cache_dir is not None and not isinstance(cache_dir, str):
+        raise ConfigError("UAV_PATROL.CACHE_DIR must be a string")
+
+    return UavPatrolSettings(
+        action=action,
+        yard=_polygon(section["YARD"], "UAV_PATROL.YARD") if "YARD" in section else (),
+        keep_out=tuple(_polygon(zone, f"UAV_PATROL.KEEP_OUT[{i}]") for i, zone in enumerate(keep_out)),
+        home=_point(section.get("HOME", [0, 0]), "UAV_PATROL.HOME"),
+        swath_m=_number(section, "SWATH_METERS", 4, "UAV_PATROL.SWATH_METERS", 0.1),
+        range_m=_number(section, "RANGE_METERS", 800, "UAV_PATROL.RANGE_METERS", 1),
+        pattern=_choice(section, "PATTERN", PATROL_PATTERNS, "UAV_PATROL.PATTERN"),
+        angle_degrees=None if angle is None else _number(section, "ANGLE_DEGREES", 0, "UAV_PATROL.ANGLE_DEGREES"),
+        cache_dir=os.path.expanduser(cache_dir) if cache_dir else None,
+    )
+
+
+def compile_config(raw: Mapping[str, Any], version: int = 0) -> ConfigSnapshot:
+    """
+    Validate a raw config dict and build its snapshot.
+    Raises ConfigError on the first invalid value.
+    """
+    if not isinstance(raw, dict):
+        raise ConfigError("config.json must contain a JSON object")
+
+    api_key = raw.get("IFTTT_API_KEY", "")
+    if not isinstance(api_key, str):
+        raise ConfigError("IFTTT_API_KEY must be a string")
+
+    adaptive = _section(raw, "ADAPTIVE_TIMEOUT")
+    retry = _section(raw, "RETRY")
+    breaker = _section(raw, "CIRCUIT_BREAKER")
+    outbox = _section(raw, "OUTBOX")
+    scheduler = _section(raw, "SCHEDULER")
+    coalescing = _section(raw, "COALESCING")
+    rate_limit = _section(raw, "RATE_LIMIT")
+    batch = _section(raw, "BATCH")
+    listing = _section(raw, "LISTING")
+    daemon = _section(raw, "DAEMON")
+    log = _section(raw, "LOGGING")
+    metrics = _section(raw, "METRICS")
+
+    outbox_path = outbox.get("PATH")
+    if outbox_path is not None and not isinstance(outbox_path, str):
+        raise ConfigError("OUTBOX.PATH must be a string")
+    scheduler_path = scheduler.get("PATH")
+    if scheduler_path is not None and not isinstance(scheduler_path, str):
+        raise ConfigError("SCHEDULER.PATH must be a string")
+
+    limiter: Optional[RateLimitSettings] = RateLimitSettings(
+        requests_per_second=_number(rate_limit, "REQUESTS_PER_SECOND", 5, "RATE_LIMIT.REQUESTS_PER_SECOND"),
+        burst=_number(rate_limit, "BURST", 10, "RATE_LIMIT.BURST", integer=True),
+        max_queue=_number(rate_limit, "MAX_QUEUE", 100, "RATE_LIMIT.MAX_QUEUE", integer=True),
+    )
+    if not rate_limit.get("ENABLED", True) or limiter.requests_per_second <= 0 or limiter.burst < 1:
+        limiter = None
+
+    daemon_address = daemon.get("ADDRESS")
+    if daemon_address is not None and not isinstance(daemon_address, str):
+        raise ConfigError("DAEMON.ADDRESS must be a string")
+
+    prometheus_file = metrics.get("PROMETHEUS_FILE")
+    if prometheus_file is not None and not isinstance(prometheus_file, str):
+        raise ConfigError("METRICS.PROMETHEUS_FILE must be a string")
+
+    scene_entries = _event_map(raw, "SCENES", macros=True)
+    scenes = {name: event for name, event in scene_entries.items() if isinstance(event, str)}
+    actions = _event_map(raw, "MOBILITY_ACTIONS")
+    macros = {}
+    for name, entry in scene_entries.items():
+        if isinstance(entry, dict):
+            # Only configs with macro scenes load the macro runner.
+            from homeflow.macros import MacroError, compile_macro
+
+            try:
+                macros[name] = compile_macro(name, entry, scenes, actions)
+            except MacroError as e:
+                # A macro missing one bad step would run half a routine; drop it whole.
+                raise ConfigError(str(e), location=f"SCENES.{name}") from e
+    backends, backend_routes = _backends(raw)
+
+    return ConfigSnapshot(
+        version=version,
+        ifttt_api_key=api_key.strip(),
+        timeout_seconds=_number(raw, "DEFAULT_TIMEOUT_SECONDS", 10, "DEFAULT_TIMEOUT_SECONDS", 1),
+        http_pool_size=_number(raw, "HTTP_POOL_SIZE", DEFAULT_POOL_SIZE, "HTTP_POOL_SIZE", 1, True),
+        http_transport=_choice(raw, "HTTP_TRANSPORT", TRANSPORTS),
+        max_concurrent_tool_calls=_number(
+            raw,
+            "MAX_CONCURRENT_TOOL_CALLS",
+            DEFAULT_MAX_CONCURRENT_TOOL_CALLS,
+            "MAX_CONCURRENT_TOOL_CALLS",
+            1,
+            True,
+        ),
+        tool_call_response_order=_choice(raw, "TOOL_CALL_RESPONSE_ORDER", RESPONSE_ORDERS),
+        command_deadline_seconds=_number(raw, "COMMAND_DEADLINE_SECONDS", 15, "COMMAND_DEADLINE_SECONDS", 0.1),
+        adaptive_timeout=(
+            _number(adaptive, "MIN_SECONDS", 1, "ADAPTIVE_TIMEOUT.MIN_SECONDS"),
+            _number(adaptive, "P95_MULTIPLIER", 3, "ADAPTIVE_TIMEOUT.P95_MULTIPLIER"),
+        ),
+        retry_policy=RetryPolicy(
+            max_attempts=_number(retry, "MAX_ATTEMPTS", 3, "RETRY.MAX_ATTEMPTS", 1, True),
+            base_delay=_number(retry, "BASE_DELAY_SECONDS", 0.25, "RETRY.BASE_DELAY_SECONDS"),
+            max_delay=_number(retry, "MAX_DELAY_SECONDS", 2, "RETRY.MAX_DELAY_SECONDS"),
+        ),
+        circuit_breaker=(
+            _number(breaker, "FAILURE_THRESHOLD", 5, "CIRCUIT_BREAKER.FAILURE_THRESHOLD", 1, True),
+            _number(breaker, "RESET_SECONDS", 30, "CIRCUIT_BREAKER.RESET_SECONDS"),
+        ),
+        idempotent_events=_names(raw, "IDEMPOTENT_EVENTS", "IDEMPOTENT_EVENTS"),
+        delivery_mode=_choice(raw, "DELIVERY_MODE", DELIVERY_MODES),
+        outbox=OutboxSettings(
+            path=os.path.expanduser(outbox_path) if outbox_path else None,
+            batch_size=_number(outbox, "BATCH_SIZE", 10, "OUTBOX.BATCH_SIZE", 1, True),
+            max_attempts=_number(outbox, "MAX_ATTEMPTS", 8, "OUTBOX.MAX_ATTEMPTS", 1, True),
+            retry_base_seconds=_number(outbox, "RETRY_BASE_SECONDS", 2, "OUTBOX.RETRY_BASE_SECONDS"),
+            retry_max_seconds=_number(outbox, "RETRY_MAX_SECONDS", 300, "OUTBOX.RETRY_MAX_SECONDS"),
+            retention_hours=_number(outbox, "RETENTION_HOURS", 168, "OUTBOX.RETENTION_HOURS"),
+        ),
+        scheduler=SchedulerSettings(
+            path=os.path.expanduser(scheduler_path) if scheduler_path else None,
+            concurrency=_number(scheduler, "CONCURRENCY", 2, "SCHEDULER.CONCURRENCY", 1, True),
+            misfire_grace_seconds=_number(
+                scheduler, "MISFIRE_GRACE_SECONDS", 300, "SCHEDULER.MISFIRE_GRACE_SECONDS"
+            ),
+        ),
+        ev_charging=_ev_charging(raw, actions),
+        uav_patrol=_uav_patrol(raw, actions),
+        coalescing=(
+            bool(coalescing.get("ENABLED", True)),
+            _number(coalescing, "WINDOW_SECONDS", 2, "COALESCING.WINDOW_SECONDS"),
+            _names(coalescing, "OPT_OUT_EVENTS", "COALESCING.OPT_OUT_EVENTS"),
+        ),
+        rate_limit=limiter,
+        batch=BatchSettings(
+            max_concurrency=_number(batch, "MAX_CONCURRENCY", 8, "BATCH.MAX_CONCURRENCY", 1, True),
+            max_items=_number(batch, "MAX_ITEMS", 50, "BATCH.MAX_ITEMS", 1, True),
+        ),
+        listing_page_size=_number(
+            listing, "PAGE_SIZE", DEFAULT_LISTING_PAGE_SIZE, "LISTING.PAGE_SIZE", 1, True
+        ),
+        reload_seconds=_number(raw, "CONFIG_RELOAD_SECONDS", DEFAULT_RELOAD_SECONDS, "CONFIG_RELOAD_SECONDS"),
+        logging=LoggingSettings(
+            mode=_choice(log, "MODE", LOG_MODES, "LOGGING.MODE"),
+            max_bytes=_number(log, "MAX_BYTES", 5 * 1024 * 1024, "LOGGING.MAX_BYTES", 0, True),
+            backup_count=_number(log, "BACKUP_COUNT", 3, "LOGGING.BACKUP_COUNT", 0, True),
+            max_payload_chars=_number(
+                log, "MAX_PAYLOAD_CHARS", 2000, "LOGGING.MAX_PAYLOAD_CHARS", 0, True
+            ),
+            sample_every=_number(log, "SAMPLE_EVERY", 1, "LOGGING.SAMPLE_EVERY", 1, True),
+        ),
+        metrics=MetricsSettings(
+            prometheus_file=os.path.expanduser(prometheus_file) if prometheus_file else None,
+            dump_interval_seconds=_number(
+                metrics, "DUMP_INTERVAL_SECONDS", 15, "METRICS.DUMP_INTERVAL_SECONDS", 1
+            ),
+        ),
+        state_bus=_state_bus(raw),
+        backends=backends,
+        backend_routes=backend_routes,
+        daemon=DaemonSettings(
+            enabled=bool(daemon.get("ENABLED", False)),
+            address=os.path.expanduser(daemon_address) if daemon_address else default_address(),
+            autostart=bool(daemon.get("AUTOSTART", True)),
+            response_timeout_seconds=_number(
+                daemon,
+                "RESPONSE_TIMEOUT_SECONDS",
+                DEFAULT_RESPONSE_TIMEOUT_SECONDS,
+                "DAEMON.RESPONSE_TIMEOUT_SECONDS",
+                1,
+            ),
+        ),
+        scenes=MappingProxyType(scenes),
+        mobility_actions=MappingProxyType(actions),
+        macros=MappingProxyType(macros),
+        sorted_scenes=tuple(sorted(scenes.items())),
+        sorted_mobility_actions=tuple(sorted(actions.items())),
+        # Macro scenes resolve to their Macro, plain ones to their event name.
+        scene_index=NameIndex({**scenes, **macros}),
+        mobility_action_index=NameIndex(actions, classify_mobility_action),
+    )
+
+
+def _drop(raw: Dict[str, Any], location: str) -> Optional[str]:
+    """
+    Remove the value at a dotted `location` ("RETRY.MAX_ATTEMPTS",
+    "UAV_PATROL.KEEP_OUT[1]") from `raw`, or the deepest part of it that
+    exists. Names may contain dots themselves, so the longest key that
+    matches wins. Returns what was removed, or None.
+    """
+    parts = location.split(".")
+    container: Any = raw
+    found: List[str] = []
+    parent: Optional[Dict[str, Any]] = None
+    i = 0
+    while i < len(parts) and isinstance(container, dict):
+        for j in range(len(parts), i, -1):
+            key = ".".join(parts[i:j])
+            if key not in container:
+                key = key.split("[", 1)[0]
+            if key in container:
+                parent, container = container, container[key]
+                found.append(key)
+                i = j
+                break
+        else:
+            break
+    if parent is None:
+        return None
+    del parent[found[-1]]
+    return ".".join(found)
+
+
+def compile_config_leniently(raw: Mapping[str, Any], version: int = 0) -> ConfigSnapshot:
+    """
+    Like `compile_config`, but every invalid value is logged and dropped, so
+    its default applies, instead of failing the whole config. Raises
+    ConfigError only when nothing can be salvaged (not a JSON object).
+    """
+    if not isinstance(raw, dict):
+        return compile_config(raw, version)
+    raw = copy.deepcopy(raw)
+    while True:
+        try:
+            return compile_config(raw, version)
+        except ConfigError as e:
+            # Each pass removes a key, so this ends.
+            dropped = _drop(raw, e.location)
+            if dropped is None:
+                raise
+            logging.error("Ignoring invalid config.json value %s (its default applies): %s", dropped, e)
+
+
+def read_config(path: str, version: int = 0, strict: bool = True) -> ConfigSnapshot:
+    """
+    Read, parse and compile a config file. Raises OSError, ValueError
+    (including json.JSONDecodeError) or ConfigError. With `strict` off,
+    invalid values are dropped instead (see `compile_config_leniently`).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    return compile_config(raw, version) if strict else compile_config_leniently(raw, version)
+
+
+# -------------------------
+# Hot Reload
+# -------------------------
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ConfigWatcher:
+    """
+    Poll a config file and hand every successfully compiled new version to
+    `on_reload`. Editors that write in several steps simply trigger another
+    reload on the next poll.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        current: Callable[[], ConfigSnapshot],
+        on_reload: Callable[[ConfigSnapshot], None],
+        interval: float = DEFAULT_RELOAD_SECONDS,
+    ) -> None:
+        self.path = path
+        self.interval = interval
+        self._current = current
+        self._on_reload = on_reload
+        self._signature = _file_signature(path)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(
+                target=self._run, name="homeflow-config", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def check(self) -> bool:
+        """
+        Reload if the file changed since the last check.
+        Returns True when a new snapshot was installed.
+        """
+        signature = _file_signature(self.path)
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            snapshot = read_config(self.path, self._current().version + 1)
+        except (OSError, ValueError) as e:
+            logging.error(
+                "Ignoring config change in %s, keeping version %d: %s",
+                self.path,
+                self._current().version,
+                e,
+            )
+            return False
+        self._on_reload(snapshot)
+        logging.info("Config reloaded from %s (version %d)", self.path, snapshot.version)
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logging.exception("Config watcher failed")
@@ -0,0 +1,577 @@
+"""
+Coverage paths for UAV yard patrols.
+
+A yard is a polygon in metres (x east, y north) with optional keep-out
+polygons inside it (a pool, a neighbour's tree) that are not flown over. Two
+patterns are planned:
+
+- lawnmower: parallel sweeps `swath` metres apart. Each sweep line is cut
+  against every yard and keep-out edge at once, the pieces are grouped into
+  cells that can each be swept back and forth without crossing a keep-out,
+  and the cells are visited nearest first. Every yard edge direction is tried as the sweep
+  angle and the shortest route wins, unless an angle is given. Legs between
+  cells, and to and from home, detour around keep-outs.
+- perimeter: one loop half a swath inside the yard boundary.
+
+Routes start and end at `home`. When the whole route is longer than the
+battery allows (`range_m`), it is split into sorties: each one returns home
+while it still can and the next resumes where it stopped.
+
+Planning is deterministic, so `PathCache` keeps finished plans on disk, one
+JSON file per hash of the inputs; a repeated patrol reads its plan back
+instead of planning again.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+Point = Tuple[float, float]
+Polygon = Tuple[Point, ...]
+
+LAWNMOWER = "lawnmower"
+PERIMETER = "perimeter"
+PATTERNS = (LAWNMOWER, PERIMETER)
+
+# Part of every cache key: bump when a change to the planner changes its output.
+PLANNER_VERSION = 1
+
+_EPSILON = 1e-6
+
+
+class CoverageError(ValueError):
+    """
+    The yard, keep-outs or limits cannot be planned.
+    """
+
+
+@dataclass(frozen=True)
+class CoverageRequest:
+    yard: Polygon
+    home: Point
+    swath_m: float
+    range_m: float
+    keep_out: Tuple[Polygon, ...] = ()
+    pattern: str = LAWNMOWER
+    angle_degrees: Optional[float] = None  # sweep direction; None tries each yard edge
+
+    def key(self) -> str:
+        """
+        Hash of everything that determines the plan.
+        """
+        fields = asdict(self)
+        # 30 and 30.0 are the same yard.
+        fields["yard"] = [[float(x), float(y)] for x, y in self.yard]
+        fields["keep_out"] = [[[float(x), float(y)] for x, y in polygon] for polygon in self.keep_out]
+        fields["home"] = [float(v) for v in self.home]
+        fields["swath_m"], fields["range_m"] = float(self.swath_m), float(self.range_m)
+        if self.angle_degrees is not None:
+            fields["angle_degrees"] = float(self.angle_degrees)
+        text = json.dumps([PLANNER_VERSION, fields], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+
+
+@dataclass(frozen=True)
+class CoveragePlan:
+    key: str
+    pattern: str
+    angle_degrees: float
+    sorties: Tuple[Tuple[Point, ...], ...]  # each starts and ends at home
+    sweep_m: float  # metres flown over the area itself, not in transit
+
+    @property
+    def total_m(self) -> float:
+        return sum(_path_length(sortie) for sortie in self.sorties)
+
+    @property
+    def waypoints(self) -> List[Point]:
+        """
+        Every sortie in order, with home only once between two sorties.
+        """
+        points: List[Point] = []
+        for sortie in self.sorties:
+            points.extend(sortie[1:] if points else sortie)
+        return points
+
+    def encode(self) -> str:
+        """
+        Compact text for an IFTTT value: "x,y x,y ...", sorties separated by
+        " | ", coordinates in metres to one decimal.
+        """
+        return " | ".join(
+            " ".join(f"{x:.1f},{y:.1f}" for x, y in sortie) for sortie in self.sorties
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "pattern": self.pattern,
+            "angle_degrees": self.angle_degrees,
+            "sorties": [[list(point) for point in sortie] for sortie in self.sorties],
+            "sweep_m": self.sweep_m,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CoveragePlan":
+        return cls(
+            key=data["key"],
+            pattern=data["pattern"],
+            angle_degrees=float(data["angle_degrees"]),
+            sorties=tuple(tuple((float(x), float(y)) for x, y in sortie) for sortie in data["sorties"]),
+            sweep_m=float(data["sweep_m"]),
+        )
+
+
+# -------------------------
+# Geometry
+# -------------------------
+
+def _distance(a: Point, b: Point) -> float:
+    return math.hypot(b[0] - a[0], b[1] - a[1])
+
+
+def _path_length(points: Sequence[Point]) -> float:
+    return sum(_distance(a, b) for a, b in zip(points, points[1:]))
+
+
+def _signed_area(polygon: Sequence[Point]) -> float:
+    return sum(
+        x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(polygon, list(polygon[1:]) + [polygon[0]])
+    ) / 2
+
+
+def _rotate(points: Sequence[Point], radians: float) -> List[Point]:
+    """
+    Rotate by -radians, so a sweep at that angle becomes horizontal.
+    """
+    cos, sin = math.cos(radians), math.sin(radians)
+    return [(x * cos + y * sin, -x * sin + y * cos) for x, y in points]
+
+
+def _unrotate(points: Sequence[Point], radians: float) -> List[Point]:
+    return _rotate(points, -radians)
+
+
+def _edges(polygons: Sequence[Sequence[Point]]) -> List[Tuple[float, float, float, float]]:
+    edges = []
+    for polygon in polygons:
+        for (x0, y0), (x1, y1) in zip(polygon, list(polygon[1:]) + [polygon[0]]):
+            if y0 != y1:  # horizontal edges never cross a horizontal sweep
+                edges.append((x0, y0, x1, y1))
+    return edges
+
+
+def _sweep_rows(
+    edges: List[Tuple[float, float, float, float]], ys: List[float]
+) -> List[List[Tuple[float, float]]]:
+    """
+    For each horizontal line y, the (x start, x end) pieces inside the yard
+    and outside every keep-out (even-odd rule over all edges).
+    """
+    rows: List[List[Tuple[float, float]]] = []
+    for y in ys:
+        # Half-open on y so a line through a vertex counts it once.
+        row = sorted(
+            x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+            for x0, y0, x1, y1 in edges
+            if y0 <= y < y1 or y1 <= y < y0
+        )
+        rows.append([(row[i], row[i + 1]) for i in range(0, len(row) - 1, 2)])
+    return [[piece for piece in row if piece[1] - piece[0] > _EPSILON] for row in rows]
+
+
+def _cells(rows: List[List[Tuple[float, float]]]) -> List[List[Tuple[int, Tuple[float, float]]]]:
+    """
+    Group sweep pieces into cells: runs of rows where each piece overlaps
+    exactly one piece of the next row and nothing else, so the cell can be
+    swept back and forth without leaving it.
+    """
+    cells: List[List[Tuple[int, Tuple[float, float]]]] = []
+    open_cells: List[int] = []  # indexes into cells ending on the previous row
+    for index, row in enumerate(rows):
+        previous = [cells[c][-1][1] for c in open_cells]
+        overlaps = [
+            [p for p, before in enumerate(previous) if piece[0] < before[1] and before[0] < piece[1]]
+            for piece in row
+        ]
+        continued: List[int] = []
+        for piece, matches in zip(row, overlaps):
+            if len(matches) == 1 and sum(matches[0] in other for other in overlaps) == 1:
+                cell = open_cells[matches[0]]
+            else:
+                cell = len(cells)
+                cells.append([])
+            cells[cell].append((index, piece))
+            continued.append(cell)
+        open_cells = continued
+    return cells
+
+
+def _sweep_cell(
+    cell: List[Tuple[int, Tuple[float, float]]], ys: List[float], from_top: bool, from_right: bool
+) -> List[Point]:
+    pieces = list(reversed(cell)) if from_top else cell
+    points: List[Point] = []
+    rightward = not from_right
+    for index, (x0, x1) in pieces:
+        y = ys[index]
+        start, end = (x0, x1) if rightward else (x1, x0)
+        if points:
+            # Climb to the next row where both rows are inside the cell, so
+            # the connector does not cut a corner of the yard.
+            previous_x, previous_y = points[-1]
+            x = min(previous_x, start) if not rightward else max(previous_x, start)
+            if x != previous_x:
+                points.append((x, previous_y))
+            if x != start:
+                points.append((x, y))
+        points.extend([(start, y), (end, y)])
+        rightward = not rightward
+    return points
+
+
+def _lawnmower(request: CoverageRequest, radians: float) -> Tuple[List[Point], float]:
+    """
+    The route (without home at either end) for sweeps at `radians`, and its
+    sweep length.
+    """
+    yard = _rotate(request.yard, radians)
+    keep_out = [_rotate(polygon, radians) for polygon in request.keep_out]
+    home = _rotate([request.home], radians)[0]
+
+    low = min(y for _, y in yard)
+    height = max(y for _, y in yard) - low
+    lines = max(1, math.ceil(height / request.swath_m - _EPSILON))
+    ys = [low + (i + 0.5) * height / lines for i in range(lines)]
+    cells = _cells(_sweep_rows(_edges([yard] + keep_out), ys))
+
+    route: List[Point] = []
+    position = home
+    remaining = list(range(len(cells)))
+    while remaining:
+        # Nearest cell corner next; each corner fixes where the sweep starts.
+        best = None
+        for c in remaining:
+            for from_top in (False, True):
+                index, (x0, x1) = cells[c][-1 if from_top else 0]
+                for from_right, x in ((False, x0), (True, x1)):
+                    gap = _distance(position, (x, ys[index]))
+                    if best is None or gap < best[0]:
+                        best = (gap, c, from_top, from_right)
+        assert best is not None
+        _, c, from_top, from_right = best
+        remaining.remove(c)
+        route.extend(_sweep_cell(cells[c], ys, from_top, from_right))
+        position = route[-1]
+
+    sweep = sum(x1 - x0 for cell in cells for _, (x0, x1) in cell)
+    return _unrotate(route, radians), sweep
+
+
+def _offset_polygon(polygon: Sequence[Point], distance: float) -> List[Point]:
+    """
+    Move every edge `distance` inwards (outwards when negative), with mitred
+    corners capped at three times the distance so sharp corners do not
+    shoot out.
+    """
+    inward = 1.0 if _signed_area(polygon) > 0 else -1.0  # left of each edge when counter-clockwise
+    corners: List[Point] = []
+    for i, (x, y) in enumerate(polygon):
+        (px, py), (nx, ny) = polygon[i - 1], polygon[(i + 1) % len(polygon)]
+        normals = []
+        for (ax, ay), (bx, by) in (((px, py), (x, y)), ((x, y), (nx, ny))):
+            length = math.hypot(bx - ax, by - ay) or 1.0
+            normals.append((-(by - ay) / length * inward, (bx - ax) / length * inward))
+        mx, my = normals[0][0] + normals[1][0], normals[0][1] + normals[1][1]
+        size = math.hypot(mx, my)
+        if size < _EPSILON:
+            mx, my, scale = normals[1][0], normals[1][1], distance
+        else:
+            mx, my = mx / size, my / size
+            scale = distance / max(mx * normals[1][0] + my * normals[1][1], 1 / 3)
+        corners.append((x + mx * scale, y + my * scale))
+    return corners
+
+
+def _perimeter(request: CoverageRequest) -> Tuple[List[Point], float]:
+    """
+    The yard boundary moved half a swath inwards, starting at the corner
+    nearest home.
+    """
+    loop = _offset_polygon(request.yard, request.swath_m / 2)
+    start = min(range(len(loop)), key=lambda i: _distance(request.home, loop[i]))
+    route = loop[start:] + loop[: start + 1]
+    return route, _path_length(route)
+
+
+def _crosses(a: Point, b: Point, c: Point, d: Point) -> bool:
+    """
+    Whether segments ab and cd cross properly (touching does not count).
+    """
+    def side(p: Point, q: Point, r: Point) -> float:
+        return (q[0] - p[0]) * (r[1] - p[1]) - (q[1] - p[1]) * (r[0] - p[0])
+
+    d1, d2 = side(c, d, a), side(c, d, b)
+    d3, d4 = side(a, b, c), side(a, b, d)
+    return d1 * d2 < -_EPSILON and d3 * d4 < -_EPSILON
+
+
+def _inside(point: Point, polygon: Sequence[Point]) -> bool:
+    x, y = point
+    inside = False
+    for (x0, y0), (x1, y1) in zip(polygon, list(polygon[1:]) + [polygon[0]]):
+        if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            inside = not inside
+    return inside
+
+
+class _Transit:
+    """
+    Straight legs between two points, bent around keep-out zones where the
+    straight line would cross one: shortest path over the zones' corners
+    (pushed out by `margin`) that can see each other.
+    """
+
+    def __init__(self, zones: Sequence[Polygon], margin: float) -> None:
+        self.zones = [list(zone) for zone in zones]
+        self.boxes = [
+            (min(x for x, _ in zone), min(y for _, y in zone), max(x for x, _ in zone), max(y for _, y in zone))
+            for zone in zones
+        ]
+        self.corners = [corner for zone in zones for corner in _offset_polygon(zone, -margin)]
+        self._paths: Dict[Tuple[Point, Point], List[Point]] = {}
+        self._corner_views: Dict[Tuple[int, int], bool] = {}
+
+    def _blocked(self, a: Point, b: Point) -> bool:
+        low_x, high_x = min(a[0], b[0]), max(a[0], b[0])
+        low_y, high_y = min(a[1], b[1]), max(a[1], b[1])
+        middle = ((a[0] + b[0]) / 2, (a[1] + b[1]) / 2)
+        for zone, (x0, y0, x1, y1) in zip(self.zones, self.boxes):
+            if high_x < x0 or low_x > x1 or high_y < y0 or low_y > y1:
+                continue
+            if _inside(middle, zone):
+                return True
+            for c, d in zip(zone, zone[1:] + zone[:1]):
+                if _crosses(a, b, c, d):
+                    return True
+        return False
+
+    def path(self, a: Point, b: Point) -> List[Point]:
+        """
+        The corners to fly through between `a` and `b` (often none).
+        """
+        if not self.zones or not self._blocked(a, b):
+            return []
+        cached = self._paths.get((a, b))
+        if cached is not None:
+            return cached
+
+        nodes = [a, b] + self.corners
+        best = {0: 0.0}
+        previous: Dict[int, int] = {}
+        done = set()
+        while True:
+            open_nodes = [(cost, n) for n, cost in best.items() if n not in done]
+            if not open_nodes:
+                corners: List[Point] = []  # no way round; fly straight
+                break
+            cost, node = min(open_nodes)
+            if node == 1:
+                corners = []
+                while previous.get(node, 0) != 0:
+                    node = previous[node]
+                    corners.append(nodes[node])
+                corners.reverse()
+                break
+            done.add(node)
+            for other in range(1, len(nodes)):
+                if other in done or not self._sees(nodes, node, other):
+                    continue
+                through = cost + _distance(nodes[node], nodes[other])
+                if through < best.get(other, math.inf):
+                    best[other] = through
+                    previous[other] = node
+        self._paths[(a, b)] = corners
+        return corners
+
+    def _sees(self, nodes: List[Point], i: int, j: int) -> bool:
+        # Corners (nodes from 2 on) never move, so their views are kept.
+        if i < 2 or j < 2:
+            return not self._blocked(nodes[i], nodes[j])
+        pair = (min(i, j), max(i, j))
+        seen = self._corner_views.get(pair)
+        if seen is None:
+            seen = self._corner_views[pair] = not self._blocked(nodes[i], nodes[j])
+        return seen
+
+    def length(self, a: Point, b: Point) -> float:
+        return _path_length([a] + self.path(a, b) + [b])
+
+    def route(self, points: Sequence[Point]) -> List[Point]:
+        routed: List[Point] = []
+        for point in points:
+            if routed:
+                routed.extend(self.path(routed[-1], point))
+            routed.append(point)
+        return routed
+
+
+def _split_sorties(
+    route: List[Point], home: Point, range_m: float, transit: _Transit
+) -> List[Tuple[Point, ...]]:
+    """
+    Cut the route into sorties that each return home within `range_m`.
+    """
+    sorties: List[Tuple[Point, ...]] = []
+    current: List[Point] = [home]
+    position, flown, fresh = home, 0.0, True
+    i = 0
+    while i < len(route):
+        target = route[i]
+        leg = _distance(position, target)
+        if flown + leg + transit.length(target, home) <= range_m + _EPSILON:
+            current.append(target)
+            position, flown, fresh = target, flown + leg, False
+            i += 1
+            continue
+
+        # Go as far towards the target as still leaves enough to get home.
+        low, high = 0.0, 1.0
+        for _ in range(40):
+            t = (low + high) / 2
+            point = (position[0] + (target[0] - position[0]) * t, position[1] + (target[1] - position[1]) * t)
+            if flown + leg * t + transit.length(point, home) <= range_m:
+                low = t
+            else:
+                high = t
+        if leg * low > _EPSILON:
+            position = (position[0] + (target[0] - position[0]) * low, position[1] + (target[1] - position[1]) * low)
+            current.append(position)
+        elif fresh:
+            raise CoverageError(
+                f"A range of {range_m:g} m cannot reach ({target[0]:.1f}, {target[1]:.1f}) and return home"
+            )
+        current.extend(transit.path(position, home) + [home])
+        sorties.append(tuple(current))
+        # The next sortie flies back to where this one stopped.
+        current = [home] + transit.path(home, position) + ([position] if position != home else [])
+        flown, fresh = _path_length(current), True
+    current.extend(transit.path(current[-1], home) + [home])
+    sorties.append(tuple(current))
+    return sorties
+
+
+def _validate(request: CoverageRequest) -> None:
+    if request.pattern not in PATTERNS:
+        raise CoverageError(f"Unknown pattern {request.pattern!r}; use one of: {', '.join(PATTERNS)}")
+    if len(request.yard) < 3 or abs(_signed_area(request.yard)) < _EPSILON:
+        raise CoverageError("The yard needs at least 3 corners enclosing an area")
+    if any(len(polygon) < 3 for polygon in request.keep_out):
+        raise CoverageError("Each keep-out zone needs at least 3 corners")
+    if request.swath_m <= 0 or request.range_m <= 0:
+        raise CoverageError("The swath width and battery range must be positive")
+
+
+def plan_coverage(request: CoverageRequest) -> CoveragePlan:
+    """
+    Plan `request` from scratch. Raises CoverageError.
+    """
+    _validate(request)
+    if request.pattern == PERIMETER:
+        route, sweep = _perimeter(request)
+        angle = 0.0
+    else:
+        if request.angle_degrees is not None:
+            angles = [request.angle_degrees % 180]
+        else:
+            yard = request.yard
+            angles = sorted({
+                round(math.degrees(math.atan2(b[1] - a[1], b[0] - a[0])) % 180, 6)
+                for a, b in zip(yard, list(yard[1:]) + [yard[0]])
+            })
+        best = None
+        for angle in angles:
+            route, sweep = _lawnmower(request, math.radians(angle))
+            length = _path_length([request.home] + route + [request.home])
+            if best is None or length < best[0] - _EPSILON:
+                best = (length, angle, route, sweep)
+        assert best is not None
+        _, angle, route, sweep = best
+        if not route:
+            raise CoverageError("The keep-out zones leave nothing of the yard to cover")
+
+    transit = _Transit(request.keep_out, margin=request.swath_m / 4)
+    route = transit.route([request.home] + route)[1:]
+    return CoveragePlan(
+        key=request.key(),
+        pattern=request.pattern,
+        angle_degrees=angle,
+        sorties=tuple(_split_sorties(route, request.home, request.range_m, transit)),
+        sweep_m=sweep,
+    )
+
+
+# -------------------------
+# Cache
+# -------------------------
+
+class PathCache:
+    """
+    Finished plans on disk under `directory`, one `<key>.json` per request,
+    with the ones used by this process also kept in memory.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        # Keyed by the request itself: cheaper to hash than computing key().
+        self._memory: Dict[CoverageRequest, CoveragePlan] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, request: CoverageRequest) -> Optional[CoveragePlan]:
+        with self._lock:
+            plan = self._memory.get(request)
+        if plan is not None:
+            return plan
+        key = request.key()
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                plan = CoveragePlan.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning("Ignoring unreadable cached path %s: %s", key, e)
+            return None
+        with self._lock:
+            self._memory[request] = plan
+        return plan
+
+    def put(self, request: CoverageRequest, plan: CoveragePlan) -> None:
+        with self._lock:
+            self._memory[request] = plan
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{self._path(plan.key)}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(plan.to_dict(), f)
+            os.replace(temp_path, self._path(plan.key))
+        except OSError as e:
+            logging.error("Failed to cache path %s: %s", plan.key, e)
+
+    def plan(self, request: CoverageRequest) -> Tuple[CoveragePlan, bool]:
+        """
+        The plan for `request` and whether it came from the cache.
+        """
+        plan = self.get(request)
+        if plan is not None:
+            return plan, True
+        plan = plan_coverage(request)
+        self.put(request, plan)
+        return plan, False
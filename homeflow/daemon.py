@@ -0,0 +1,293 @@
+"""
+Long-lived daemon mode and the thin client that forwards to it.
+
+G-Assist may start the plugin once per command, which throws away warm
+connections, the config snapshot, caches and queued work every time.
+`python plugin.py --daemon` keeps one process alive that owns them and
+listens on a local Unix domain socket (a named pipe on Windows). A
+short-lived plugin process then just forwards each `<<END>>` frame to the
+daemon and relays the responses.
+
+Connections are authenticated with a random key stored next to the socket
+(`~/.homeflow/daemon.key`, readable by the current user only), so other
+local users cannot drive the daemon.
+
+Wire protocol, one `multiprocessing.connection` message each:
+
+- client -> daemon: the raw command frame (UTF-8 JSON, without `<<END>>`)
+- daemon -> client: b"R" + one response payload, repeated per tool call,
+  then b"E0", or b"E1" when the command asked for a shutdown.
+- client -> daemon: b"\\0stop" asks the daemon itself to stop (`plugin.py
+  --stop-daemon`), answered with b"E1". This is the graceful stop on
+  Windows, where a detached daemon has no console and no SIGTERM.
+"""
+
+import logging
+import os
+import sys
+import threading
+from typing import Any, Callable, List, Optional
+
+DAEMON_DIR = os.path.join(os.path.expanduser("~"), ".homeflow")
+AUTHKEY_PATH = os.path.join(DAEMON_DIR, "daemon.key")
+DEFAULT_RESPONSE_TIMEOUT_SECONDS = 60.0
+
+_RESPONSE = b"R"
+_END = b"E0"
+_END_SHUTDOWN = b"E1"
+_STOP = b"\0stop"
+
+
+class DaemonUnavailable(ConnectionError):
+    """
+    The command could not be handed to the daemon; it has not run there.
+    """
+
+
+class DaemonConnectionLost(ConnectionError):
+    """
+    The daemon stopped answering after it received a command, which may or
+    may not have run.
+    """
+
+
+def default_address() -> str:
+    if sys.platform == "win32":
+        user = os.environ.get("USERNAME", "user")
+        return rf"\\.\pipe\homeflow-daemon-{user}"
+    return os.path.join(DAEMON_DIR, "daemon.sock")
+
+
+def _address_family(address: str) -> str:
+    return "AF_PIPE" if address.startswith("\\\\") else "AF_UNIX"
+
+
+def load_authkey(path: str = AUTHKEY_PATH) -> bytes:
+    """
+    Read the shared connection key, creating it (mode 0600) on first use.
+    """
+    try:
+        with open(path, "rb") as f:
+            key = f.read()
+        if len(key) >= 32:
+            return key
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    key = os.urandom(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+class DaemonServer:
+    """
+    Accepts client connections on `address` and hands every received frame
+    to `handle(frame, send)`, which calls `send(payload)` once per response
+    and returns True when the command asked for a shutdown. Each client
+    connection is served on its own thread. A stop request calls `on_stop`.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        authkey: bytes,
+        handle: Callable[[str, Callable[[str], None]], bool],
+        on_stop: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.address = address
+        self._authkey = authkey
+        self._handle = handle
+        self._on_stop = on_stop
+        self._listener: Optional[Any] = None
+        self._closed = threading.Event()
+
+    def start(self) -> None:
+        from multiprocessing.connection import Listener
+
+        family = _address_family(self.address)
+        if family == "AF_UNIX":
+            os.makedirs(os.path.dirname(self.address) or ".", mode=0o700, exist_ok=True)
+            self._remove_stale_socket()
+        self._listener = Listener(self.address, family=family, authkey=self._authkey)
+        threading.Thread(target=self._accept_loop, name="homeflow-daemon", daemon=True).start()
+        logging.info("Daemon listening on %s", self.address)
+
+    def _remove_stale_socket(self) -> None:
+        """
+        A socket file left behind by a daemon that died is unlinked; one that
+        still accepts connections belongs to a running daemon.
+        """
+        if not os.path.exists(self.address):
+            return
+        import socket
+
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.address)
+        except OSError:
+            os.unlink(self.address)
+        else:
+            raise OSError(f"another daemon is already listening on {self.address}")
+        finally:
+            probe.close()
+
+    def _accept_loop(self) -> None:
+        assert self._listener is not None
+        while not self._closed.is_set():
+            try:
+                connection = self._listener.accept()
+            except Exception as e:
+                if self._closed.is_set():
+                    return
+                # Failed authentication, or a client (e.g. another daemon
+                # probing the socket) that hung up during the handshake.
+                logging.info("Daemon dropped a connection: %r", e)
+                continue
+            threading.Thread(
+                target=self._serve_client,
+                args=(connection,),
+                name="homeflow-daemon-client",
+                daemon=True,
+            ).start()
+
+    def _serve_client(self, connection: Any) -> None:
+        def send(payload: str) -> None:
+            connection.send_bytes(_RESPONSE + payload.encode("utf-8"))
+
+        with connection:
+            while not self._closed.is_set():
+                try:
+                    message = connection.recv_bytes()
+                except (EOFError, OSError):
+                    return
+                if message == _STOP and self._on_stop is not None:
+                    logging.info("Daemon stop requested by a client.")
+                    self._on_stop()
+                    try:
+                        connection.send_bytes(_END_SHUTDOWN)
+                    except OSError:
+                        pass
+                    return
+                frame = message.decode("utf-8", errors="replace")
+                try:
+                    shutdown = self._handle(frame, send)
+                    connection.send_bytes(_END_SHUTDOWN if shutdown else _END)
+                except (EOFError, OSError):
+                    return
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+
+class DaemonClient:
+    """
+    Connection from a short-lived plugin process to the daemon.
+    """
+
+    def __init__(self, connection: Any, address: str, response_timeout: float) -> None:
+        self._connection = connection
+        self.address = address
+        self.response_timeout = response_timeout
+
+    @classmethod
+    def connect(
+        cls,
+        address: str,
+        authkey: bytes,
+        response_timeout: float = DEFAULT_RESPONSE_TIMEOUT_SECONDS,
+    ) -> Optional["DaemonClient"]:
+        """
+        Connect to a running daemon, or return None when none is listening.
+        """
+        if _address_family(address) == "AF_UNIX" and not os.path.exists(address):
+            return None
+        from multiprocessing.connection import AuthenticationError, Client
+
+        try:
+            connection = Client(address, family=_address_family(address), authkey=authkey)
+        except (OSError, EOFError, AuthenticationError) as e:
+            logging.info("No daemon reachable at %s: %s", address, e)
+            return None
+        return cls(connection, address, response_timeout)
+
+    def forward(self, frame: str, on_response: Callable[[str], None]) -> bool:
+        """
+        Send one command frame and pass each response payload to
+        `on_response` as it arrives. Returns True when the command asked for
+        a shutdown.
+        """
+        try:
+            self._connection.send_bytes(frame.encode("utf-8"))
+        except OSError as e:
+            raise DaemonUnavailable(str(e)) from e
+
+        while True:
+            try:
+                if not self._connection.poll(self.response_timeout):
+                    raise DaemonConnectionLost(
+                        f"no answer from the daemon within {self.response_timeout:g} s"
+                    )
+                message = self._connection.recv_bytes()
+            except (EOFError, OSError) as e:
+                raise DaemonConnectionLost(str(e) or "daemon closed the connection") from e
+            if message.startswith(_RESPONSE):
+                on_response(message[len(_RESPONSE):].decode("utf-8", errors="replace"))
+            else:
+                return message == _END_SHUTDOWN
+
+    def request_stop(self) -> bool:
+        """
+        Ask the daemon to stop. Returns True once it has acknowledged.
+        """
+        try:
+            self._connection.send_bytes(_STOP)
+            if not self._connection.poll(self.response_timeout):
+                return False
+            return self._connection.recv_bytes() == _END_SHUTDOWN
+        except (EOFError, OSError):
+            return False
+
+    def close(self) -> None:
+        try:
+            self._connection.close()
+        except OSError:
+            pass
+
+
+def daemon_command(extra_args: Optional[List[str]] = None) -> List[str]:
+    """
+    Command line that starts this plugin as a daemon, frozen (PyInstaller)
+    executable or plain script alike.
+    """
+    if getattr(sys, "frozen", False):
+        args = [sys.executable]
+    else:
+        args = [sys.executable, os.path.abspath(sys.argv[0])]
+    return args + ["--daemon"] + list(extra_args or [])
+
+
+def spawn_daemon(args: List[str]) -> None:
+    """
+    Start a detached daemon process that outlives this one.
+    """
+    import subprocess
+
+    options: dict = {
+        "stdin": subprocess.DEVNULL,
+        "stdout": subprocess.DEVNULL,
+        "stderr": subprocess.DEVNULL,
+        "close_fds": True,
+    }
+    if sys.platform == "win32":
+        options["creationflags"] = (
+            subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        )
+    else:
+        options["start_new_session"] = True
+    subprocess.Popen(args, **options)
+    logging.info("Started a HomeFlow daemon: %s", " ".join(args))
@@ -0,0 +1,180 @@
+"""
+Asyncio plumbing for the plugin main loop.
+
+`FrameStream` delivers `<<END>>` frames from stdin through the event loop:
+the loop is woken only when bytes arrive, and end of input is reported as a
+final None instead of being polled for. `to_async` adapts the existing
+synchronous `*_command` handlers into coroutines that run on an executor, so a
+slow IFTTT call never stops the loop from reading the next frame.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import stat
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Any, Awaitable, Callable, Optional
+
+from homeflow.framing import DEFAULT_CHUNK_SIZE, FrameReader
+
+
+class _FrameProtocol(asyncio.Protocol):
+    """
+    Feeds bytes into a FrameReader and forwards complete frames to a queue.
+    `on_read`, if given, is passed the seconds spent framing each chunk.
+    """
+
+    def __init__(
+        self,
+        reader: FrameReader,
+        queue: "asyncio.Queue[Optional[str]]",
+        on_read: Optional[Callable[[float], None]] = None,
+    ) -> None:
+        self._reader = reader
+        self._queue = queue
+        self._on_read = on_read
+
+    def _drain(self) -> None:
+        while self._reader.pending():
+            self._queue.put_nowait(self._reader.pop_frame())
+
+    def data_received(self, data: bytes) -> None:
+        if self._on_read is None:
+            self._reader.feed(data)
+            self._drain()
+            return
+        started = time.perf_counter()
+        self._reader.feed(data)
+        self._drain()
+        self._on_read(time.perf_counter() - started)
+
+    def eof_received(self) -> bool:
+        if not self._reader.eof:
+            self._reader.feed_eof()
+            self._drain()
+            self._queue.put_nowait(None)
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if exc is not None:
+            logging.error("stdin pipe closed with error: %s", exc)
+        self.eof_received()
+
+
+def _is_pollable(fd: int) -> bool:
+    if os.name == "nt":
+        return False
+    try:
+        mode = os.fstat(fd).st_mode
+    except OSError:
+        return False
+    return stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode)
+
+
+class FrameStream:
+    """
+    Async source of stdin frames.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        on_read: Optional[Callable[[float], None]] = None,
+    ) -> None:
+        self._chunk_size = chunk_size
+        self._queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        self._protocol = _FrameProtocol(FrameReader(), self._queue, on_read)
+        self._transport: Optional[asyncio.BaseTransport] = None
+        self._closed = False
+
+    async def start(self, fd: int) -> None:
+        """
+        Start delivering frames read from the file descriptor `fd`.
+
+        Pipes and sockets are registered directly with the event loop.
+        Terminals, files, devices and Windows anonymous pipes (which the
+        proactor loop cannot watch) are read by a dedicated thread that hands
+        bytes to the loop.
+        """
+        loop = asyncio.get_running_loop()
+        if _is_pollable(fd):
+            # The transport closes its pipe when done, so give it a duplicate.
+            pipe = os.fdopen(os.dup(fd), "rb", buffering=0)
+            try:
+                self._transport, _ = await loop.connect_read_pipe(
+                    lambda: self._protocol, pipe
+                )
+                return
+            except (NotImplementedError, OSError, ValueError) as e:
+                pipe.close()
+                logging.info("stdin is not watchable by the event loop (%s); using a reader thread", e)
+
+        thread = threading.Thread(
+            target=self._pump,
+            args=(loop, fd),
+            name="homeflow-stdin",
+            daemon=True,
+        )
+        thread.start()
+
+    def _pump(self, loop: asyncio.AbstractEventLoop, fd: int) -> None:
+        try:
+            while not self._closed:
+                data = os.read(fd, self._chunk_size)
+                if not data:
+                    break
+                loop.call_soon_threadsafe(self._protocol.data_received, data)
+        except OSError as e:
+            logging.error("Error reading stdin: %s", e)
+        except RuntimeError:
+            # Event loop already closed; nobody is listening any more.
+            return
+        try:
+            loop.call_soon_threadsafe(self._protocol.eof_received)
+        except RuntimeError:
+            pass
+
+    async def read_frame(self) -> Optional[str]:
+        """
+        Wait for the next frame. Returns None once stdin reached EOF.
+        """
+        if self._closed:
+            return None
+        frame = await self._queue.get()
+        if frame is None:
+            self._closed = True
+        return frame
+
+    def close(self) -> None:
+        self._closed = True
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+
+def to_async(
+    func: Callable[..., Any],
+    executor: Optional[Executor] = None,
+) -> Callable[..., Awaitable[Any]]:
+    """
+    Wrap a synchronous handler so it can be awaited.
+
+    The call runs on `executor` (the loop's default one when None) inside a
+    copy of the caller's context, so context variables set by the main loop
+    are visible to the handler. Coroutine functions are returned unchanged.
+    """
+    if asyncio.iscoroutinefunction(func):
+        return func
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        return await loop.run_in_executor(executor, call)
+
+    return wrapper
@@ -0,0 +1,132 @@
+"""
+Buffered reader for the `<<END>>`-terminated frames G-Assist writes to stdin.
+
+Instead of reading one character at a time, the reader pulls whatever bytes are
+available in bulk chunks into a reusable byte buffer, scans only the newly
+arrived bytes for the terminator (a terminator split across two chunks is still
+found) and decodes each frame from UTF-8 exactly once. A single read may yield
+several complete frames; they are queued and handed out one by one.
+"""
+
+from collections import deque
+from typing import Any, Callable, Deque, Optional
+
+TERMINATOR = b"<<END>>"
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def _bulk_reader(stream: Any) -> Callable[[int], bytes]:
+    """
+    Pick a read function that returns as soon as *some* bytes are available.
+
+    `BufferedReader.read(n)` would block until `n` bytes arrive, which never
+    happens on an interactive pipe, so prefer `read1` when the stream has it.
+    """
+    read1 = getattr(stream, "read1", None)
+    if read1 is not None:
+        return read1
+    return stream.read
+
+
+class FrameReader:
+    """
+    Incremental `<<END>>` frame splitter.
+
+    Use `read_frame()` to pull frames from a binary stream, or `feed()` /
+    `feed_eof()` to push bytes in from elsewhere (e.g. an event loop) and
+    `pop_frame()` to collect the results.
+    """
+
+    def __init__(
+        self,
+        stream: Any = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        terminator: bytes = TERMINATOR,
+    ) -> None:
+        if not terminator:
+            raise ValueError("terminator must not be empty")
+        self._read = _bulk_reader(stream) if stream is not None else None
+        self._chunk_size = chunk_size
+        self._terminator = terminator
+        self._buffer = bytearray()
+        # Offset in the buffer up to which no terminator can start.
+        self._scan_from = 0
+        self._frames: Deque[str] = deque()
+        self.eof = False
+
+    @staticmethod
+    def _decode(data: bytes) -> str:
+        return data.decode("utf-8", errors="replace")
+
+    def feed(self, data: bytes) -> None:
+        """
+        Append raw bytes and split off every frame they complete.
+        """
+        if not data:
+            return
+
+        buffer = self._buffer
+        buffer += data
+        terminator = self._terminator
+        start = 0
+
+        while True:
+            index = buffer.find(terminator, self._scan_from)
+            if index < 0:
+                break
+            self._frames.append(self._decode(buffer[start:index]))
+            start = index + len(terminator)
+            self._scan_from = start
+
+        if start:
+            # One compaction per feed, however many frames were split off.
+            del buffer[:start]
+        # The last len(terminator) - 1 bytes may hold the head of a terminator
+        # whose tail has not arrived yet, so they get rescanned next time.
+        self._scan_from = max(0, len(buffer) - len(terminator) + 1)
+
+    def feed_eof(self) -> None:
+        """
+        Mark the end of input. Trailing unterminated data is kept as a final
+        frame (best effort), matching the old reader's behaviour.
+        """
+        if self.eof:
+            return
+        self.eof = True
+        if self._buffer.strip():
+            self._frames.append(self._decode(self._buffer))
+        self._buffer.clear()
+        self._scan_from = 0
+
+    def pending(self) -> int:
+        """
+        Number of complete frames ready to be popped.
+        """
+        return len(self._frames)
+
+    def pop_frame(self) -> Optional[str]:
+        """
+        Return the next complete frame, or None if none is buffered.
+        """
+        if self._frames:
+            return self._frames.popleft()
+        return None
+
+    def read_frame(self) -> Optional[str]:
+        """
+        Return the next frame, reading from the stream as needed.
+        Returns None once the stream is exhausted.
+        """
+        if self._read is None:
+            raise RuntimeError("FrameReader has no stream to read from")
+
+        while not self._frames:
+            if self.eof:
+                return None
+            chunk = self._read(self._chunk_size)
+            if chunk:
+                self.feed(chunk)
+            else:
+                self.feed_eof()
+
+        return self._frames.popleft()
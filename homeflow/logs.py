@@ -0,0 +1,176 @@
+"""
+Logging setup for the plugin.
+
+In "queue" mode (the default) a command's log calls only put the record on
+an in-memory queue; a `QueueListener` thread formats it and does the file
+and stderr I/O. The file rotates by size, large payloads are formatted
+lazily and truncated, and high-volume lines can be sampled. `flush_logging()`
+drains the queue to disk and is called before the plugin answers a shutdown.
+
+"sync" mode is the original behaviour: every record is formatted and written
+to an unbounded log file by the thread that logged it.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from typing import Any, Collection, List, Optional
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+QUEUE = "queue"
+SYNC = "sync"
+MODES = (QUEUE, SYNC)
+
+
+class Truncated:
+    """
+    Log argument that is only converted to text when the record is formatted,
+    i.e. on the listener thread in queue mode, and then cut to `limit`
+    characters.
+    """
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: int) -> None:
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        text = self.value if isinstance(self.value, str) else str(self.value)
+        if self.limit <= 0 or len(text) <= self.limit:
+            return text
+        return f"{text[:self.limit]}… [{len(text) - self.limit} more chars]"
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep one in `every` INFO/DEBUG records whose message template is one of
+    `messages`. Warnings and errors, and any other line, always pass.
+    """
+
+    def __init__(self, messages: Collection[str], every: int) -> None:
+        super().__init__()
+        self.messages = frozenset(messages)
+        self.every = max(1, every)
+        self._counts = dict.fromkeys(self.messages, 0)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or record.levelno >= logging.WARNING or record.msg not in self.messages:
+            return True
+        # Unsynchronized on purpose: a lost increment only shifts the sample.
+        count = self._counts[record.msg]
+        self._counts[record.msg] = count + 1
+        return count % self.every == 0
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue records as they are. The stock handler formats the message on the
+    calling thread; here that is left to the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_LISTENER: Optional[logging.handlers.QueueListener] = None
+_INSTALLED: List[logging.Handler] = []
+_FILTERS: List[logging.Filter] = []
+_LOCK = threading.Lock()
+
+
+def configure_logging(
+    path: str,
+    mode: str = QUEUE,
+    level: int = logging.INFO,
+    max_bytes: int = 5 * 1024 * 1024,
+    backup_count: int = 3,
+    sampled_messages: Collection[str] = (),
+    sample_every: int = 1,
+    stderr: bool = True,
+) -> None:
+    """
+    (Re)configure the root logger. Handlers installed by an earlier call are
+    flushed and replaced.
+    """
+    global _LISTENER
+    with _LOCK:
+        root = logging.getLogger()
+        _teardown(root)
+        root.setLevel(level)
+        formatter = logging.Formatter(LOG_FORMAT)
+
+        outputs: List[logging.Handler] = []
+        if mode == SYNC:
+            outputs.append(logging.FileHandler(path, encoding="utf-8"))
+        else:
+            outputs.append(
+                logging.handlers.RotatingFileHandler(
+                    path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+                )
+            )
+        if stderr:
+            # Also log to stderr for easier debugging when run from console
+            outputs.append(logging.StreamHandler(sys.stderr))
+        for output in outputs:
+            output.setLevel(level)
+            output.setFormatter(formatter)
+
+        if mode == SYNC:
+            installed = outputs
+        else:
+            records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+            handler = _DeferredQueueHandler(records)  # type: ignore[arg-type]
+            _LISTENER = logging.handlers.QueueListener(records, *outputs, respect_handler_level=True)
+            _LISTENER.start()
+            installed = [handler]
+            _INSTALLED.extend(outputs)
+
+        if sample_every > 1 and sampled_messages:
+            # On the logger, so a dropped record is never even enqueued.
+            sampler = SamplingFilter(sampled_messages, sample_every)
+            root.addFilter(sampler)
+            _FILTERS.append(sampler)
+        for handler in installed:
+            root.addHandler(handler)
+        _INSTALLED.extend(installed)
+
+
+def _teardown(root: logging.Logger) -> None:
+    global _LISTENER
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
+    for handler in _INSTALLED:
+        root.removeHandler(handler)
+        handler.close()
+    _INSTALLED.clear()
+    for log_filter in _FILTERS:
+        root.removeFilter(log_filter)
+    _FILTERS.clear()
+
+
+def flush_logging() -> None:
+    """
+    Block until every record logged so far has been written out.
+    """
+    with _LOCK:
+        if _LISTENER is not None:
+            # stop() drains the queue before it returns; records logged in the
+            # meantime wait in the queue for the restarted thread.
+            _LISTENER.stop()
+            _LISTENER.start()
+        for handler in _INSTALLED:
+            handler.flush()
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    global _LISTENER
+    with _LOCK:
+        if _LISTENER is not None:
+            _LISTENER.stop()
+            _LISTENER = None
@@ -0,0 +1,304 @@
+"""
+Composite scenes ("macros"): several IFTTT events run as a dependency graph.
+
+A scene in `config.json` may be an object instead of an event name:
+
+    "leave_home": {
+      "STEPS": {
+        "lights": {"SCENE": "away"},
+        "charger": {"ACTION": "stop_ev_charging_home"},
+        "patrol": {"ACTION": "uav_patrol_yard", "AFTER": ["lights"], "DELAY_SECONDS": 5}
+      }
+    }
+
+Each step triggers one plain scene, mobility action or raw EVENT. `AFTER`
+lists steps that must have succeeded first, and `DELAY_SECONDS` waits that
+long after them (or after the macro started, for a step without any).
+
+`compile_macro` validates the graph and sorts it topologically when the
+config is loaded. `run_macro` then only follows the precomputed edges: steps
+whose dependencies are done start right away, side by side, and the answer
+names the critical path, the chain of steps that determined the total time.
+"""
+
+import contextvars
+import heapq
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+SCENE = "scene"
+ACTION = "action"
+EVENT = "event"
+STEP_KINDS = {"SCENE": SCENE, "ACTION": ACTION, "EVENT": EVENT}
+
+OK = "ok"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class MacroError(ValueError):
+    """
+    A macro definition is invalid.
+    """
+
+
+@dataclass(frozen=True)
+class MacroStep:
+    name: str
+    kind: str
+    target: str  # the scene, action or event name as written in the config
+    event: str  # the IFTTT event it resolves to
+    after: Tuple[int, ...]  # indexes into Macro.steps
+    delay_seconds: float
+
+
+@dataclass(frozen=True)
+class Macro:
+    """
+    A validated macro. `steps` is in topological order, so every step comes
+    after all of its dependencies.
+    """
+
+    name: str
+    steps: Tuple[MacroStep, ...]
+    dependents: Tuple[Tuple[int, ...], ...]
+
+    @property
+    def min_seconds(self) -> float:
+        """
+        Shortest possible run time: the longest chain of delays.
+        """
+        earliest: List[float] = []
+        for step in self.steps:
+            start = max((earliest[i] for i in step.after), default=0.0)
+            earliest.append(start + step.delay_seconds)
+        return max(earliest, default=0.0)
+
+    def describe(self) -> str:
+        """
+        One-line outline, e.g. "lights ∥ charger → patrol".
+        """
+        levels: List[List[str]] = []
+        depth: List[int] = []
+        for step in self.steps:
+            level = max((depth[i] + 1 for i in step.after), default=0)
+            depth.append(level)
+            if level == len(levels):
+                levels.append([])
+            levels[level].append(step.name)
+        return " → ".join(" ∥ ".join(names) for names in levels)
+
+
+def compile_macro(
+    name: str,
+    raw: Mapping[str, Any],
+    scenes: Mapping[str, str],
+    actions: Mapping[str, str],
+) -> Macro:
+    """
+    Validate the macro `name` and sort its steps. Steps may use plain scenes
+    (not other macros) and mobility actions from the same config.
+    Raises MacroError.
+    """
+    label = f"SCENES.{name}"
+    raw_steps = raw.get("STEPS")
+    if not isinstance(raw_steps, dict) or not raw_steps:
+        raise MacroError(f"{label}.STEPS must be a non-empty object of steps")
+
+    parsed: Dict[str, Tuple[str, str, str, List[str], float]] = {}
+    for step_name, spec in raw_steps.items():
+        step_label = f"{label}.STEPS.{step_name}"
+        if not isinstance(spec, dict):
+            raise MacroError(f"{step_label} must be an object")
+        kinds = [key for key in STEP_KINDS if key in spec]
+        if len(kinds) != 1:
+            raise MacroError(f"{step_label} needs exactly one of SCENE, ACTION or EVENT")
+        kind = STEP_KINDS[kinds[0]]
+        target = spec[kinds[0]]
+        if not isinstance(target, str) or not target.strip():
+            raise MacroError(f"{step_label}.{kinds[0]} must be a non-empty string")
+        target = target.strip()
+        if kind == SCENE:
+            if target not in scenes:
+                raise MacroError(f"{step_label} uses unknown scene {target!r} (macros cannot nest)")
+            event = scenes[target]
+        elif kind == ACTION:
+            if target not in actions:
+                raise MacroError(f"{step_label} uses unknown mobility action {target!r}")
+            event = actions[target]
+        else:
+            event = target
+
+        after = spec.get("AFTER", [])
+        if isinstance(after, str):
+            after = [after]
+        if not isinstance(after, list) or not all(isinstance(dep, str) for dep in after):
+            raise MacroError(f"{step_label}.AFTER must be a list of step names")
+        for dep in after:
+            if dep not in raw_steps:
+                raise MacroError(f"{step_label}.AFTER names unknown step {dep!r}")
+
+        delay = spec.get("DELAY_SECONDS", 0)
+        if isinstance(delay, bool) or not isinstance(delay, (int, float)) or delay < 0:
+            raise MacroError(f"{step_label}.DELAY_SECONDS must be a number >= 0")
+        parsed[step_name] = (kind, target, event, list(dict.fromkeys(after)), float(delay))
+
+    order = _topological_order(label, {step: spec[3] for step, spec in parsed.items()})
+    position = {step_name: i for i, step_name in enumerate(order)}
+    steps = []
+    dependents: List[List[int]] = [[] for _ in order]
+    for i, step_name in enumerate(order):
+        kind, target, event, after, delay = parsed[step_name]
+        deps = tuple(position[dep] for dep in after)
+        for dep in deps:
+            dependents[dep].append(i)
+        steps.append(MacroStep(step_name, kind, target, event, deps, delay))
+    return Macro(name, tuple(steps), tuple(tuple(d) for d in dependents))
+
+
+def _topological_order(label: str, after: Mapping[str, List[str]]) -> List[str]:
+    """
+    Kahn's algorithm, keeping the config's order among independent steps.
+    """
+    waiting = {step: len(deps) for step, deps in after.items()}
+    dependents: Dict[str, List[str]] = {step: [] for step in after}
+    for step, deps in after.items():
+        for dep in deps:
+            dependents[dep].append(step)
+
+    order: List[str] = []
+    ready = [step for step in after if not waiting[step]]
+    while ready:
+        step = ready.pop(0)
+        order.append(step)
+        for dependent in dependents[step]:
+            waiting[dependent] -= 1
+            if not waiting[dependent]:
+                ready.append(dependent)
+
+    if len(order) != len(after):
+        cycle = sorted(step for step, count in waiting.items() if count)
+        raise MacroError(f"{label} has a dependency cycle among steps: {', '.join(cycle)}")
+    return order
+
+
+class StepResult(NamedTuple):
+    step: MacroStep
+    status: str  # OK, FAILED or SKIPPED
+    started: float  # seconds after the macro started; -1 if never started
+    finished: float
+    detail: Dict[str, Any]  # the trigger's response, or {"message": why skipped}
+
+
+class MacroRun(NamedTuple):
+    macro: Macro
+    elapsed: float
+    results: List[StepResult]  # in Macro.steps order
+    critical_path: List[int]  # step indexes, first to last
+
+    @property
+    def succeeded(self) -> bool:
+        return all(result.status == OK for result in self.results)
+
+
+def run_macro(
+    macro: Macro,
+    trigger: Callable[[MacroStep], Dict[str, Any]],
+    max_concurrency: int,
+    deadline_seconds: Optional[float] = None,
+    clock: Callable[[], float] = time.monotonic,
+) -> MacroRun:
+    """
+    Run every step of `macro` through `trigger`, which returns a handler
+    style response ({"success": ..., "message": ...}).
+
+    At most `max_concurrency` triggers run at once, each in a copy of the
+    caller's context. Delays are kept by this thread, not by sleeping
+    workers. Dependents of a failed step are skipped, as are steps that
+    could not start before `deadline_seconds`.
+    """
+    # Loaded with the config; keep the executor machinery off the import path.
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    steps = macro.steps
+    started_at = clock()
+    waiting = [len(step.after) for step in steps]
+    results: List[Optional[StepResult]] = [None] * len(steps)
+    # (ready at, step index): steps whose dependencies all succeeded.
+    ready: List[Tuple[float, int]] = [
+        (step.delay_seconds, i) for i, step in enumerate(steps) if not step.after
+    ]
+    heapq.heapify(ready)
+    running: Dict["Future[Dict[str, Any]]", Tuple[int, float]] = {}
+
+    def skip(index: int, reason: str) -> None:
+        if results[index] is not None:
+            return
+        results[index] = StepResult(steps[index], SKIPPED, -1.0, -1.0, {"message": reason})
+        for dependent in macro.dependents[index]:
+            skip(dependent, f"`{steps[index].name}` did not run")
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, max_concurrency), thread_name_prefix="homeflow-macro"
+    ) as pool:
+        while ready or running:
+            now = clock() - started_at
+            while ready and ready[0][0] <= now and len(running) < max_concurrency:
+                _, index = heapq.heappop(ready)
+                future = pool.submit(contextvars.copy_context().run, trigger, steps[index])
+                running[future] = (index, now)
+            if deadline_seconds is not None:
+                while ready and ready[0][0] > deadline_seconds:
+                    skip(heapq.heappop(ready)[1], "would start after the command deadline")
+
+            timeout = None
+            if ready and len(running) < max_concurrency:
+                timeout = max(0.0, ready[0][0] - now)
+            if not running:
+                if timeout:
+                    time.sleep(timeout)
+                continue
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            finished = clock() - started_at
+            for future in done:
+                index, step_started = running.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    response = {"success": False, "message": f"Error: `{e}`"}
+                ok = bool(response.get("success"))
+                results[index] = StepResult(
+                    steps[index], OK if ok else FAILED, step_started, finished, response
+                )
+                for dependent in macro.dependents[index]:
+                    if not ok:
+                        skip(dependent, f"`{steps[index].name}` failed")
+                        continue
+                    waiting[dependent] -= 1
+                    if not waiting[dependent] and results[dependent] is None:
+                        deps_done = max(results[dep].finished for dep in steps[dependent].after)  # type: ignore[union-attr]
+                        heapq.heappush(ready, (deps_done + steps[dependent].delay_seconds, dependent))
+
+    final = [result for result in results if result is not None]
+    assert len(final) == len(steps)
+    return MacroRun(macro, clock() - started_at, final, _critical_path(macro, final))
+
+
+def _critical_path(macro: Macro, results: List[StepResult]) -> List[int]:
+    """
+    Walk back from the step that finished last through, at each step, the
+    dependency that finished last (the one it was waiting for).
+    """
+    ran = [i for i, result in enumerate(results) if result.status != SKIPPED]
+    if not ran:
+        return []
+    path = [max(ran, key=lambda i: results[i].finished)]
+    while macro.steps[path[-1]].after:
+        path.append(max(macro.steps[path[-1]].after, key=lambda i: results[i].finished))
+    path.reverse()
+    return path
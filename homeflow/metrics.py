@@ -0,0 +1,267 @@
+"""
+In-process metrics: counters and fixed-bucket histograms.
+
+Metric families are declared once with their label names; `.labels(...)`
+returns the series for one combination of label values, created on first
+use. Recording is a dict lookup plus a short locked update (about a
+microsecond), so metrics stay on in production.
+
+`MetricsRegistry.render_prometheus()` produces the Prometheus text
+exposition format; `PrometheusFileExporter` writes it to a file periodically
+for a node_exporter textfile collector or similar to pick up.
+"""
+
+import logging
+import os
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+# Seconds; covers in-process steps (sub-millisecond) up to slow IFTTT calls.
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Counter:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """
+    Observation counts per bucket (`bounds` are inclusive upper bounds, with
+    an implicit +Inf bucket at the end), plus their sum, count and maximum.
+    """
+
+    __slots__ = ("bounds", "counts", "total", "count", "max", "_lock")
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+            if value > self.max:
+                self.max = value
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.total, self.count
+
+    def mean(self) -> Optional[float]:
+        _, total, count = self.snapshot()
+        return total / count if count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate of the q-quantile, interpolated linearly inside its bucket
+        and never above the largest observation.
+        """
+        counts, _, count = self.snapshot()
+        if count == 0:
+            return None
+        rank = q * count
+        seen = 0
+        for index, in_bucket in enumerate(counts):
+            if in_bucket and seen + in_bucket >= rank:
+                if index == len(self.bounds):
+                    return self.max
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index]
+                return min(lower + (upper - lower) * (rank - seen) / in_bucket, self.max)
+            seen += in_bucket
+        return self.max
+
+
+Series = Union[Counter, Histogram]
+
+
+class MetricFamily:
+    """
+    All series of one metric name, keyed by their label values.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str],
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], Series] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> Series:
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} expects labels {self.label_names}, got {values}")
+            with self._lock:
+                series = self._series.get(values)
+                if series is None:
+                    series = Counter() if self.kind == "counter" else Histogram(self.buckets)
+                    self._series[values] = series
+        return series
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)  # type: ignore[union-attr]
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)  # type: ignore[union-attr]
+
+    def series(self) -> List[Tuple[Tuple[str, ...], Series]]:
+        with self._lock:
+            return sorted(self._series.items())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._families: Dict[str, MetricFamily] = {}
+        self._lock = threading.Lock()
+
+    def _family(
+        self,
+        kind: str,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str],
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> MetricFamily:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = MetricFamily(kind, name, help_text, label_names, buckets)
+                self._families[name] = family
+            elif family.kind != kind or family.label_names != tuple(label_names):
+                raise ValueError(f"metric {name} is already registered differently")
+            return family
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> MetricFamily:
+        return self._family("counter", name, help_text, label_names)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> MetricFamily:
+        return self._family("histogram", name, help_text, label_names, buckets)
+
+    def families(self) -> List[MetricFamily]:
+        with self._lock:
+            return [self._families[name] for name in sorted(self._families)]
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        for family in self.families():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for values, series in family.series():
+                if isinstance(series, Counter):
+                    label_text = _label_text(family.label_names, values)
+                    lines.append(f"{family.name}{label_text} {_number(series.value)}")
+                    continue
+                counts, total, count = series.snapshot()
+                cumulative = 0
+                for bound, in_bucket in zip(series.bounds + (float("inf"),), counts):
+                    cumulative += in_bucket
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    label_text = _label_text(family.label_names, values, f'le="{le}"')
+                    lines.append(f"{family.name}_bucket{label_text} {cumulative}")
+                label_text = _label_text(family.label_names, values)
+                lines.append(f"{family.name}_sum{label_text} {_number(total)}")
+                lines.append(f"{family.name}_count{label_text} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """
+        Write the text format to `path`, replacing it atomically so a reader
+        never sees a half-written file.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(temp_path, path)
+
+
+REGISTRY = MetricsRegistry()
+
+
+class PrometheusFileExporter:
+    """
+    Background thread that rewrites a Prometheus text file every `interval` seconds.
+    """
+
+    def __init__(self, registry: MetricsRegistry, path: str, interval: float) -> None:
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="homeflow-metrics", daemon=True
+            )
+            self._thread.start()
+            logging.info("Writing Prometheus metrics to %s every %g s", self.path, self.interval)
+
+    def dump(self) -> None:
+        try:
+            self.registry.write_prometheus(self.path)
+        except OSError as e:
+            logging.error("Failed to write metrics to %s: %s", self.path, e)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+        self.dump()
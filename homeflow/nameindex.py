@@ -0,0 +1,258 @@
+"""
+Precomputed lookup index for scene and mobility action names.
+
+Built once per config, the index answers a spoken/typed name with ranked
+candidates instead of scanning every key with substring tests:
+
+1. normalized exact match ("Start EV charging" -> "start_ev_charging")
+2. word-token index, intersected across the query's tokens
+3. character trigram index (Dice similarity) for partial words, scored
+   directly on the names sharing every known query word when those are few
+4. bounded edit distance over the best candidates whose length is within
+   the edit budget of the query, for typos
+
+Each entry's EV/UAV category is classified once at build time.
+"""
+
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Set
+
+UAV = "uav"
+EV = "ev"
+MOBILITY = "mobility"
+
+DEFAULT_MIN_SCORE = 0.45
+
+_SEPARATORS = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(name: str) -> str:
+    """
+    Lowercase and collapse every run of non-alphanumerics into one underscore.
+    """
+    return _SEPARATORS.sub("_", name.strip().lower()).strip("_")
+
+
+def classify_mobility_action(name: str) -> str:
+    """
+    EV/UAV category of a mobility action, from its name.
+    """
+    if "uav" in name or "drone" in name:
+        return UAV
+    if "ev" in name or "charging" in name or "vehicle" in name:
+        return EV
+    return MOBILITY
+
+
+def _trigrams(normalized: str) -> Set[str]:
+    padded = f"_{normalized}_"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Edit distance counting insertions, deletions, substitutions and adjacent
+    transpositions (optimal string alignment). Gives up, returning limit + 1,
+    once it exceeds `limit`; only the diagonal band of width 2 * limit + 1 is
+    evaluated.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    beyond = limit + 1
+    before_previous: List[int] = []
+    previous = [j if j <= limit else beyond for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        low = max(1, i - limit)
+        high = min(len(b), i + limit)
+        current = [beyond] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        char_a = a[i - 1]
+        best = current[0]
+        for j in range(low, high + 1):
+            value = previous[j - 1] + (char_a != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if (
+                i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == b[j - 1]
+                and before_previous[j - 2] + 1 < value
+            ):
+                value = before_previous[j - 2] + 1
+            current[j] = value
+            if value < best:
+                best = value
+        if best > limit:
+            return beyond
+        before_previous, previous = previous, current
+    return min(previous[-1], beyond)
+
+
+class Match(NamedTuple):
+    name: str
+    value: Any
+    score: float
+    category: Optional[str]
+
+
+class NameIndex:
+    """
+    Immutable index over a name -> value mapping.
+    """
+
+    # Posting lists longer than this are too common to narrow anything down.
+    max_gram_postings = 256
+    # How many of the strongest candidates get an edit-distance check.
+    edit_candidates = 8
+
+    def __init__(
+        self,
+        entries: Mapping[str, Any],
+        classify: Optional[Callable[[str], str]] = None,
+    ) -> None:
+        self._names: List[str] = list(entries)
+        self._values: List[Any] = [entries[name] for name in self._names]
+        self._normalized: List[str] = [normalize_name(name) for name in self._names]
+        self._token_sets: List[FrozenSet[str]] = [
+            frozenset(filter(None, norm.split("_"))) for norm in self._normalized
+        ]
+        self._categories: List[Optional[str]] = [
+            classify(name.lower()) if classify else None for name in self._names
+        ]
+
+        self._exact: Dict[str, int] = {}
+        tokens: Dict[str, Set[int]] = {}
+        grams: Dict[str, List[int]] = {}
+        self._gram_sets: List[FrozenSet[str]] = []
+        for idx, (name, norm) in enumerate(zip(self._names, self._normalized)):
+            self._exact.setdefault(name.strip().lower(), idx)
+            self._exact.setdefault(norm, idx)
+            for token in self._token_sets[idx]:
+                tokens.setdefault(token, set()).add(idx)
+            name_grams = frozenset(_trigrams(norm))
+            self._gram_sets.append(name_grams)
+            for gram in name_grams:
+                grams.setdefault(gram, []).append(idx)
+
+        self._tokens: Dict[str, FrozenSet[int]] = {
+            token: frozenset(ids) for token, ids in tokens.items()
+        }
+        self._grams = grams
+        self.sorted_names: List[str] = sorted(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def category(self, name: str) -> Optional[str]:
+        idx = self._exact.get(normalize_name(name))
+        return self._categories[idx] if idx is not None else None
+
+    def _match(self, idx: int, score: float) -> Match:
+        return Match(self._names[idx], self._values[idx], score, self._categories[idx])
+
+    def lookup(
+        self,
+        query: str,
+        limit: int = 5,
+        min_score: float = DEFAULT_MIN_SCORE,
+    ) -> List[Match]:
+        """
+        Candidates for `query`, best first. An exact (normalized) hit is
+        returned alone with score 1.0.
+        """
+        raw = query.strip().lower()
+        norm = normalize_name(query)
+        if not norm:
+            return []
+
+        idx = self._exact.get(raw)
+        if idx is None:
+            idx = self._exact.get(norm)
+        if idx is not None:
+            return [self._match(idx, 1.0)]
+
+        scores: Dict[int, float] = {}
+        query_tokens = frozenset(filter(None, norm.split("_")))
+
+        # Word tokens: names containing every known query token.
+        postings = [self._tokens[t] for t in query_tokens if t in self._tokens]
+        all_tokens_known = bool(postings) and len(postings) == len(query_tokens)
+        narrowed: FrozenSet[int] = frozenset()
+        if postings:
+            postings.sort(key=len)
+            candidates = postings[0].intersection(*postings[1:])
+            if candidates:
+                narrowed = candidates
+            else:
+                all_tokens_known = False
+                candidates = postings[0]
+            if len(candidates) > 4 * self.max_gram_postings:
+                # Too generic to rank exhaustively; shortest names fit best.
+                candidates = sorted(candidates, key=lambda i: len(self._normalized[i]))[
+                    : 4 * self.max_gram_postings
+                ]
+            for idx in candidates:
+                tokens = self._token_sets[idx]
+                scores[idx] = len(query_tokens & tokens) / len(query_tokens | tokens)
+
+        # Trigrams: partial words ("stud" -> "study") and spelling variants.
+        # Not needed when every query word is a known token of some name.
+        if not all_tokens_known:
+            query_grams = _trigrams(norm)
+            if narrowed and len(narrowed) <= self.max_gram_postings:
+                # A few names share every word the index knows; the rest is
+                # the misspelled or partial word, so compare against those.
+                shared_grams = [(idx, len(query_grams & self._gram_sets[idx])) for idx in narrowed]
+            else:
+                counter: Counter = Counter()
+                for gram in query_grams:
+                    ids = self._grams.get(gram)
+                    if ids and len(ids) <= self.max_gram_postings:
+                        counter.update(ids)
+                shared_grams = counter.most_common(self.max_gram_postings)
+            for idx, shared in shared_grams:
+                dice = 2.0 * shared / (len(query_grams) + len(self._gram_sets[idx]))
+                if dice > scores.get(idx, 0.0):
+                    scores[idx] = dice
+
+        # Substring containment (what the old lookup did), scaled by coverage.
+        for idx in list(scores):
+            name = self._normalized[idx]
+            if norm in name or name in norm:
+                shorter, longer = sorted((len(norm), len(name)))
+                containment = 0.6 + 0.4 * shorter / longer
+                if containment > scores[idx]:
+                    scores[idx] = containment
+
+        best = max(scores.values(), default=0.0)
+        if best < 0.75 and not all_tokens_known:
+            # Typos: edit distance against the strongest candidates so far,
+            # skipping those whose length alone rules them out.
+            max_edits = min(3, max(1, len(norm) // 5))
+            strongest = sorted(
+                (idx for idx in scores if abs(len(self._normalized[idx]) - len(norm)) <= max_edits),
+                key=scores.__getitem__,
+                reverse=True,
+            )
+            for idx in strongest[: self.edit_candidates]:
+                name = self._normalized[idx]
+                distance = _edit_distance(norm, name, max_edits)
+                if distance <= max_edits:
+                    similarity = 1.0 - distance / max(len(norm), len(name))
+                    if similarity > scores.get(idx, 0.0):
+                        scores[idx] = similarity
+                    if distance <= 1:
+                        # One typo away: good enough, skip the weaker candidates.
+                        break
+
+        ranked = sorted(
+            (item for item in scores.items() if item[1] >= min_score),
+            key=lambda item: (-item[1], len(self._normalized[item[0]]), self._names[item[0]]),
+        )
+        return [self._match(idx, round(score, 3)) for idx, score in ranked[:limit]]
+
+    def best(self, query: str, min_score: float = DEFAULT_MIN_SCORE) -> Optional[Match]:
+        matches = self.lookup(query, limit=1, min_score=min_score)
+        return matches[0] if matches else None
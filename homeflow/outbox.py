@@ -0,0 +1,311 @@
+"""
+Durable local outbox for fire-and-forget IFTTT delivery.
+
+Events are appended to a SQLite database in WAL mode and acknowledged with a
+delivery ID straight away. `OutboxFlusher` drains the outbox in the
+background, in batches, retrying failed deliveries with exponential backoff.
+Rows are only marked delivered after the HTTP call succeeded, so anything still
+queued when the plugin exits is picked up again on the next start
+(at-least-once delivery).
+
+A failure is only retried when the delivery function says that is safe: the
+event certainly did not go out, or running it twice is harmless. Otherwise
+(a timeout or dropped connection after sending) the row is marked failed
+rather than risk opening a door or starting a charger twice. Delivered and
+failed rows are pruned once they are older than the retention period.
+"""
+
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+PENDING = "pending"
+DELIVERED = "delivered"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS deliveries (
+    id TEXT PRIMARY KEY,
+    event_name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS deliveries_due ON deliveries (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS deliveries_created ON deliveries (created_at);
+"""
+
+PRUNE_INTERVAL_SECONDS = 3600.0
+
+
+class Delivery(NamedTuple):
+    delivery_id: str
+    event_name: str
+    payload: Dict[str, Any]
+    status: str
+    attempts: int
+    next_attempt_at: float
+    created_at: float
+    updated_at: float
+    last_error: Optional[str]
+
+
+_COLUMNS = (
+    "id, event_name, payload, status, attempts, next_attempt_at, "
+    "created_at, updated_at, last_error"
+)
+
+
+def _to_delivery(row: Tuple[Any, ...]) -> Delivery:
+    return Delivery(
+        row[0], row[1], json.loads(row[2]), row[3], row[4], row[5], row[6], row[7], row[8]
+    )
+
+
+class Outbox:
+    """
+    Crash-safe queue of outgoing events backed by SQLite (WAL journal).
+    Safe to share between threads.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL + NORMAL: commits survive a crash of the plugin process without
+        # an fsync on every enqueue.
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def enqueue(self, event_name: str, payload: Dict[str, Any]) -> str:
+        delivery_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                f"INSERT INTO deliveries ({_COLUMNS}) VALUES (?, ?, ?, ?, 0, ?, ?, ?, NULL)",
+                (delivery_id, event_name, json.dumps(payload), PENDING, now, now, now),
+            )
+        return delivery_id
+
+    def due(self, limit: int, now: Optional[float] = None) -> List[Delivery]:
+        """
+        Oldest pending deliveries whose next attempt is due.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {_COLUMNS} FROM deliveries WHERE status = ? AND next_attempt_at <= ? "
+                "ORDER BY created_at LIMIT ?",
+                (PENDING, now, limit),
+            ).fetchall()
+        return [_to_delivery(row) for row in rows]
+
+    def next_due_at(self) -> Optional[float]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(next_attempt_at) FROM deliveries WHERE status = ?", (PENDING,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record(self, updates: List[Tuple[str, str, int, float, Optional[str]]]) -> None:
+        """
+        Apply (delivery_id, status, attempts, next_attempt_at, last_error)
+        updates for a whole batch in one transaction.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "UPDATE deliveries SET status = ?, attempts = ?, next_attempt_at = ?, "
+                    "last_error = ?, updated_at = ? WHERE id = ?",
+                    [
+                        (status, attempts, next_at, error, now, delivery_id)
+                        for delivery_id, status, attempts, next_at, error in updates
+                    ],
+                )
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def get(self, delivery_id: str) -> Optional[Delivery]:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {_COLUMNS} FROM deliveries WHERE id = ?", (delivery_id,)
+            ).fetchone()
+        return _to_delivery(row) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT status, COUNT(*) FROM deliveries GROUP BY status"
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+    def recent(self, limit: int = 5) -> List[Delivery]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {_COLUMNS} FROM deliveries ORDER BY created_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [_to_delivery(row) for row in rows]
+
+    def prune(self, older_than: float) -> int:
+        """
+        Delete delivered and failed rows created before `older_than` (epoch
+        seconds). Pending rows are kept however old they are. Returns how
+        many rows were deleted.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM deliveries WHERE created_at < ? AND status != ?",
+                (older_than, PENDING),
+            )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class OutboxFlusher:
+    """
+    Background thread that drains an Outbox.
+
+    `deliver(event_name, payload)` performs one delivery and returns
+    (success, error message, may retry). Failed deliveries that may be
+    retried are, with exponential backoff and jitter, until `max_attempts`;
+    the others, and those that run out of attempts, are marked failed.
+    Finished rows older than `retention_seconds` are pruned every hour.
+    """
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        deliver: Callable[[str, Dict[str, Any]], Tuple[bool, str, bool]],
+        batch_size: int = 10,
+        concurrency: int = 4,
+        max_attempts: int = 8,
+        retry_base_seconds: float = 2.0,
+        retry_max_seconds: float = 300.0,
+        retention_seconds: float = 7 * 86400.0,
+    ) -> None:
+        self.outbox = outbox
+        self._deliver = deliver
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.retention_seconds = retention_seconds
+        self._pruned_at = 0.0
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, concurrency), thread_name_prefix="homeflow-outbox"
+        )
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="homeflow-outbox-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def wake(self) -> None:
+        """
+        Tell the flusher new work was enqueued.
+        """
+        self._wakeup.set()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._executor.shutdown(wait=False)
+
+    def _attempt(self, delivery: Delivery) -> Tuple[str, str, int, float, Optional[str]]:
+        attempts = delivery.attempts + 1
+        try:
+            ok, error, retry = self._deliver(delivery.event_name, delivery.payload)
+        except Exception as e:
+            # Whether it got as far as sending is unknown.
+            logging.exception("Outbox delivery %s crashed", delivery.delivery_id)
+            ok, error, retry = False, str(e), False
+
+        now = time.time()
+        if ok:
+            return delivery.delivery_id, DELIVERED, attempts, now, None
+        if not retry:
+            error = f"{error} (not retried: it may already have run)"
+            logging.error(
+                "Outbox delivery %s (%s) failed: %s",
+                delivery.delivery_id, delivery.event_name, error,
+            )
+            return delivery.delivery_id, FAILED, attempts, now, error
+        if attempts >= self.max_attempts:
+            logging.error(
+                "Outbox delivery %s (%s) failed permanently after %d attempts: %s",
+                delivery.delivery_id, delivery.event_name, attempts, error,
+            )
+            return delivery.delivery_id, FAILED, attempts, now, error
+
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * (2 ** (attempts - 1)))
+        delay = random.uniform(delay / 2, delay)
+        logging.warning(
+            "Outbox delivery %s (%s) failed, retry %d/%d in %.1f s: %s",
+            delivery.delivery_id, delivery.event_name, attempts, self.max_attempts, delay, error,
+        )
+        return delivery.delivery_id, PENDING, attempts, now + delay, error
+
+    def flush_once(self) -> int:
+        """
+        Deliver one batch of due events. Returns how many were attempted.
+        """
+        batch = self.outbox.due(self.batch_size)
+        if not batch:
+            return 0
+        updates = list(self._executor.map(self._attempt, batch))
+        self.outbox.record(updates)
+        return len(batch)
+
+    def prune(self) -> None:
+        """
+        Drop finished rows past the retention period, at most once an hour.
+        """
+        now = time.time()
+        if now - self._pruned_at < PRUNE_INTERVAL_SECONDS:
+            return
+        self._pruned_at = now
+        deleted = self.outbox.prune(now - self.retention_seconds)
+        if deleted:
+            logging.info("Outbox pruned %d finished deliveries", deleted)
+
+    def _run(self) -> None:
+        while not self._stopping:
+            try:
+                self.prune()
+                if self.flush_once():
+                    continue
+                next_due = self.outbox.next_due_at()
+            except sqlite3.Error as e:
+                logging.error("Outbox flush failed: %s", e)
+                next_due = None
+
+            wait = 60.0 if next_due is None else max(0.0, next_due - time.time())
+            self._wakeup.wait(min(wait, 60.0))
+            self._wakeup.clear()
@@ -0,0 +1,179 @@
+"""
+Client-side rate limiting for IFTTT Webhooks keys.
+
+IFTTT throttles each key. `TokenBucket` lets short bursts through and spaces
+the rest out; callers that find it empty wait in a bounded FIFO queue instead
+of failing. A 429 from the server pauses the bucket for the `Retry-After`
+period so queued callers back off together, and halves the refill rate until
+successful requests earn it back.
+"""
+
+import hashlib
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when the wait queue is full or a caller's wait would exceed its timeout.
+    """
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second, holding at most `burst`. One token per request.
+    At most `max_queue` callers may wait at the same time; they are served in
+    arrival order.
+
+    The refill rate backs off multiplicatively on `penalize()` and recovers
+    additively on `reward()`, so a limit configured above what the server
+    really allows converges instead of drawing 429s forever.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        max_queue: int = 100,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be > 0 and burst >= 1")
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max(1, max_queue)
+        self._effective_rate = rate
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated_at = clock()
+        self._paused_until = 0.0
+        self._waiters: Deque[object] = deque()
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(float(self.burst), self._tokens + elapsed * self._effective_rate)
+            self._updated_at = now
+
+    def configure(self, rate: float, burst: int, max_queue: int) -> None:
+        with self._cond:
+            self._refill(self._clock())
+            self.rate = rate
+            self.burst = burst
+            self.max_queue = max(1, max_queue)
+            self._effective_rate = min(self._effective_rate, rate)
+            self._tokens = min(self._tokens, float(burst))
+            self._cond.notify_all()
+
+    def queued(self) -> int:
+        with self._cond:
+            return len(self._waiters)
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        Take one token, waiting in line if necessary.
+        Returns the seconds spent waiting.
+        """
+        with self._cond:
+            if len(self._waiters) >= self.max_queue:
+                raise RateLimitExceeded(
+                    f"rate limit queue is full ({self.max_queue} requests waiting)"
+                )
+
+            me = object()
+            self._waiters.append(me)
+            started = self._clock()
+            deadline = None if timeout is None else started + timeout
+            try:
+                while True:
+                    now = self._clock()
+                    wait: Optional[float] = None
+                    if self._waiters[0] is me:
+                        self._refill(now)
+                        ready_at = max(
+                            self._paused_until,
+                            now if self._tokens >= 1 else now + (1 - self._tokens) / self._effective_rate,
+                        )
+                        if ready_at <= now:
+                            self._tokens -= 1
+                            return now - started
+                        wait = ready_at - now
+
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            raise RateLimitExceeded("timed out waiting for the rate limiter")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(me)
+                self._cond.notify_all()
+
+    def penalize(self, seconds: float) -> None:
+        """
+        Stop handing out tokens for `seconds` (e.g. after a 429), drain the
+        bucket and halve the refill rate.
+        """
+        with self._cond:
+            now = self._clock()
+            self._refill(now)
+            self._tokens = 0.0
+            self._paused_until = max(self._paused_until, now + max(0.0, seconds))
+            self._effective_rate = max(self.rate / 16, self._effective_rate / 2)
+            self._cond.notify_all()
+
+    def reward(self) -> None:
+        """
+        Record an accepted request; recovers the refill rate after penalties.
+        """
+        if self._effective_rate >= self.rate:
+            return
+        with self._cond:
+            self._refill(self._clock())
+            self._effective_rate = min(self.rate, self._effective_rate + self.rate / 10)
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Parse a Retry-After header (delta seconds or HTTP date) into seconds.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    # HTTP dates are rare here; email.utils is only imported when one shows up.
+    from email.utils import parsedate_to_datetime
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+_BUCKETS: Dict[str, TokenBucket] = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(api_key: str, rate: float, burst: int, max_queue: int) -> TokenBucket:
+    """
+    Return the bucket for one Webhooks key, applying the current settings.
+    Keys are only held as digests.
+    """
+    digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get(digest)
+        if bucket is None:
+            bucket = _BUCKETS[digest] = TokenBucket(rate, burst, max_queue)
+            return bucket
+    if (bucket.rate, bucket.burst, bucket.max_queue) != (rate, burst, max(1, max_queue)):
+        bucket.configure(rate, burst, max_queue)
+    return bucket
@@ -0,0 +1,229 @@
+"""
+Latency control for outbound IFTTT calls.
+
+- `Deadline`: total time budget of one G-Assist command, split across the
+  IFTTT calls it makes. The main loop publishes it through `current_deadline`.
+- `LatencyTracker`: rolling window of observed latencies; timeouts follow the
+  p95 instead of a fixed `DEFAULT_TIMEOUT_SECONDS`.
+- `RetryPolicy`: capped exponential backoff with full jitter.
+- `CircuitBreaker`: per-host breaker that fails fast while a service is down
+  and lets a single probe through after a cool-down.
+"""
+
+import contextvars
+import math
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class Deadline:
+    """
+    Time budget shared by the calls of one command.
+
+    With `concurrency` calls running side by side, the remaining time is split
+    across the waves of calls that are still to come rather than across
+    individual calls.
+    """
+
+    def __init__(
+        self,
+        total_seconds: float,
+        calls: int = 1,
+        concurrency: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._clock = clock
+        self.total_seconds = total_seconds
+        self._expires_at = clock() + total_seconds
+        self._calls_left = max(1, calls)
+        self._concurrency = max(1, concurrency)
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return max(0.0, self._expires_at - self._clock())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def allot(self) -> float:
+        """
+        Claim the time share of the next call.
+        """
+        with self._lock:
+            waves_left = math.ceil(self._calls_left / self._concurrency)
+            self._calls_left = max(1, self._calls_left - 1)
+        return self.remaining() / max(1, waves_left)
+
+
+current_deadline: "contextvars.ContextVar[Optional[Deadline]]" = contextvars.ContextVar(
+    "homeflow_deadline", default=None
+)
+
+
+class LatencyTracker:
+    """
+    Keeps the last `window` latencies (seconds) and derives a timeout from them.
+    """
+
+    def __init__(self, window: int = 100, min_samples: int = 10) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < self._min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(math.ceil(fraction * len(ordered))) - 1)
+        return ordered[max(0, index)]
+
+    def timeout(self, default: float, floor: float, multiplier: float) -> float:
+        """
+        `multiplier` x p95, clamped to [floor, default]. Falls back to
+        `default` until enough samples have been seen.
+        """
+        p95 = self.percentile(0.95)
+        if p95 is None:
+            return default
+        return max(floor, min(default, p95 * multiplier))
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: attempt n waits a random time in
+    [0, min(max_delay, base_delay * 2 ** (n - 1))].
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.25,
+        max_delay: float = 2.0,
+    ) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        ceiling = min(self.max_delay, self.base_delay * (2 ** max(0, attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Closed: calls pass, failures are counted. After `failure_threshold`
+    consecutive failures the breaker opens and rejects calls for
+    `reset_seconds`; then it goes half-open and admits one probe, whose
+    outcome closes or re-opens it.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def retry_after(self) -> float:
+        """
+        Seconds until an open breaker admits its next probe.
+        """
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_seconds - self._clock())
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if self._clock() - self._opened_at < self.reset_seconds:
+                    return False
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def release(self) -> None:
+        """
+        Give back a half-open probe that was admitted but never completed.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._failures = 0
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_TRACKERS: Dict[str, LatencyTracker] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_circuit_breaker(host: str, failure_threshold: int, reset_seconds: float) -> CircuitBreaker:
+    """
+    Return the breaker for `host`, applying the current settings to it.
+    """
+    with _REGISTRY_LOCK:
+        breaker = _BREAKERS.get(host)
+        if breaker is None:
+            breaker = _BREAKERS[host] = CircuitBreaker(failure_threshold, reset_seconds)
+    breaker.failure_threshold = max(1, failure_threshold)
+    breaker.reset_seconds = reset_seconds
+    return breaker
+
+
+def get_latency_tracker(host: str) -> LatencyTracker:
+    with _REGISTRY_LOCK:
+        tracker = _TRACKERS.get(host)
+        if tracker is None:
+            tracker = _TRACKERS[host] = LatencyTracker()
+    return tracker
@@ -0,0 +1,570 @@
+"""
+Local scheduler for deferred and recurring scenes and mobility actions.
+
+Jobs live in a binary heap keyed by their next run time, so adding one is
+O(log n), cancelling is O(1) (the heap entry is left behind and skipped when
+it surfaces) and finding the next due job is O(1). A single thread sleeps
+until the earliest job is due and hands due jobs to a small worker pool.
+
+Three kinds of trigger are supported, all in local time:
+
+- once: `at` a time of day ("01:00", the next one to come), a date and time
+  ("2026-10-17 01:00") or a delay ("in 45m")
+- interval: `every` "2h" (also "90s", "30m", "1d", "1h30m"), optionally
+  starting at `start` ("22:00")
+- cron: a 5-field expression, e.g. "0 1 * * 1-5"
+
+Jobs are persisted in SQLite (WAL), like the outbox, and reloaded on start.
+Runs missed while no HomeFlow process was running are caught up once if they
+are at most `misfire_grace` seconds late, and skipped otherwise.
+"""
+
+import heapq
+import json
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedules (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    target TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    next_run REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_run REAL,
+    last_status TEXT,
+    runs INTEGER NOT NULL DEFAULT 0,
+    ifttt_values TEXT NOT NULL DEFAULT '[]'
+);
+"""
+
+_COLUMNS = "id, kind, target, spec, next_run, created_at, last_run, last_status, runs, ifttt_values"
+
+MISSED = "missed"
+
+
+class ScheduleError(ValueError):
+    """
+    A schedule could not be understood.
+    """
+
+
+# -------------------------
+# Triggers
+# -------------------------
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)\s*([smhd])")
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_TIME_OF_DAY = re.compile(r"^(\d{1,2}):(\d{2})$")
+
+
+def parse_duration(text: str) -> float:
+    """
+    "90s", "30m", "2h", "1d" or combinations like "1h30m", in seconds.
+    """
+    compact = text.strip().lower().replace(" ", "")
+    parts = _DURATION_PART.findall(compact)
+    if not parts or "".join(f"{n}{u}" for n, u in parts) != compact:
+        raise ScheduleError(f"Cannot read duration {text!r}; use e.g. 90s, 30m, 2h, 1d or 1h30m")
+    seconds = sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+    if seconds <= 0:
+        raise ScheduleError("Duration must be longer than zero")
+    return seconds
+
+
+def format_duration(seconds: float) -> str:
+    parts = []
+    remaining = int(round(seconds))
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60), ("s", 1)):
+        if remaining >= size:
+            parts.append(f"{remaining // size}{unit}")
+            remaining %= size
+    return "".join(parts) or f"{seconds:g}s"
+
+
+def parse_time(text: str, now: float) -> float:
+    """
+    "HH:MM" (the next such time), "in <duration>" or an ISO date and time,
+    as a Unix timestamp.
+    """
+    value = text.strip()
+    if value.lower().startswith("in "):
+        return now + parse_duration(value[3:])
+    match = _TIME_OF_DAY.match(value)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2))
+        if hour > 23 or minute > 59:
+            raise ScheduleError(f"{value!r} is not a valid time of day")
+        today = datetime.fromtimestamp(now)
+        candidate = today.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate.timestamp() <= now:
+            candidate += timedelta(days=1)
+        return candidate.timestamp()
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ScheduleError(
+            f"Cannot read time {text!r}; use HH:MM, 'in 45m' or 'YYYY-MM-DD HH:MM'"
+        ) from None
+
+
+def format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime("%a %d %b %H:%M")
+
+
+class OneShot:
+    def __init__(self, at: float) -> None:
+        self.at = at
+
+    def next_after(self, t: float) -> Optional[float]:
+        return self.at if self.at > t else None
+
+    def spec(self) -> str:
+        return f"at {self.at!r}"
+
+    def describe(self) -> str:
+        return f"once at {format_time(self.at)}"
+
+
+class Interval:
+    def __init__(self, seconds: float, start: float) -> None:
+        self.seconds = seconds
+        self.start = start
+
+    def next_after(self, t: float) -> Optional[float]:
+        if t < self.start:
+            return self.start
+        return self.start + (math.floor((t - self.start) / self.seconds) + 1) * self.seconds
+
+    def spec(self) -> str:
+        return f"every {self.seconds!r} {self.start!r}"
+
+    def describe(self) -> str:
+        return f"every {format_duration(self.seconds)} from {format_time(self.start)}"
+
+
+# (name, lowest, highest); cron weekdays count from Sunday = 0, 7 is Sunday too.
+_CRON_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+
+def _cron_field(text: str, name: str, low: int, high: int) -> FrozenSet[int]:
+    values = set()
+    for part in text.split(","):
+        base, _, step_text = part.partition("/")
+        try:
+            step = int(step_text) if step_text else 1
+            if base == "*":
+                start, end = low, high
+            elif "-" in base:
+                first, last = base.split("-", 1)
+                start, end = int(first), int(last)
+            else:
+                start = int(base)
+                end = high if step_text else start
+        except ValueError:
+            raise ScheduleError(f"Cannot read cron {name} field {text!r}") from None
+        if step < 1 or not low <= start <= end <= high:
+            raise ScheduleError(f"Cron {name} field {text!r} is out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class Cron:
+    """
+    Standard 5-field cron expression (minute hour day month weekday). As in
+    cron, when both day and weekday are restricted either one may match.
+    """
+
+    def __init__(self, expression: str) -> None:
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ScheduleError(f"Cron expression {expression!r} needs 5 fields")
+        self.expression = " ".join(fields)
+        parsed = [_cron_field(text, *spec) for text, spec in zip(fields, _CRON_FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self._hours = sorted(self.hours)
+        self._minutes = sorted(self.minutes)
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, day: datetime) -> bool:
+        in_days = day.day in self.days
+        in_weekdays = (day.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, t: float) -> Optional[float]:
+        moment = datetime.fromtimestamp(t).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        last_year = moment.year + 5
+        # Skip whole months, days and hours that cannot match.
+        while moment.year <= last_year:
+            if moment.month not in self.months:
+                year, month = divmod(moment.month, 12)
+                moment = moment.replace(year=moment.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                # Next allowed hour today, or start over tomorrow.
+                index = bisect_left(self._hours, moment.hour)
+                if index == len(self._hours):
+                    moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+                else:
+                    moment = moment.replace(hour=self._hours[index], minute=0)
+            elif moment.minute not in self.minutes:
+                index = bisect_left(self._minutes, moment.minute)
+                if index == len(self._minutes):
+                    moment = (moment + timedelta(hours=1)).replace(minute=0)
+                else:
+                    moment = moment.replace(minute=self._minutes[index])
+            else:
+                return moment.timestamp()
+        return None
+
+    def spec(self) -> str:
+        return f"cron {self.expression}"
+
+    def describe(self) -> str:
+        return f"cron `{self.expression}`"
+
+
+Trigger = Any  # OneShot, Interval or Cron
+
+
+def parse_trigger(
+    now: float,
+    at: Optional[str] = None,
+    every: Optional[str] = None,
+    start: Optional[str] = None,
+    cron: Optional[str] = None,
+) -> Trigger:
+    """
+    Build a trigger from user input; exactly one of `at`, `every` and `cron`.
+    """
+    given = [name for name, value in (("at", at), ("every", every), ("cron", cron)) if value]
+    if len(given) != 1:
+        raise ScheduleError("Give exactly one of `at`, `every` or `cron`")
+    if start and not every:
+        raise ScheduleError("`start` only applies to `every`")
+    if at:
+        when = parse_time(at, now)
+        if when <= now:
+            raise ScheduleError(f"{at!r} is in the past")
+        return OneShot(when)
+    if every:
+        seconds = parse_duration(every)
+        return Interval(seconds, parse_time(start, now) if start else now + seconds)
+    return Cron(cron or "")
+
+
+def trigger_from_spec(spec: str) -> Trigger:
+    kind, _, rest = spec.partition(" ")
+    if kind == "at":
+        return OneShot(float(rest))
+    if kind == "every":
+        seconds, start = rest.split()
+        return Interval(float(seconds), float(start))
+    if kind == "cron":
+        return Cron(rest)
+    raise ScheduleError(f"Unknown schedule spec {spec!r}")
+
+
+# -------------------------
+# Jobs and storage
+# -------------------------
+
+class Job(NamedTuple):
+    job_id: str
+    kind: str  # what `target` names, e.g. "scene" or "action"
+    target: str
+    trigger: Trigger
+    next_run: float
+    created_at: float
+    last_run: Optional[float] = None
+    last_status: Optional[str] = None
+    runs: int = 0
+    values: Tuple[str, ...] = ()  # value1..value3 for the IFTTT event
+
+
+def _to_job(row: Tuple[Any, ...]) -> Job:
+    return Job(row[0], row[1], row[2], trigger_from_spec(row[3]), *row[4:9], tuple(json.loads(row[9])))
+
+
+class JobStore:
+    """
+    SQLite (WAL) table of scheduled jobs. Safe to share between threads.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(schedules)")}
+        if "ifttt_values" not in columns:
+            self._db.execute("ALTER TABLE schedules ADD COLUMN ifttt_values TEXT NOT NULL DEFAULT '[]'")
+
+    def load(self) -> List[Job]:
+        jobs = []
+        with self._lock:
+            rows = self._db.execute(f"SELECT {_COLUMNS} FROM schedules").fetchall()
+        for row in rows:
+            try:
+                jobs.append(_to_job(row))
+            except (ScheduleError, ValueError) as e:
+                logging.error("Ignoring unreadable schedule %s: %s", row[0], e)
+        return jobs
+
+    def save(self, jobs: Iterable[Job]) -> None:
+        """
+        Insert or update jobs, all in one transaction.
+        """
+        rows = [
+            (job.job_id, job.kind, job.target, job.trigger.spec(), job.next_run,
+             job.created_at, job.last_run, job.last_status, job.runs, json.dumps(job.values))
+            for job in jobs
+        ]
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    f"INSERT OR REPLACE INTO schedules ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def delete(self, job_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._db.executemany("DELETE FROM schedules WHERE id = ?", [(i,) for i in job_ids])
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+# -------------------------
+# Scheduler
+# -------------------------
+
+class Scheduler:
+    """
+    Runs jobs through `run(job)` when they are due. `run` returns a handler
+    style response; its "success" is recorded as the job's last status.
+
+    Without a `store`, jobs are kept in memory only.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[Job], Dict[str, Any]],
+        store: Optional[JobStore] = None,
+        concurrency: int = 2,
+        misfire_grace: float = 300.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._run = run
+        self.store = store
+        self.misfire_grace = misfire_grace
+        self._clock = clock
+        self._jobs: Dict[str, Job] = {}
+        # (next run, job id); entries whose job was cancelled or rescheduled
+        # stay until they reach the top and are then dropped.
+        self._heap: List[Tuple[float, str]] = []
+        self._condition = threading.Condition()
+        self._concurrency = max(1, concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        if store is not None:
+            for job in store.load():
+                self._jobs[job.job_id] = job
+                self._heap.append((job.next_run, job.job_id))
+            heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def add(self, kind: str, target: str, trigger: Trigger, values: Tuple[str, ...] = ()) -> Job:
+        now = self._clock()
+        next_run = trigger.next_after(now)
+        if next_run is None:
+            raise ScheduleError("This schedule never runs")
+        job = Job(uuid.uuid4().hex[:8], kind, target, trigger, next_run, now, values=values)
+        if self.store is not None:
+            self.store.save([job])
+        with self._condition:
+            self._jobs[job.job_id] = job
+            heapq.heappush(self._heap, (next_run, job.job_id))
+            if self._heap[0][1] == job.job_id:
+                self._condition.notify()
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        with self._condition:
+            job = self._jobs.pop(job_id, None)
+            self._compact()
+        if job is not None and self.store is not None:
+            self.store.delete([job_id])
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def upcoming(self, limit: int) -> List[Job]:
+        """
+        The `limit` jobs due soonest, in order. Walks the heap from its top
+        (a parent is never later than its children) instead of sorting every
+        job, passing over stale entries on the way.
+        """
+        jobs: List[Job] = []
+        with self._condition:
+            heap = self._heap
+            frontier = [(heap[0], 0)] if heap and limit > 0 else []
+            while frontier:
+                (next_run, job_id), index = heapq.heappop(frontier)
+                job = self._jobs.get(job_id)
+                if job is not None and job.next_run == next_run:
+                    jobs.append(job)
+                    if len(jobs) == limit:
+                        break
+                for child in (2 * index + 1, 2 * index + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child], child))
+        return jobs
+
+    def _compact(self) -> None:
+        # Rebuild once stale entries are the majority, so the heap stays O(jobs).
+        if len(self._heap) > 2 * len(self._jobs) + 64:
+            self._heap = [(job.next_run, job.job_id) for job in self._jobs.values()]
+            heapq.heapify(self._heap)
+
+    def pop_due(self, now: float) -> Tuple[List[Job], List[Job]]:
+        """
+        Take every job due at `now` out of the heap: (jobs to run now, jobs
+        skipped as missed). Recurring jobs are put back for their next run.
+        """
+        due: List[Job] = []
+        missed: List[Job] = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                next_run, job_id = heapq.heappop(self._heap)
+                job = self._jobs.get(job_id)
+                if job is None or job.next_run != next_run:
+                    continue  # cancelled or rescheduled
+                late = now - next_run > self.misfire_grace
+                (missed if late else due).append(job)
+                following = job.trigger.next_after(now)
+                if following is None:
+                    del self._jobs[job_id]
+                else:
+                    updated = job._replace(next_run=following)
+                    self._jobs[job_id] = updated
+                    heapq.heappush(self._heap, (following, job_id))
+        return due, missed
+
+    def next_run_at(self) -> Optional[float]:
+        with self._condition:
+            while self._heap:
+                next_run, job_id = self._heap[0]
+                job = self._jobs.get(job_id)
+                if job is not None and job.next_run == next_run:
+                    return next_run
+                heapq.heappop(self._heap)
+        return None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._concurrency, thread_name_prefix="homeflow-schedule"
+        )
+        self._thread = threading.Thread(target=self._loop, name="homeflow-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _loop(self) -> None:
+        while True:
+            with self._condition:
+                if self._stopping:
+                    return
+                next_run = self.next_run_at()
+                wait = None if next_run is None else next_run - self._clock()
+                if wait is None or wait > 0:
+                    # Woken early by add() and stop(); capped so a changed
+                    # wall clock is noticed.
+                    self._condition.wait(60.0 if wait is None else min(wait, 60.0))
+                    continue
+            now = self._clock()
+            due, missed = self.pop_due(now)
+            for job in missed:
+                logging.warning(
+                    "Skipping scheduled %s '%s' (%s): missed its run at %s",
+                    job.kind, job.target, job.job_id, format_time(job.next_run),
+                )
+            self._finish([job._replace(last_run=now, last_status=MISSED) for job in missed])
+            for job in due:
+                assert self._executor is not None
+                self._executor.submit(self._execute, job, now)
+
+    def _execute(self, job: Job, now: float) -> None:
+        logging.info("Running scheduled %s '%s' (%s)", job.kind, job.target, job.job_id)
+        try:
+            response = self._run(job)
+            status = "ok" if response.get("success") else "failed"
+        except Exception:
+            logging.exception("Scheduled job %s crashed", job.job_id)
+            status = "error"
+        self._finish([job._replace(last_run=now, last_status=status, runs=job.runs + 1)])
+
+    def _finish(self, finished: List[Job]) -> None:
+        """
+        Record runs, in memory and in the store; finished one-shot jobs are
+        deleted.
+        """
+        if not finished:
+            return
+        keep, done = [], []
+        with self._condition:
+            for job in finished:
+                current = self._jobs.get(job.job_id)
+                if current is None:
+                    done.append(job.job_id)
+                    continue
+                updated = current._replace(
+                    last_run=job.last_run, last_status=job.last_status, runs=job.runs
+                )
+                self._jobs[job.job_id] = updated
+                keep.append(updated)
+        if self.store is None:
+            return
+        try:
+            if keep:
+                self.store.save(keep)
+            if done:
+                self.store.delete(done)
+        except sqlite3.Error as e:
+            logging.error("Failed to record scheduled runs: %s", e)
@@ -0,0 +1,278 @@
+"""
+Headless EV and UAV simulation, stepped at a fixed timestep.
+
+This is the model behind `demo.py`, without Tk. A `Simulation` holds one
+state array per quantity: every EV's state of charge and whether it is
+charging, and every drone's position, the index of the waypoint it is flying
+to and its mode (idle, patrolling or returning home). All drones fly the same
+patrol path, whose first point is home. A step advances everything by `dt`
+seconds at once:
+
+- a charging EV gains `charge_rate` % per second and stops at 100 %;
+- a patrolling drone flies towards its waypoint at `patrol_speed` and, once
+  it is closer than one step, lands on it and moves on to the next one,
+  going round the path for as long as it patrols;
+- a returning drone flies home at `return_speed` and goes idle on arrival.
+
+The defaults match the demo's old per-tick increments (0.6 % every 300 ms,
+4 and 5 canvas units every 80 ms), in units of the path per second.
+
+`run` steps as fast as the machine allows (headless, faster than real
+time). `advance` is for a view that samples wall-clock time: it runs as
+many whole steps as fit in the elapsed time and carries the remainder over.
+
+With NumPy installed a step is a few array operations over all agents; the
+plain Python fallback loops over them and is fine for a handful.
+"""
+
+import math
+from typing import Any, List, Optional, Sequence, Tuple
+
+DEFAULT_DT = 0.04  # seconds per step
+
+IDLE = 0
+PATROL = 1
+RETURN = 2
+
+Point = Tuple[float, float]
+
+
+class SimulationError(ValueError):
+    """
+    The simulation parameters are inconsistent.
+    """
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class Simulation:
+    def __init__(
+        self,
+        evs: int,
+        drones: int,
+        path: Sequence[Point],
+        dt: float = DEFAULT_DT,
+        soc: float = 20.0,
+        charge_rate: float = 2.0,  # % per second
+        patrol_speed: float = 50.0,  # path units per second
+        return_speed: float = 62.5,
+        max_steps_per_advance: int = 100,
+        use_numpy: Optional[bool] = None,
+    ) -> None:
+        if evs < 0 or drones < 0:
+            raise SimulationError("Agent counts cannot be negative")
+        if not path:
+            raise SimulationError("The patrol path needs at least one point (home)")
+        if dt <= 0:
+            raise SimulationError("The timestep must be longer than zero")
+        if charge_rate < 0 or patrol_speed <= 0 or return_speed <= 0:
+            raise SimulationError("Drone speeds must be positive and the charge rate cannot be negative")
+
+        np = _numpy() if use_numpy is not False else None
+        if use_numpy and np is None:
+            raise SimulationError("NumPy is not installed")
+        self._np = np
+
+        self.dt = dt
+        self.charge_rate = charge_rate
+        self.patrol_speed = patrol_speed
+        self.return_speed = return_speed
+        self.max_steps_per_advance = max_steps_per_advance
+        self.time = 0.0
+        self.steps = 0
+        self._pending = 0.0  # wall time not yet simulated by advance()
+
+        # Coordinates are kept as separate x and y arrays: contiguous arrays
+        # gather and reduce several times faster than the columns of an (n, 2).
+        self.path_x = [float(x) for x, _ in path]
+        self.path_y = [float(y) for _, y in path]
+        home_x, home_y = self.path_x[0], self.path_y[0]
+        if np is not None:
+            self.path_x = np.asarray(self.path_x)
+            self.path_y = np.asarray(self.path_y)
+            self.soc = np.full(evs, float(soc))
+            self.charging = np.zeros(evs, dtype=bool)
+            self.x = np.full(drones, home_x)
+            self.y = np.full(drones, home_y)
+            self.waypoint = np.zeros(drones, dtype=np.intp)
+            self.mode = np.full(drones, IDLE, dtype=np.intp)
+            self._step_by_mode = np.array((0.0, patrol_speed * dt, return_speed * dt))
+        else:
+            self.soc = [float(soc)] * evs
+            self.charging = [False] * evs
+            self.x = [home_x] * drones
+            self.y = [home_y] * drones
+            self.waypoint = [0] * drones
+            self.mode = [IDLE] * drones
+
+    @property
+    def evs(self) -> int:
+        return len(self.soc)
+
+    @property
+    def drones(self) -> int:
+        return len(self.mode)
+
+    # -------------------------
+    # Commands
+    # -------------------------
+    # `index` is one agent, or None for all of them.
+
+    def _set(self, array: Any, index: Optional[int], value: Any) -> None:
+        if index is not None:
+            array[index] = value
+        elif self._np is not None:
+            array[:] = value
+        else:
+            array[:] = [value] * len(array)
+
+    def start_charging(self, index: Optional[int] = None) -> None:
+        self._set(self.charging, index, True)
+
+    def stop_charging(self, index: Optional[int] = None) -> None:
+        self._set(self.charging, index, False)
+
+    def start_patrol(self, index: Optional[int] = None) -> None:
+        """
+        Patrol from the start of the path, as the demo's button does.
+        """
+        self._set(self.mode, index, PATROL)
+        self._set(self.waypoint, index, 0)
+
+    def return_home(self, index: Optional[int] = None) -> None:
+        self._set(self.mode, index, RETURN)
+
+    # -------------------------
+    # Sampling
+    # -------------------------
+
+    def ev_soc(self, index: int) -> float:
+        return float(self.soc[index])
+
+    def is_charging(self, index: int) -> bool:
+        return bool(self.charging[index])
+
+    def drone_position(self, index: int) -> Point:
+        return float(self.x[index]), float(self.y[index])
+
+    def drone_mode(self, index: int) -> int:
+        return int(self.mode[index])
+
+    # -------------------------
+    # Stepping
+    # -------------------------
+
+    def step(self, count: int = 1) -> None:
+        for _ in range(count):
+            if self._np is not None:
+                self._step_numpy(self._np)
+            else:
+                self._step_python()
+        self.steps += count
+        self.time = self.steps * self.dt
+
+    def run(self, seconds: float) -> int:
+        """
+        Headless: simulate `seconds` of time as fast as possible. Returns the
+        number of steps taken.
+        """
+        count = int(round(seconds / self.dt))
+        self.step(count)
+        return count
+
+    def advance(self, elapsed: float) -> int:
+        """
+        Simulate `elapsed` seconds of wall time in whole steps, keeping the
+        remainder for the next call. A view that stalls (a dragged window, a
+        breakpoint) gets at most `max_steps_per_advance` steps and drops the
+        rest instead of freezing to catch up.
+        """
+        self._pending += max(0.0, elapsed)
+        count = int(self._pending / self.dt)
+        self._pending -= count * self.dt
+        if count > self.max_steps_per_advance:
+            count = self.max_steps_per_advance
+            self._pending = 0.0
+        self.step(count)
+        return count
+
+    def _step_numpy(self, np: Any) -> None:
+        # Whole-array operations only: boolean-mask indexing copies, and at
+        # 10k agents those copies cost more than the arithmetic.
+        dt = self.dt
+        if len(self.soc):
+            self.soc += self.charging * (self.charge_rate * dt)
+            np.minimum(self.soc, 100.0, out=self.soc)
+            self.charging &= self.soc < 100.0
+
+        if not len(self.mode):
+            return
+        returning = self.mode == RETURN
+        # Distance covered this step, by mode; idle drones cover none.
+        step = self._step_by_mode.take(self.mode)
+        # Returning drones fly to waypoint 0 (home).
+        target = np.where(returning, 0, self.waypoint)
+        target_x = self.path_x.take(target)
+        target_y = self.path_y.take(target)
+        dx = target_x - self.x
+        dy = target_y - self.y
+        dist = np.hypot(dx, dy)
+        arrived = dist < step
+        # A full step along the way, or all of it on arrival.
+        reach = np.maximum(dist, step)
+        share = np.divide(step, reach, out=np.zeros_like(step), where=reach > 0)
+        self.x += dx * share
+        self.y += dy * share
+        np.copyto(self.x, target_x, where=arrived)
+        np.copyto(self.y, target_y, where=arrived)
+        self.waypoint += arrived & (self.mode == PATROL)
+        self.waypoint[self.waypoint == len(self.path_x)] = 0
+        np.copyto(self.mode, IDLE, where=arrived & returning)
+
+    def _step_python(self) -> None:
+        dt = self.dt
+        soc, charging = self.soc, self.charging
+        for i in range(len(soc)):
+            if charging[i]:
+                soc[i] += self.charge_rate * dt
+                if soc[i] >= 100.0:
+                    soc[i] = 100.0
+                    charging[i] = False
+
+        path_x, path_y = self.path_x, self.path_y
+        xs, ys = self.x, self.y
+        for i, mode in enumerate(self.mode):
+            if mode == IDLE:
+                continue
+            patrolling = mode == PATROL
+            waypoint = self.waypoint[i] if patrolling else 0
+            target_x, target_y = path_x[waypoint], path_y[waypoint]
+            dx = target_x - xs[i]
+            dy = target_y - ys[i]
+            dist = math.hypot(dx, dy)
+            step = (self.patrol_speed if patrolling else self.return_speed) * dt
+            if dist < step:
+                xs[i], ys[i] = target_x, target_y
+                if patrolling:
+                    self.waypoint[i] = (waypoint + 1) % len(path_x)
+                else:
+                    self.mode[i] = IDLE
+            else:
+                xs[i] += step * dx / dist
+                ys[i] += step * dy / dist
+
+    def snapshot(self) -> List[List[float]]:
+        """
+        The state (soc, charging, x, y, waypoint, mode) as plain lists, for
+        comparing runs.
+        """
+        return [
+            [float(v) for v in values]
+            for values in (self.soc, self.charging, self.x, self.y, self.waypoint, self.mode)
+        ]
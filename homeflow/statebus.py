@@ -0,0 +1,169 @@
+"""
+Local publish/subscribe bus for what the plugin is doing.
+
+The plugin publishes one small JSON datagram per handled command and per
+IFTTT outcome to every subscriber address in STATE_BUS (loopback only). UDP
+suits a bus that must never hold the plugin up:
+
+- publishing is one non-blocking `sendto` per subscriber; nothing waits for
+  a reader, and a send that would block is counted and dropped;
+- a subscriber that falls behind loses datagrams once its receive buffer is
+  full, instead of slowing the publisher down;
+- nobody listening costs the same as somebody listening, and works the same
+  on Windows, where there are no Unix datagram sockets.
+
+Every message carries the publisher's pid and a per-process sequence number,
+so a subscriber can tell how many it missed (messages published concurrently
+may arrive slightly out of order). Processes come and go (one per
+command without the daemon), so gaps are tracked per pid.
+
+Datagrams are not authenticated or encrypted: any local process that binds a
+subscriber address reads command parameters and results. The bus is off
+unless STATE_BUS.ENABLED is set.
+"""
+
+import ipaddress
+import itertools
+import json
+import os
+import socket
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_PORT = 47800
+
+# Loopback datagrams can be up to 64 KiB; anything bigger loses its bulky
+# fields rather than the whole message.
+MAX_DATAGRAM_BYTES = 60_000
+BULKY_FIELDS = ("params", "values", "message")
+
+Address = Tuple[str, int]
+
+# json.dumps with options builds a new encoder on every call.
+_ENCODER = json.JSONEncoder(default=str, ensure_ascii=False, separators=(",", ":"))
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def parse_address(text: str) -> Address:
+    """
+    "host:port", or just "port" for 127.0.0.1. Raises ValueError.
+    """
+    host, _, port = text.rpartition(":")
+    number = int(port)
+    if not 0 < number < 65536:
+        raise ValueError(f"port {number} is out of range")
+    return (host or "127.0.0.1", number)
+
+
+class StateBusPublisher:
+    """
+    Sends messages to a fixed list of subscriber addresses. Safe to share
+    between threads.
+    """
+
+    def __init__(self, subscribers: Sequence[Address]) -> None:
+        self.subscribers = tuple(subscribers)
+        self.published = 0
+        self.dropped = 0  # sends that would have blocked or failed
+        self._sequence = itertools.count(1)
+        self._pid = os.getpid()
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def publish(self, kind: str, **fields: Any) -> None:
+        message = {"kind": kind, "pid": self._pid, "seq": next(self._sequence), "ts": time.time()}
+        message.update(fields)
+        data = _ENCODER.encode(message).encode("utf-8")
+        if len(data) > MAX_DATAGRAM_BYTES:
+            for name in BULKY_FIELDS:
+                message.pop(name, None)
+            message["truncated"] = True
+            data = _ENCODER.encode(message).encode("utf-8")
+        for address in self.subscribers:
+            try:
+                self._socket.sendto(data, address)
+            except OSError:
+                # Full send buffer, or nobody at the address on some platforms.
+                self.dropped += 1
+        self.published += 1
+
+    def close(self) -> None:
+        self._socket.close()
+
+
+class StateBusSubscriber:
+    """
+    Receives the plugin's messages on `address`. `poll()` never blocks; call
+    it from the consumer's own loop (a Tk `after` callback, say), or wait on
+    `fileno()` first.
+    """
+
+    def __init__(
+        self,
+        address: Address = ("127.0.0.1", DEFAULT_PORT),
+        buffer_bytes: int = 256 * 1024,
+    ) -> None:
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, buffer_bytes)
+            self._socket.bind(address)
+        except OSError:
+            self._socket.close()
+            raise
+        self._socket.setblocking(False)
+        self.address: Address = self._socket.getsockname()
+        self.received = 0
+        self.missed = 0  # messages known to be lost, from sequence gaps
+        self._last_seq: Dict[int, int] = {}
+
+    def fileno(self) -> int:
+        return self._socket.fileno()
+
+    def poll(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Every message that has arrived since the last call (at most `limit`),
+        oldest first. Datagrams that are not bus messages are skipped.
+        """
+        messages: List[Dict[str, Any]] = []
+        while limit is None or len(messages) < limit:
+            try:
+                data = self._socket.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                break
+            except ConnectionResetError:
+                # Windows reports an earlier ICMP error on the next receive.
+                continue
+            try:
+                message = json.loads(data)
+                pid, seq = message["pid"], message["seq"]
+            except (ValueError, TypeError, KeyError):
+                continue
+            # Handlers publish from several threads, so messages can arrive
+            # slightly out of order: a late one was counted as missed already.
+            last = self._last_seq.get(pid)
+            if last is None or seq > last:
+                if last is not None:
+                    self.missed += seq - last - 1
+                self._last_seq[pid] = seq
+            elif self.missed:
+                self.missed -= 1
+            self.received += 1
+            messages.append(message)
+        return messages
+
+    def close(self) -> None:
+        self._socket.close()
+
+    def __enter__(self) -> "StateBusSubscriber":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,389 @@
+"""
+Pooled keep-alive HTTP transports for IFTTT Webhooks.
+
+Each transport keeps a bounded connection pool, so consecutive triggers
+reuse an open TCP/TLS connection to maker.ifttt.com instead of paying DNS,
+TCP and TLS setup every time. `prewarm()` opens that connection ahead of the
+first real command.
+
+Two interchangeable implementations, selected with HTTP_TRANSPORT:
+
+- "requests": `PooledTransport`, a `requests.Session` (the default).
+- "http.client": `HTTPClientTransport`, standard library only. It skips the
+  import cost of requests/urllib3, which matters when the plugin is spawned
+  once per command.
+
+Neither HTTP stack is imported until the first transport is created, so
+commands that never touch the network don't load one.
+
+A request is only sent a second time (after a pooled connection turned out
+to be closed) when the caller passes `replay=True`, i.e. when running it
+twice is harmless.
+"""
+
+import logging
+import queue
+import select
+import socket
+import threading
+import time
+from json import dumps as _json_dumps
+from typing import Any, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_POOL_SIZE = 4
+
+REQUESTS = "requests"
+HTTP_CLIENT = "http.client"
+TRANSPORTS = (REQUESTS, HTTP_CLIENT)
+
+_USER_AGENT = "AeroVolt-HomeFlow"
+
+
+class TransportError(Exception):
+    """
+    Raised when a request could not be completed (DNS, connect, TLS, timeout).
+    """
+
+
+class RequestNotSent(TransportError):
+    """
+    The request never left this process: no pool slot became free, or the
+    connection could not be opened. Sending it again cannot run it twice.
+    """
+
+
+class HTTPStatusError(TransportError):
+    """
+    Raised by `TransportResponse.raise_for_status()` for 4xx/5xx answers.
+    """
+
+    def __init__(self, message: str, status_code: int, headers: Mapping[str, str]) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.headers = headers
+
+
+class TransportResponse:
+    """
+    Fully read HTTP response. The body is consumed before the response is
+    returned so the underlying connection goes straight back to the pool.
+    """
+
+    __slots__ = ("status_code", "reason", "headers", "text", "host")
+
+    def __init__(
+        self,
+        status_code: int,
+        reason: str,
+        headers: Mapping[str, str],
+        text: str,
+        host: str,
+    ) -> None:
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.text = text
+        self.host = host
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            kind = "Client" if self.status_code < 500 else "Server"
+            # Deliberately leaves out the URL: it contains the Webhooks key.
+            raise HTTPStatusError(
+                f"{self.status_code} {kind} Error: {self.reason} from {self.host}",
+                self.status_code,
+                self.headers,
+            )
+
+
+def _redact_path(message: str, url: str) -> str:
+    """
+    Strip the request path (which carries the Webhooks key) from an error message.
+    """
+    path = urlsplit(url).path
+    if len(path) > 1:
+        message = message.replace(path, "/...")
+    return message
+
+
+class BaseTransport:
+    """
+    Shared behaviour of the transports; subclasses implement `request` and `close`.
+    """
+
+    pool_size: int
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        json: Optional[Any] = None,
+        timeout: float = 10,
+        replay: bool = False,
+    ) -> TransportResponse:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+    def post(
+        self,
+        url: str,
+        json: Optional[Any] = None,
+        timeout: float = 10,
+        replay: bool = False,
+    ) -> TransportResponse:
+        return self.request("POST", url, json=json, timeout=timeout, replay=replay)
+
+    def prewarm(self, url: str, timeout: float = 5) -> None:
+        """
+        Resolve the host of `url` and park an open connection to it in the pool.
+        Failures are logged and otherwise ignored; the next real call simply
+        opens its own connection.
+        """
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}/"
+        started = time.perf_counter()
+        try:
+            socket.getaddrinfo(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+            self.request("HEAD", origin, timeout=timeout, replay=True)
+        except (OSError, TransportError) as e:
+            logging.info("Connection prewarm to %s failed: %s", origin, e)
+            return
+        logging.info(
+            "Connection to %s prewarmed in %.0f ms",
+            origin,
+            (time.perf_counter() - started) * 1000,
+        )
+
+    def prewarm_in_background(self, url: str, timeout: float = 5) -> threading.Thread:
+        thread = threading.Thread(
+            target=self.prewarm,
+            args=(url, timeout),
+            name="homeflow-prewarm",
+            daemon=True,
+        )
+        thread.start()
+        return thread
+
+
+class PooledTransport(BaseTransport):
+    """
+    Thread-safe HTTP client backed by one keep-alive `requests.Session`.
+
+    At most `pool_size` connections are kept per host; callers beyond that
+    wait for a free connection rather than opening extra sockets. Requests
+    are never retried here (`max_retries=0`), whatever `replay` says; urllib3
+    already skips pooled connections the server has closed.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE) -> None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.pool_size = pool_size
+        from urllib3.exceptions import NewConnectionError
+
+        self._request_exception = requests.exceptions.RequestException
+        self._connect_timeout = requests.exceptions.ConnectTimeout
+        self._new_connection_error = NewConnectionError
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=0,
+            pool_block=True,
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers["Connection"] = "keep-alive"
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        json: Optional[Any] = None,
+        timeout: float = 10,
+        replay: bool = False,
+    ) -> TransportResponse:
+        try:
+            response = self._session.request(method, url, json=json, timeout=timeout)
+            text = response.text
+        except self._request_exception as e:
+            reason = getattr(e.args[0], "reason", None) if e.args else None
+            unsent = isinstance(e, self._connect_timeout) or isinstance(reason, self._new_connection_error)
+            error = RequestNotSent if unsent else TransportError
+            raise error(_redact_path(str(e), url)) from e
+        return TransportResponse(
+            response.status_code,
+            response.reason or "",
+            response.headers,
+            text,
+            urlsplit(url).hostname or "",
+        )
+
+    def close(self) -> None:
+        self._session.close()
+
+
+_Origin = Tuple[str, str, int]
+
+
+class HTTPClientTransport(BaseTransport):
+    """
+    Standard-library HTTP client: a pool of keep-alive `http.client`
+    connections per origin, at most `pool_size` of them in use at once.
+
+    A pooled connection the server has visibly closed in the meantime is
+    dropped before use. One that fails once the request is on its way is
+    only retried on a fresh connection with `replay=True`, since the server
+    may already have acted on it.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE) -> None:
+        import http.client
+
+        self._http = http.client
+        self.pool_size = pool_size
+        self._idle: Dict[_Origin, "queue.LifoQueue[http.client.HTTPConnection]"] = {}
+        self._slots: Dict[_Origin, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self._ssl_context: Optional[Any] = None
+
+    def _pool(self, origin: _Origin) -> Tuple["queue.LifoQueue[Any]", threading.BoundedSemaphore]:
+        with self._lock:
+            if origin not in self._idle:
+                self._idle[origin] = queue.LifoQueue()
+                self._slots[origin] = threading.BoundedSemaphore(self.pool_size)
+            return self._idle[origin], self._slots[origin]
+
+    def _connect(self, origin: _Origin, timeout: float) -> Any:
+        scheme, host, port = origin
+        if scheme == "https":
+            if self._ssl_context is None:
+                import ssl
+
+                self._ssl_context = ssl.create_default_context()
+            return self._http.HTTPSConnection(host, port, timeout=timeout, context=self._ssl_context)
+        return self._http.HTTPConnection(host, port, timeout=timeout)
+
+    @staticmethod
+    def _dropped(connection: Any) -> bool:
+        """
+        True when an idle connection is readable, i.e. the server closed it
+        (or sent something unasked) while it sat in the pool.
+        """
+        if connection.sock is None:
+            return True
+        try:
+            return bool(select.select([connection.sock], [], [], 0)[0])
+        except (OSError, ValueError):
+            return True
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        json: Optional[Any] = None,
+        timeout: float = 10,
+        replay: bool = False,
+    ) -> TransportResponse:
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        host = parts.hostname or ""
+        origin = (scheme, host, parts.port or (443 if scheme == "https" else 80))
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+
+        headers = {"Connection": "keep-alive", "User-Agent": _USER_AGENT}
+        body = None
+        if json is not None:
+            body = _json_dumps(json).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        idle, slots = self._pool(origin)
+        if not slots.acquire(timeout=timeout):
+            raise RequestNotSent(f"timed out waiting for a free connection to {host}")
+        try:
+            while True:
+                try:
+                    connection, reused = idle.get_nowait(), True
+                except queue.Empty:
+                    connection, reused = self._connect(origin, timeout), False
+                if reused and self._dropped(connection):
+                    connection.close()
+                    continue
+                if connection.sock is None:
+                    try:
+                        connection.connect()
+                    except (OSError, self._http.HTTPException) as e:
+                        connection.close()
+                        raise RequestNotSent(_redact_path(str(e) or type(e).__name__, url)) from e
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                try:
+                    connection.request(method, target, body=body, headers=headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                except (self._http.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                    connection.close()
+                    if reused and replay:
+                        # Idle connection closed by the server: retry on a new one.
+                        continue
+                    raise TransportError(_redact_path(str(e), url)) from e
+                except (OSError, self._http.HTTPException) as e:
+                    connection.close()
+                    raise TransportError(_redact_path(str(e) or type(e).__name__, url)) from e
+                break
+
+            if response.will_close:
+                connection.close()
+            else:
+                idle.put(connection)
+        finally:
+            slots.release()
+
+        charset = response.headers.get_content_charset() or "utf-8"
+        return TransportResponse(
+            response.status,
+            response.reason or "",
+            response.headers,
+            data.decode(charset, errors="replace"),
+            host,
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            pools = list(self._idle.values())
+        for idle in pools:
+            while True:
+                try:
+                    idle.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+_TRANSPORTS: Dict[str, BaseTransport] = {}
+_TRANSPORT_LOCK = threading.Lock()
+
+
+def get_transport(pool_size: int = DEFAULT_POOL_SIZE, kind: str = REQUESTS) -> BaseTransport:
+    """
+    Return the shared transport of the given kind, creating it on first use.
+    """
+    transport = _TRANSPORTS.get(kind)
+    if transport is None:
+        with _TRANSPORT_LOCK:
+            transport = _TRANSPORTS.get(kind)
+            if transport is None:
+                if kind == HTTP_CLIENT:
+                    transport = HTTPClientTransport(pool_size)
+                elif kind == REQUESTS:
+                    transport = PooledTransport(pool_size)
+                else:
+                    raise ValueError(f"unknown HTTP transport: {kind}")
+                _TRANSPORTS[kind] = transport
+    return transport
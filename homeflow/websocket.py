@@ -0,0 +1,313 @@
+"""
+Minimal WebSocket (RFC 6455) connections on the standard library.
+
+Enough for a JSON message protocol such as Home Assistant's: text and binary
+messages, fragmented messages, ping/pong and the closing handshake, over
+ws:// or wss://. No extensions (permessage-deflate is never offered) and no
+subprotocols.
+
+`connect` is the client side. `accept` runs the server side of the handshake
+on an already accepted socket, for local stand-in servers.
+
+One thread may block in `recv` while others `send`; sends are serialized.
+"""
+
+import base64
+import hashlib
+import os
+import socket
+import struct
+import threading
+from typing import Any, BinaryIO, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+CONTINUATION = 0x0
+TEXT = 0x1
+BINARY = 0x2
+CLOSE = 0x8
+PING = 0x9
+PONG = 0xA
+
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_USER_AGENT = "AeroVolt-HomeFlow"
+
+
+class WebSocketError(Exception):
+    """
+    The handshake failed or the peer broke the protocol.
+    """
+
+
+class WebSocketClosed(WebSocketError):
+    """
+    The connection is closed: by a close frame (`code` as sent) or because the
+    socket went away (1006).
+    """
+
+    def __init__(self, code: int = 1006, reason: str = "connection lost") -> None:
+        super().__init__(f"WebSocket closed ({code}): {reason}")
+        self.code = code
+        self.reason = reason
+
+
+def _accept_value(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + _GUID).encode("ascii")).digest()).decode("ascii")
+
+
+def encode_frame(opcode: int, payload: bytes, mask: bool) -> bytes:
+    """
+    One final frame. Clients must mask what they send; servers must not.
+    """
+    length = len(payload)
+    head = bytes((0x80 | opcode,))
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        head += bytes((mask_bit | length,))
+    elif length < 1 << 16:
+        head += bytes((mask_bit | 126,)) + struct.pack("!H", length)
+    else:
+        head += bytes((mask_bit | 127,)) + struct.pack("!Q", length)
+    if not mask:
+        return head + payload
+    key = os.urandom(4)
+    return head + key + _apply_mask(payload, key)
+
+
+def _apply_mask(payload: bytes, key: bytes) -> bytes:
+    # XOR as one big integer: far faster than a per-byte loop.
+    if not payload:
+        return payload
+    repeated = (key * (len(payload) // 4 + 1))[: len(payload)]
+    value = int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")
+    return value.to_bytes(len(payload), "big")
+
+
+def _read_exact(rfile: BinaryIO, count: int) -> bytes:
+    try:
+        data = rfile.read(count)
+    except (OSError, ValueError) as e:
+        # ValueError: the file was closed under us by close().
+        raise WebSocketClosed(1006, str(e) or "connection lost")
+    if data is None or len(data) < count:
+        raise WebSocketClosed(1006, "connection lost")
+    return data
+
+
+def read_frame(rfile: BinaryIO) -> Tuple[bool, int, bytes]:
+    """
+    (fin, opcode, unmasked payload) of the next frame.
+    """
+    first, second = _read_exact(rfile, 2)
+    fin, opcode = bool(first & 0x80), first & 0x0F
+    if first & 0x70:
+        raise WebSocketError("Reserved bits set; no extension was negotiated")
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", _read_exact(rfile, 2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", _read_exact(rfile, 8))
+    if length > MAX_MESSAGE_BYTES:
+        raise WebSocketError(f"Frame of {length} bytes is too large")
+    key = _read_exact(rfile, 4) if second & 0x80 else None
+    payload = _read_exact(rfile, length)
+    if key is not None:
+        payload = _apply_mask(payload, key)
+    return fin, opcode, payload
+
+
+class WebSocket:
+    """
+    An open WebSocket over `sock`. `mask` is True on the client side.
+    """
+
+    def __init__(self, sock: socket.socket, rfile: BinaryIO, mask: bool) -> None:
+        self.sock = sock
+        self._rfile = rfile
+        self._mask = mask
+        self._send_lock = threading.Lock()
+        self._close_sent = False
+        self.closed = False
+
+    def settimeout(self, timeout: Optional[float]) -> None:
+        self.sock.settimeout(timeout)
+
+    def send_text(self, text: str) -> None:
+        self._send(TEXT, text.encode("utf-8"))
+
+    def send_bytes(self, data: bytes) -> None:
+        self._send(BINARY, data)
+
+    def ping(self, data: bytes = b"") -> None:
+        self._send(PING, data)
+
+    def _send(self, opcode: int, payload: bytes) -> None:
+        frame = encode_frame(opcode, payload, self._mask)
+        with self._send_lock:
+            if self._close_sent and opcode != CLOSE:
+                raise WebSocketClosed(1000, "closing")
+            try:
+                self.sock.sendall(frame)
+            except OSError as e:
+                raise WebSocketClosed(1006, str(e) or "connection lost")
+            if opcode == CLOSE:
+                self._close_sent = True
+
+    def recv(self) -> Union[str, bytes]:
+        """
+        The next text (str) or binary (bytes) message. Answers pings, and
+        raises WebSocketClosed when the peer closes or the connection drops.
+        """
+        parts = []
+        kind: Optional[int] = None
+        size = 0
+        while True:
+            fin, opcode, payload = read_frame(self._rfile)
+            if opcode == PING:
+                try:
+                    self._send(PONG, payload)
+                except WebSocketClosed:
+                    pass
+                continue
+            if opcode == PONG:
+                continue
+            if opcode == CLOSE:
+                code = struct.unpack("!H", payload[:2])[0] if len(payload) >= 2 else 1005
+                reason = payload[2:].decode("utf-8", "replace")
+                if not self._close_sent:
+                    try:
+                        self._send(CLOSE, payload[:2])
+                    except WebSocketClosed:
+                        pass
+                self._shutdown()
+                raise WebSocketClosed(code, reason or "closed by peer")
+            if opcode in (TEXT, BINARY):
+                if kind is not None:
+                    raise WebSocketError("New message before the previous one was finished")
+                kind = opcode
+            elif opcode != CONTINUATION or kind is None:
+                raise WebSocketError(f"Unexpected frame opcode {opcode:#x}")
+            size += len(payload)
+            if size > MAX_MESSAGE_BYTES:
+                raise WebSocketError(f"Message larger than {MAX_MESSAGE_BYTES} bytes")
+            parts.append(payload)
+            if fin:
+                data = b"".join(parts)
+                return data.decode("utf-8") if kind == TEXT else data
+
+    def close(self, code: int = 1000, reason: str = "") -> None:
+        """
+        Send a close frame (if none was sent yet) and drop the connection
+        without waiting for the peer's answer; a thread blocked in `recv`
+        gets WebSocketClosed.
+        """
+        if self.closed:
+            return
+        if not self._close_sent:
+            try:
+                self._send(CLOSE, struct.pack("!H", code) + reason.encode("utf-8"))
+            except WebSocketClosed:
+                pass
+        self._shutdown()
+
+    def _shutdown(self) -> None:
+        self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def _read_head(rfile: BinaryIO) -> Tuple[str, Dict[str, str]]:
+    """
+    The first line and the headers (lower-cased names) of an HTTP message.
+    """
+    first = rfile.readline(65537).decode("latin-1").strip()
+    if not first:
+        raise WebSocketClosed(1006, "connection closed during the handshake")
+    headers: Dict[str, str] = {}
+    while True:
+        line = rfile.readline(65537).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+        if len(headers) > 100:
+            raise WebSocketError("Too many headers in the handshake")
+    return first, headers
+
+
+def connect(
+    url: str,
+    timeout: float = 10,
+    headers: Optional[Dict[str, str]] = None,
+    ssl_context: Any = None,
+) -> WebSocket:
+    """
+    Open a client connection to a ws:// or wss:// URL. `timeout` covers the
+    TCP/TLS connect and the handshake; the returned socket blocks without one.
+    Raises OSError or WebSocketError.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("ws", "wss") or not parts.hostname:
+        raise WebSocketError(f"Not a ws:// or wss:// URL: {url}")
+    secure = parts.scheme == "wss"
+    port = parts.port or (443 if secure else 80)
+
+    sock = socket.create_connection((parts.hostname, port), timeout=timeout)
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if secure:
+            import ssl
+
+            context = ssl_context or ssl.create_default_context()
+            sock = context.wrap_socket(sock, server_hostname=parts.hostname)
+
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        host = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+        lines = [
+            f"GET {parts.path or '/'}{'?' + parts.query if parts.query else ''} HTTP/1.1",
+            f"Host: {host}",
+            "Upgrade: websocket",
+            "Connection: Upgrade",
+            f"Sec-WebSocket-Key: {key}",
+            "Sec-WebSocket-Version: 13",
+            f"User-Agent: {_USER_AGENT}",
+        ]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+        rfile = sock.makefile("rb")
+        status, response = _read_head(rfile)
+        if status.split(" ", 2)[1:2] != ["101"]:
+            raise WebSocketError(f"Handshake refused: {status}")
+        if response.get("sec-websocket-accept") != _accept_value(key):
+            raise WebSocketError("Handshake answer has the wrong Sec-WebSocket-Accept")
+    except BaseException:
+        sock.close()
+        raise
+    sock.settimeout(None)
+    return WebSocket(sock, rfile, mask=True)
+
+
+def accept(sock: socket.socket) -> WebSocket:
+    """
+    Server side of the handshake on an accepted connection. Raises
+    WebSocketError (after answering 400) for anything but a WebSocket upgrade.
+    """
+    rfile = sock.makefile("rb")
+    _, request = _read_head(rfile)
+    key = request.get("sec-websocket-key")
+    if request.get("upgrade", "").lower() != "websocket" or not key:
+        sock.sendall(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+        raise WebSocketError("Not a WebSocket upgrade request")
+    sock.sendall(
+        (
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {_accept_value(key)}\r\n\r\n"
+        ).encode("latin-1")
+    )
+    return WebSocket(sock, rfile, mask=False)
@@ -26,90 +26,446 @@
     terminated with the marker `<<END>>`, following the official example.
     """
 
+    import atexit
+    import contextvars
+    import functools
     import json
     import logging
     import os
+    import signal
     import sys
+    import threading
     import time
-    from typing import Any, Dict, Optional
-
-    import requests
+    from typing import (
+        TYPE_CHECKING,
+        Any,
+        Awaitable,
+        Callable,
+        Dict,
+        FrozenSet,
+        List,
+        Mapping,
+        Optional,
+        Tuple,
+    )
+    from urllib.parse import urlsplit
+
+    from homeflow.backends import (
+        IFTTT,
+        Backend,
+        HomeAssistantSettings,
+        close_connections,
+        close_unused_connections,
+        create_backend,
+    )
+    from homeflow.coalesce import Coalescer, CoalescingTimeout
+    from homeflow.config import (
+        PERIMETER,
+        BatchSettings,
+        ConfigError,
+        ConfigSnapshot,
+        ConfigWatcher,
+        EvChargingSettings,
+        LoggingSettings,
+        UavPatrolSettings,
+        read_config,
+    )
+    from homeflow.daemon import (
+        DaemonClient,
+        DaemonConnectionLost,
+        DaemonServer,
+        DaemonUnavailable,
+        daemon_command,
+        load_authkey,
+        spawn_daemon,
+    )
+    from homeflow.framing import FrameReader
+    from homeflow.logs import Truncated, configure_logging, flush_logging
+    from homeflow.metrics import REGISTRY, Histogram, MetricFamily, PrometheusFileExporter
+    from homeflow.nameindex import EV, MOBILITY, UAV, Match, NameIndex
+    from homeflow.ratelimit import (
+        RateLimitExceeded,
+        TokenBucket,
+        get_rate_limiter,
+        parse_retry_after,
+    )
+    from homeflow.resilience import (
+        Deadline,
+        RetryPolicy,
+        current_deadline,
+        get_circuit_breaker,
+        get_latency_tracker,
+    )
+    from homeflow.statebus import StateBusPublisher
+    from homeflow.transport import (
+        BaseTransport,
+        HTTPStatusError,
+        RequestNotSent,
+        TransportError,
+        get_transport,
+    )
+
+    if TYPE_CHECKING:
+        from concurrent.futures import ThreadPoolExecutor
+
+        from homeflow.outbox import Delivery, Outbox, OutboxFlusher
+        from homeflow.charging import ChargePlan, Vehicle
+        from homeflow.coverage import CoveragePlan, PathCache
+        from homeflow.macros import Macro, MacroRun, MacroStep
+        from homeflow.scheduler import Job, Scheduler
+
+    # Heavy modules (requests/urllib3, sqlite3, asyncio) are imported on first
+    # use, not here: the plugin may be spawned once per command, listing scenes
+    # or initializing should not pay for an HTTP stack or a database driver, and
+    # a client forwarding to the daemon needs no event loop at all.
 
     # -------------------------
     # Configuration & Constants
     # -------------------------
 
-    CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config.json")
+    CONFIG_PATH = os.environ.get(
+        "HOMEFLOW_CONFIG_PATH",
+        os.path.join(os.path.dirname(__file__), "config.json"),
+    )
     LOG_FILE_PATH = os.path.join(os.path.expanduser("~"), "HomeFlow_plugin.log")
-    IFTTT_BASE_URL = "https://maker.ifttt.com/trigger/{event_name}/with/key/{api_key}"
+    OUTBOX_PATH = os.path.join(os.path.expanduser("~"), "HomeFlow_outbox.sqlite3")
+    SCHEDULES_PATH = os.path.join(os.path.expanduser("~"), "HomeFlow_schedules.sqlite3")
+    PATHS_DIR = os.path.join(os.path.expanduser("~"), "HomeFlow_paths")
+    IFTTT_BASE_URL = os.environ.get(
+        "IFTTT_BASE_URL",
+        "https://maker.ifttt.com/trigger/{event_name}/with/key/{api_key}",
+    )
 
 
     # -------------------------
     # Logging Setup
     # -------------------------
 
-    def setup_logging() -> None:
+    # Logged once or more per command; LOGGING.SAMPLE_EVERY thins these out.
+    HIGH_VOLUME_LOG_MESSAGES = (
+        "Received command: %s",
+        "Sending response: %s",
+        "Sending response to client: %s",
+    )
+
+
+    def setup_logging(settings: Optional[LoggingSettings] = None) -> None:
+        """
+        Log to LOG_FILE_PATH and stderr. In the default "queue" mode a background
+        thread formats and writes the records and the file rotates by size;
+        "sync" writes from the logging thread to one unbounded file.
+        """
+        settings = settings or LoggingSettings()
         os.makedirs(os.path.dirname(LOG_FILE_PATH), exist_ok=True)
-        logging.basicConfig(
-            filename=LOG_FILE_PATH,
-            level=logging.INFO,
-            format="%(asctime)s - %(levelname)s - %(message)s",
+        configure_logging(
+            LOG_FILE_PATH,
+            mode=settings.mode,
+            max_bytes=settings.max_bytes,
+            backup_count=settings.backup_count,
+            sampled_messages=HIGH_VOLUME_LOG_MESSAGES,
+            sample_every=settings.sample_every,
         )
-        # Also log to stderr for easier debugging when run from console
-        console = logging.StreamHandler(sys.stderr)
-        console.setLevel(logging.INFO)
-        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-        console.setFormatter(formatter)
-        logging.getLogger().addHandler(console)
+
+
+    def log_payload(value: Any) -> Truncated:
+        """
+        Log argument for a command or response, cut to LOGGING.MAX_PAYLOAD_CHARS
+        when it is formatted.
+        """
+        return Truncated(value, get_config().logging.max_payload_chars)
+
+
+    # -------------------------
+    # Metrics
+    # -------------------------
+
+    FRAME_READ_SECONDS = REGISTRY.histogram(
+        "homeflow_frame_read_seconds",
+        "Time spent splitting one chunk of stdin into frames",
+    )
+    PARSE_SECONDS = REGISTRY.histogram(
+        "homeflow_parse_seconds",
+        "Time spent decoding one command frame as JSON",
+        ("outcome",),
+    )
+    DISPATCH_SECONDS = REGISTRY.histogram(
+        "homeflow_dispatch_seconds",
+        "Time a tool call waited for a free MAX_CONCURRENT_TOOL_CALLS slot",
+        ("function",),
+    )
+    HANDLER_SECONDS = REGISTRY.histogram(
+        "homeflow_handler_seconds",
+        "Duration of one tool call, by function and outcome",
+        ("function", "outcome"),
+    )
+    IFTTT_SECONDS = REGISTRY.histogram(
+        "homeflow_ifttt_request_seconds",
+        "Round trip of one IFTTT request attempt, by event and outcome",
+        ("event", "outcome"),
+    )
+    BACKEND_SECONDS = REGISTRY.histogram(
+        "homeflow_backend_call_seconds",
+        "Round trip of one event sent to a BACKENDS entry, by backend and outcome",
+        ("backend", "outcome"),
+    )
+    IFTTT_REJECTED = REGISTRY.counter(
+        "homeflow_ifttt_rejected_total",
+        "IFTTT events not sent, by event and reason",
+        ("event", "reason"),
+    )
+
+    _METRICS_EXPORTER: Optional[PrometheusFileExporter] = None
+
+
+    def start_metrics_exporter() -> None:
+        """
+        Write the metrics to METRICS.PROMETHEUS_FILE every DUMP_INTERVAL_SECONDS,
+        and once more at exit. Does nothing when no file is configured.
+        """
+        global _METRICS_EXPORTER
+        settings = get_config().metrics
+        if _METRICS_EXPORTER is None and settings.prometheus_file:
+            _METRICS_EXPORTER = PrometheusFileExporter(
+                REGISTRY, settings.prometheus_file, settings.dump_interval_seconds
+            )
+            _METRICS_EXPORTER.start()
+            atexit.register(_METRICS_EXPORTER.stop)
+
+
+    def _http_outcome(status_code: int) -> str:
+        if status_code == 429:
+            return "throttled"
+        return "http_4xx" if status_code < 500 else "http_5xx"
+
+
+    # -------------------------
+    # State Bus
+    # -------------------------
+
+    _STATE_BUS: Optional[StateBusPublisher] = None
+    _STATE_BUS_LOCK = threading.Lock()
+
+
+    def get_state_bus() -> Optional[StateBusPublisher]:
+        """
+        Publisher for the STATE_BUS subscribers, or None when the bus is off.
+        Replaced when a config reload changes the subscriber list.
+        """
+        global _STATE_BUS
+        settings = get_config().state_bus
+        if not settings.enabled:
+            return None
+        bus = _STATE_BUS
+        if bus is not None and bus.subscribers == settings.subscribers:
+            return bus
+        with _STATE_BUS_LOCK:
+            if _STATE_BUS is None or _STATE_BUS.subscribers != settings.subscribers:
+                # A send racing with this close is counted as dropped.
+                if _STATE_BUS is not None:
+                    _STATE_BUS.close()
+                _STATE_BUS = StateBusPublisher(settings.subscribers)
+            return _STATE_BUS
+
+
+    def publish_state(kind: str, **fields: Any) -> None:
+        """
+        Tell local subscribers (the demo, for one) what just happened. Never
+        waits for them and never raises.
+        """
+        bus = get_state_bus()
+        if bus is None:
+            return
+        try:
+            bus.publish(kind, **fields)
+        except (OSError, TypeError, ValueError) as e:
+            logging.debug("State bus message '%s' not published: %s", kind, e)
 
 
     # -------------------------
     # Config Handling
     # -------------------------
 
-    def load_config() -> Dict[str, Any]:
+    def load_config(version: int = 0) -> ConfigSnapshot:
+        """
+        Read config.json and compile it into a validated, immutable snapshot.
+        Invalid values are logged and replaced by their defaults; the rest of the
+        file still applies. Falls back to safe defaults (no real key) when the
+        file is missing or cannot be parsed at all.
+        """
         try:
-            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-                config = json.load(f)
-                logging.info("Config loaded successfully from %s", CONFIG_PATH)
-                return config
+            snapshot = read_config(CONFIG_PATH, version, strict=False)
+            logging.info("Config loaded successfully from %s", CONFIG_PATH)
+            return snapshot
         except FileNotFoundError:
             logging.error("Config file not found at %s", CONFIG_PATH)
         except json.JSONDecodeError as e:
             logging.error("Failed to parse config.json: %s", e)
+        except (OSError, ConfigError) as e:
+            logging.error("Invalid config.json: %s", e)
 
-        # Fallback to safe defaults (no real key)
-        return {
-            "IFTTT_API_KEY": "",
-            "DEFAULT_TIMEOUT_SECONDS": 10,
-            "SCENES": {},
-            "MOBILITY_ACTIONS": {}
-        }
+        return ConfigSnapshot(version=version)
+
+
+    # Latest good snapshot. Replaced as a whole on reload, never mutated.
+    CONFIG: ConfigSnapshot = ConfigSnapshot()
+    _COMMAND_CONFIG: contextvars.ContextVar[Optional[ConfigSnapshot]] = contextvars.ContextVar(
+        "homeflow_command_config", default=None
+    )
+    _CONFIG_WATCHER: Optional[ConfigWatcher] = None
+
+
+    def get_config() -> ConfigSnapshot:
+        """
+        Snapshot of the running command, so a reload never changes the config
+        under a command that is already executing; the latest one otherwise.
+        """
+        snapshot = _COMMAND_CONFIG.get()
+        return snapshot if snapshot is not None else CONFIG
+
+
+    def install_config(snapshot: ConfigSnapshot) -> None:
+        global CONFIG
+        CONFIG = snapshot
 
 
-    CONFIG: Dict[str, Any] = {}
+    def start_config_watcher() -> None:
+        """
+        Reload config.json in the background when it changes on disk.
+        Disabled by setting CONFIG_RELOAD_SECONDS to 0.
+        """
+        global _CONFIG_WATCHER
+        if _CONFIG_WATCHER is None:
+            _CONFIG_WATCHER = ConfigWatcher(
+                CONFIG_PATH,
+                current=lambda: CONFIG,
+                on_reload=install_config,
+                interval=CONFIG.reload_seconds,
+            )
+            _CONFIG_WATCHER.start()
 
 
     def get_ifttt_api_key() -> str:
-        api_key = CONFIG.get("IFTTT_API_KEY", "").strip()
-        return api_key
+        return get_config().ifttt_api_key
 
 
-    def get_timeout_seconds() -> int:
-        try:
-            return int(CONFIG.get("DEFAULT_TIMEOUT_SECONDS", 10))
-        except Exception:
-            return 10
+    def get_timeout_seconds() -> float:
+        return get_config().timeout_seconds
+
+
+    def get_http_pool_size() -> int:
+        return get_config().http_pool_size
+
+
+    def get_ifttt_transport() -> BaseTransport:
+        """
+        Shared HTTP transport selected by HTTP_TRANSPORT ("requests" or "http.client").
+        """
+        config = get_config()
+        return get_transport(config.http_pool_size, config.http_transport)
+
+
+    def get_max_concurrent_tool_calls() -> int:
+        return get_config().max_concurrent_tool_calls
+
+
+    def get_tool_call_response_order() -> str:
+        """
+        "request" writes tool call responses in the order the calls were sent;
+        "completion" writes each one as soon as it is ready.
+        """
+        return get_config().tool_call_response_order
+
+
+    def get_command_deadline_seconds() -> float:
+        """
+        Total time budget for the IFTTT calls of one G-Assist command.
+        """
+        return get_config().command_deadline_seconds
+
+
+    def get_adaptive_timeout_settings() -> Tuple[float, float]:
+        """
+        (floor in seconds, multiplier applied to the observed p95 latency).
+        DEFAULT_TIMEOUT_SECONDS stays the upper bound.
+        """
+        return get_config().adaptive_timeout
+
+
+    def get_retry_policy() -> RetryPolicy:
+        return get_config().retry_policy
+
+
+    def get_circuit_breaker_settings() -> Tuple[int, float]:
+        """
+        (consecutive failures before opening, seconds before the next probe).
+        """
+        return get_config().circuit_breaker
+
+
+    def is_idempotent_event(event_name: str) -> bool:
+        """
+        Only events listed in IDEMPOTENT_EVENTS are retried after a failure;
+        firing anything else twice could run its applet twice.
+        """
+        return event_name in get_config().idempotent_events
+
+
+    def get_delivery_mode() -> str:
+        """
+        "sync" waits for IFTTT before answering; "outbox" queues the event on
+        disk, answers with a delivery ID and delivers in the background.
+        """
+        return get_config().delivery_mode
+
+
+    def get_outbox_path() -> str:
+        return get_config().outbox.path or OUTBOX_PATH
+
+
+    def get_schedules_path() -> str:
+        return get_config().scheduler.path or SCHEDULES_PATH
+
+
+    def get_coalescing_settings() -> Tuple[bool, float, FrozenSet[str]]:
+        """
+        (enabled, window in seconds, events that are never coalesced).
+        """
+        return get_config().coalescing
+
+
+    def get_ifttt_rate_limiter(api_key: str) -> Optional[TokenBucket]:
+        """
+        Token bucket for this Webhooks key, or None when RATE_LIMIT is disabled.
+        """
+        settings = get_config().rate_limit
+        if settings is None:
+            return None
+        return get_rate_limiter(
+            api_key, settings.requests_per_second, settings.burst, settings.max_queue
+        )
+
+
+    def get_batch_settings() -> BatchSettings:
+        return get_config().batch
+
+
+    def get_ev_charging_settings() -> EvChargingSettings:
+        return get_config().ev_charging
+
+
+    def get_uav_patrol_settings() -> UavPatrolSettings:
+        return get_config().uav_patrol
+
 
+    def get_path_cache_dir() -> str:
+        return get_uav_patrol_settings().cache_dir or PATHS_DIR
 
-    def get_scenes() -> Dict[str, str]:
-        scenes = CONFIG.get("SCENES", {})
-        if not isinstance(scenes, dict):
-            return {}
-        return scenes
 
+    def get_scenes() -> Mapping[str, str]:
+        return get_config().scenes
 
-    def get_mobility_actions() -> Dict[str, str]:
+
+    def get_mobility_actions() -> Mapping[str, str]:
         """
         Mobility actions cover EV and UAV-related commands.
         Example keys:
@@ -118,57 +474,65 @@
           - "uav_patrol_yard"
           - "uav_return_home"
         """
-        actions = CONFIG.get("MOBILITY_ACTIONS", {})
-        if not isinstance(actions, dict):
-            return {}
-        return actions
+        return get_config().mobility_actions
 
 
     # -------------------------
     # G-Assist IPC Helpers
     # -------------------------
 
-    def read_command() -> Optional[Dict[str, Any]]:
+    _FRAME_READER: Optional[FrameReader] = None
+
+
+    def get_frame_reader() -> FrameReader:
         """
-        Read a JSON command from stdin until the terminator '<<END>>' is encountered.
-        Returns the parsed dict, or None if parsing fails.
+        Return the shared stdin frame reader, creating it on first use.
         """
-        buffer = ""
-        terminator = "<<END>>"
+        global _FRAME_READER
+        if _FRAME_READER is None:
+            _FRAME_READER = FrameReader(sys.stdin.buffer)
+        return _FRAME_READER
 
-        while True:
-            chunk = sys.stdin.read(1)
-            if chunk == "":
-                # EOF or no data
-                time.sleep(0.01)
-                if buffer.strip():
-                    # Try to parse any remaining partial JSON (best-effort)
-                    break
-                return None
 
-            buffer += chunk
+    def read_command() -> Optional[Dict[str, Any]]:
+        """
+        Read a JSON command from stdin until the terminator '<<END>>' is encountered.
+        Returns the parsed dict, or None if parsing fails or stdin is at EOF
+        (check `get_frame_reader().eof` to tell the two apart).
+
+        Stdin is read in bulk chunks by a shared FrameReader, so frames that
+        arrived together in one read are served without touching stdin again.
+        """
+        frame = get_frame_reader().read_frame()
+        if frame is None:
+            return None
+        return parse_command(frame)
 
-            if buffer.endswith(terminator):
-                buffer = buffer[: -len(terminator)]
-                break
 
-        buffer = buffer.strip()
+    def parse_command(frame: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse one frame (without its '<<END>>' terminator) into a command dict.
+        Returns None for empty frames or invalid JSON.
+        """
+        buffer = frame.strip()
         if not buffer:
             return None
 
+        started = time.perf_counter()
         try:
             command = json.loads(buffer)
-            logging.info("Received command: %s", command)
-            return command
         except json.JSONDecodeError as e:
+            PARSE_SECONDS.labels("invalid").observe(time.perf_counter() - started)
             logging.error("Failed to decode JSON command: %s", e)
             return None
+        PARSE_SECONDS.labels("ok").observe(time.perf_counter() - started)
+        logging.info("Received command: %s", log_payload(command))
+        return command
 
 
-    def write_response(response: Dict[str, Any]) -> None:
-        """
-        Write a JSON response followed by '<<END>>' to stdout.
-        """
+    def encode_response(response: Dict[str, Any]) -> str:
+        if isinstance(response, Prerendered):
+            return response.payload
         try:
             payload = json.dumps(response, ensure_ascii=False)
         except TypeError as e:
@@ -177,39 +541,115 @@
                 {"success": False, "message": "Internal JSON encoding error"},
                 ensure_ascii=False,
             )
+        return payload
 
-        logging.info("Sending response: %s", payload)
+
+    def write_payload(payload: str) -> None:
+        """
+        Write an encoded JSON response followed by '<<END>>' to stdout.
+        """
+        logging.info("Sending response: %s", log_payload(payload))
         sys.stdout.write(payload + "<<END>>")
         sys.stdout.flush()
 
 
+    def write_response(response: Dict[str, Any]) -> None:
+        """
+        Write a JSON response followed by '<<END>>' to stdout.
+        """
+        write_payload(encode_response(response))
+
+
+    # -------------------------
+    # Response Cache
+    # -------------------------
+
+    class Prerendered(dict):
+        """
+        A response encoded once, when it was cached; `encode_response` writes its
+        `payload` as is. The same object answers many calls, so never modify one.
+        """
+
+        __slots__ = ("payload",)
+
+        def __init__(self, response: Dict[str, Any]) -> None:
+            super().__init__(response)
+            self.payload = encode_response(dict(response))
+
+
+    # Rendered responses and listing entries for one config snapshot; cleared
+    # when a command sees a different snapshot.
+    _RENDERED: Dict[Tuple[Any, ...], Any] = {}
+    _RENDERED_FOR: Optional[ConfigSnapshot] = None
+    _RENDERED_LOCK = threading.Lock()
+
+
+    def cached(key: Tuple[Any, ...], build: Callable[[], Any]) -> Any:
+        """
+        `build()` for the current config snapshot, computed once per snapshot.
+        """
+        global _RENDERED_FOR
+        config = get_config()
+        with _RENDERED_LOCK:
+            if _RENDERED_FOR is not config:
+                _RENDERED.clear()
+                _RENDERED_FOR = config
+            value = _RENDERED.get(key)
+        if value is None:
+            # Built outside the lock; two threads may both build it, harmlessly.
+            value = build()
+            with _RENDERED_LOCK:
+                if _RENDERED_FOR is config:
+                    value = _RENDERED.setdefault(key, value)
+        return value
+
+
+    def cached_response(key: Tuple[Any, ...], render: Callable[[], Dict[str, Any]]) -> Prerendered:
+        return cached(key, lambda: Prerendered(render()))
+
+
     # -------------------------
     # IFTTT Helpers
     # -------------------------
 
+    _COALESCER = Coalescer()
+
+
     def build_ifttt_url(event_name: str, api_key: str) -> str:
         return IFTTT_BASE_URL.format(event_name=event_name, api_key=api_key)
 
 
+    def _missing_api_key_response() -> Dict[str, Any]:
+        logging.error("IFTTT_API_KEY is missing in config.json")
+        return {
+            "success": False,
+            "message": (
+                "❌ IFTTT_API_KEY is not configured. "
+                "Please edit config.json and set your Webhooks key."
+            ),
+            "sent": False,
+        }
+
+
     def call_ifttt_event(
         event_name: str,
         value1: Optional[str] = None,
         value2: Optional[str] = None,
         value3: Optional[str] = None,
     ) -> Dict[str, Any]:
-        api_key = get_ifttt_api_key()
-        if not api_key:
-            logging.error("IFTTT_API_KEY is missing in config.json")
-            return {
-                "success": False,
-                "message": (
-                    "❌ IFTTT_API_KEY is not configured. "
-                    "Please edit config.json and set your Webhooks key."
-                ),
-            }
+        """
+        Trigger an IFTTT event. With DELIVERY_MODE "outbox" the event is queued
+        durably and acknowledged immediately; otherwise it is sent right away.
 
-        url = build_ifttt_url(event_name, api_key)
-        timeout = get_timeout_seconds()
+        Identical triggers (same event and values) that arrive while one is in
+        flight, or within COALESCING.WINDOW_SECONDS after it succeeded, share
+        that one request and its result.
+
+        Events routed in BACKENDS go to that backend instead of IFTTT, with the
+        same delivery mode and coalescing.
+        """
+        if event_name not in get_config().backend_routes and not get_ifttt_api_key():
+            return _missing_api_key_response()
 
         payload: Dict[str, Optional[str]] = {}
         if value1 is not None:
@@ -219,133 +659,632 @@
         if value3 is not None:
             payload["value3"] = value3
 
-        logging.info("Calling IFTTT event '%s' with payload=%s", event_name, payload)
+        if get_delivery_mode() == "outbox":
+            send = functools.partial(queue_ifttt_event, event_name, payload)
+        else:
+            send = functools.partial(deliver_ifttt_event, event_name, payload)
 
+        enabled, window, opt_out = get_coalescing_settings()
+        if not enabled or event_name in opt_out:
+            return send()
+
+        _COALESCER.window_seconds = window
+        key = (event_name, json.dumps(payload, sort_keys=True, default=str))
+        # Waiting on a stuck identical trigger must not outlast this command.
+        deadline = current_deadline.get()
+        wait = deadline.remaining() if deadline is not None else get_command_deadline_seconds()
         try:
-            response = requests.post(url, json=payload or None, timeout=timeout)
-            response.raise_for_status()
-            return {
-                "success": True,
-                "message": (
-                    f"✅ Triggered IFTTT event **{event_name}**.\n"
-                    f"HTTP status: {response.status_code}"
-                ),
-            }
-        except requests.exceptions.RequestException as e:
-            logging.error("Error calling IFTTT event '%s': %s", event_name, e)
+            result, shared = _COALESCER.call(key, send, timeout=wait)
+        except CoalescingTimeout as e:
+            logging.warning("IFTTT event '%s' not sent: %s", event_name, e)
             return {
                 "success": False,
                 "message": (
-                    f"❌ Failed to trigger IFTTT event **{event_name}**.\n"
-                    f"Error: `{e}`"
+                    f"⏳ An identical trigger of **{event_name}** is still in flight after "
+                    f"{wait:.0f} s, so it was not sent again. It may or may not have fired."
                 ),
             }
+        # Callers decorate the message, so never hand out the shared dict itself.
+        result = dict(result)
+        if shared:
+            logging.info("IFTTT event '%s' coalesced with an identical trigger", event_name)
+            result["message"] = (
+                result.get("message", "")
+                + "\n♻️ Coalesced with an identical trigger; no extra IFTTT request was sent."
+            )
+        return result
 
 
-    # -------------------------
-    # Command Implementations
-    # -------------------------
-
-    def initialize_command(
-        params: Optional[Dict[str, Any]] = None,
-        context: Optional[Dict[str, Any]] = None,
-        system_info: Optional[Dict[str, Any]] = None,
-    ) -> Dict[str, Any]:
+    def deliver_ifttt_event(event_name: str, payload: Dict[str, Optional[str]]) -> Dict[str, Any]:
         """
-        Optional initialize hook. Can be used by G-Assist to warm up the plugin.
+        Send one event now through its backend (IFTTT unless BACKENDS routes it
+        elsewhere) and publish the outcome on the state bus.
         """
-        scenes = get_scenes()
-        mobility = get_mobility_actions()
-
-        scene_list = ", ".join(sorted(scenes.keys())) if scenes else "no scenes configured"
-        mobility_list = (
-            ", ".join(sorted(mobility.keys())) if mobility else "no mobility actions configured"
+        backend = get_backend(event_name)
+        started = time.monotonic()
+        result = backend.trigger(event_name, payload)
+        # IFTTT attempts are timed one by one in IFTTT_SECONDS.
+        if backend.kind != IFTTT:
+            BACKEND_SECONDS.labels(backend.name, "ok" if result.get("success") else "error").observe(
+                time.monotonic() - started
+            )
+        publish_state(
+            "ifttt",
+            event=event_name,
+            backend=backend.name,
+            values=payload,
+            success=bool(result.get("success")),
+            message=result.get("message"),
         )
-
-        return {
-            "success": True,
-            "message": (
-                "AeroVolt HomeFlow initialized.\n"
-                f"- Scenes: {len(scenes)} ({scene_list})\n"
-                f"- Mobility actions (EV/UAV): {len(mobility)} ({mobility_list})"
-            ),
-        }
+        return result
 
 
-    def shutdown_command(
-        params: Optional[Dict[str, Any]] = None,
-        context: Optional[Dict[str, Any]] = None,
-        system_info: Optional[Dict[str, Any]] = None,
-    ) -> Dict[str, Any]:
-        logging.info("Shutdown requested by G-Assist")
-        return {
-            "success": True,
-            "message": "AeroVolt HomeFlow shutting down.",
-        }
+    def _send_ifttt_event(event_name: str, payload: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        """
+        Send one IFTTT event now, under the rate limit, deadline, retry and
+        circuit breaker rules. A 429 pauses the key's rate limiter for the
+        Retry-After period and is retried even for non-idempotent events.
+        A failure carries "sent": False when no attempt can have reached IFTTT.
+        """
+        api_key = get_ifttt_api_key()
+        if not api_key:
+            return _missing_api_key_response()
 
+        url = build_ifttt_url(event_name, api_key)
+        host = urlsplit(url).hostname or ""
 
-    def run_scene_command(
-        params: Optional[Dict[str, Any]] = None,
-        context: Optional[Dict[str, Any]] = None,
-        system_info: Optional[Dict[str, Any]] = None,
-    ) -> Dict[str, Any]:
-        if params is None:
-            params = {}
+        logging.info("Calling IFTTT event '%s' with payload=%s", event_name, payload)
 
-        scene_raw = params.get("scene", "")
-        if not isinstance(scene_raw, str) or not scene_raw.strip():
+        breaker = get_circuit_breaker(host, *get_circuit_breaker_settings())
+        tracker = get_latency_tracker(host)
+        limiter = get_ifttt_rate_limiter(api_key)
+        policy = get_retry_policy()
+        idempotent = is_idempotent_event(event_name)
+        max_attempts = policy.max_attempts if idempotent else 1
+        min_timeout, p95_multiplier = get_adaptive_timeout_settings()
+
+        deadline = current_deadline.get()
+        budget = deadline.allot() if deadline is not None else None
+        started = time.monotonic()
+        attempts = 0
+        error: Optional[TransportError] = None
+        # Whether any attempt may have reached IFTTT (and run the applet).
+        maybe_sent = False
+
+        def circuit_open() -> Dict[str, Any]:
+            IFTTT_REJECTED.labels(event_name, "circuit_open").inc()
+            logging.warning(
+                "IFTTT event '%s' rejected: circuit for %s is %s (retry in %.0f s)",
+                event_name, host, breaker.state, breaker.retry_after(),
+            )
             return {
                 "success": False,
-                "message": "❌ Missing required parameter `scene`.",
+                "message": (
+                    f"⛔ IFTTT event **{event_name}** not sent: {host} is failing, "
+                    f"circuit breaker is {breaker.state}.\n"
+                    f"Next probe in {breaker.retry_after():.0f} s · attempts: {attempts}"
+                ),
+                "sent": maybe_sent,
             }
 
-        scene_key = scene_raw.strip().lower()
-        scenes = get_scenes()
-        event_name = scenes.get(scene_key)
+        # Created (and the HTTP stack imported) before any rate limiter token is
+        # taken, so tokens granted during that import are not all spent at once.
+        transport = get_ifttt_transport()
+        while True:
+            # Open and not due for a probe yet: reject without taking a rate
+            # limiter token. The half-open probe itself is taken just before
+            # the send, so no early exit can leave it held.
+            if breaker.retry_after() > 0:
+                return circuit_open()
 
-        if not event_name:
-            # Try fuzzy match: simple substring search
-            candidates = [
-                name for name in scenes.keys()
-                if scene_key in name.lower() or name.lower() in scene_key
-            ]
-            if candidates:
-                event_name = scenes[candidates[0]]
-                scene_key = candidates[0]
-            else:
-                if not scenes:
+            if limiter is not None:
+                try:
+                    waited = limiter.acquire(
+                        None if budget is None else budget - (time.monotonic() - started)
+                    )
+                except RateLimitExceeded as e:
+                    IFTTT_REJECTED.labels(event_name, "rate_limited").inc()
+                    logging.warning("IFTTT event '%s' not sent: %s", event_name, e)
                     return {
                         "success": False,
                         "message": (
-                            "❌ No scenes configured yet. "
-                            "Please edit `config.json` and add entries under `SCENES`."
+                            f"🚦 IFTTT event **{event_name}** not sent: {e}.\n"
+                            f"Attempts: {attempts} · circuit: {breaker.state}"
                         ),
+                        "sent": maybe_sent,
                     }
-                scene_list = ", ".join(sorted(scenes.keys()))
+                if waited >= 0.05:
+                    logging.info(
+                        "IFTTT event '%s' waited %.0f ms for the rate limiter",
+                        event_name, waited * 1000,
+                    )
+
+            timeout = tracker.timeout(get_timeout_seconds(), min_timeout, p95_multiplier)
+            if budget is not None:
+                left = budget - (time.monotonic() - started)
+                if left <= 0:
+                    break
+                timeout = min(timeout, left)
+
+            if not breaker.allow():
+                return circuit_open()
+
+            attempts += 1
+            throttled_for: Optional[float] = None
+            call_started = time.monotonic()
+            try:
+                response = transport.post(
+                    url, json=payload or None, timeout=timeout, replay=idempotent
+                )
+                response.raise_for_status()
+            except HTTPStatusError as e:
+                error = e
+                IFTTT_SECONDS.labels(event_name, _http_outcome(e.status_code)).observe(
+                    time.monotonic() - call_started
+                )
+                # A 5xx may come after the applet ran; a 4xx (429 too) means it did not.
+                maybe_sent = maybe_sent or e.status_code >= 500
+                if e.status_code == 429:
+                    # Throttled, not down: the request was rejected unprocessed,
+                    # so it is safe to send again once IFTTT allows it.
+                    breaker.record_success()
+                    retry_after = parse_retry_after(e.headers.get("Retry-After"))
+                    throttled_for = (
+                        retry_after if retry_after is not None else policy.backoff(attempts)
+                    )
+                    if limiter is not None:
+                        limiter.penalize(throttled_for)
+                elif e.status_code < 500:
+                    # The service answered; the request itself is wrong.
+                    breaker.record_success()
+                    break
+                else:
+                    breaker.record_failure()
+            except TransportError as e:
+                error = e
+                maybe_sent = maybe_sent or not isinstance(e, RequestNotSent)
+                IFTTT_SECONDS.labels(event_name, "error").observe(time.monotonic() - call_started)
+                breaker.record_failure()
+            except BaseException:
+                # Not an outcome of the call; just give a half-open probe back.
+                breaker.release()
+                raise
+            else:
+                elapsed = time.monotonic() - call_started
+                IFTTT_SECONDS.labels(event_name, "ok").observe(elapsed)
+                breaker.record_success()
+                if limiter is not None:
+                    limiter.reward()
+                tracker.observe(elapsed)
+                logging.info(
+                    "IFTTT event '%s' succeeded (attempts=%d, circuit=%s)",
+                    event_name, attempts, breaker.state,
+                )
                 return {
-                    "success": False,
+                    "success": True,
                     "message": (
-                        f"❌ Scene **{scene_raw}** is not configured.\n"
-                        f"Available scenes: {scene_list}."
+                        f"✅ Triggered IFTTT event **{event_name}**.\n"
+                        f"HTTP status: {response.status_code} · attempts: {attempts} · "
+                        f"circuit: {breaker.state}"
                     ),
                 }
 
-        result = call_ifttt_event(event_name)
-        if result.get("success"):
-            result["message"] = (
-                f"🏠 Scene **{scene_key}** triggered "
-                f"(IFTTT event: `{event_name}`).\n" + result["message"]
+            tracker.observe(time.monotonic() - call_started)
+            allowed = policy.max_attempts if throttled_for is not None else max_attempts
+            logging.error(
+                "Error calling IFTTT event '%s' (attempt %d/%d, circuit=%s): %s",
+                event_name, attempts, allowed, breaker.state, error,
             )
-        return result
+            if attempts >= allowed:
+                break
+            if throttled_for is not None:
+                # The limiter already holds every caller back; without one, wait here.
+                delay = 0.0 if limiter is not None else throttled_for
+                wait = throttled_for
+            else:
+                delay = wait = policy.backoff(attempts)
+            if budget is not None and time.monotonic() - started + wait >= budget:
+                break
+            time.sleep(delay)
 
+        if error is None:
+            IFTTT_REJECTED.labels(event_name, "deadline").inc()
+            error = TransportError("command deadline exceeded before the request was sent")
+            logging.error("IFTTT event '%s' not sent: %s", event_name, error)
 
-    def trigger_ifttt_event_command(
-        params: Optional[Dict[str, Any]] = None,
-        context: Optional[Dict[str, Any]] = None,
-        system_info: Optional[Dict[str, Any]] = None,
-    ) -> Dict[str, Any]:
-        if params is None:
-            params = {}
+        return {
+            "success": False,
+            "message": (
+                f"❌ Failed to trigger IFTTT event **{event_name}**.\n"
+                f"Error: `{error}`\n"
+                f"Attempts: {attempts} · circuit: {breaker.state}"
+            ),
+            "sent": maybe_sent,
+        }
+
+
+    # -------------------------
+    # Automation Backends
+    # -------------------------
+
+    class IftttBackend(Backend):
+        """
+        IFTTT Webhooks: every event that BACKENDS does not route elsewhere.
+        """
+
+        name = kind = IFTTT
+
+        def describe(self, event_name: str) -> str:
+            return f"IFTTT event `{event_name}`"
+
+        def trigger(self, event_name: str, values: Mapping[str, Optional[str]]) -> Dict[str, Any]:
+            return _send_ifttt_event(event_name, dict(values))
+
+        def prewarm(self) -> None:
+            get_ifttt_transport().prewarm(build_ifttt_url("prewarm", "prewarm"))
+
+
+    IFTTT_BACKEND = IftttBackend()
+    atexit.register(close_connections)
+
+    _BACKENDS: Dict[str, Tuple[HomeAssistantSettings, Backend]] = {}
+    _BACKENDS_FOR: Optional[ConfigSnapshot] = None
+    _BACKENDS_LOCK = threading.Lock()
+
+
+    def _configured_backends() -> Dict[str, Tuple[HomeAssistantSettings, Backend]]:
+        """
+        The BACKENDS of the current config snapshot. A backend whose settings
+        survive a reload is kept as it is; connections that no backend uses any
+        more are closed.
+        """
+        global _BACKENDS, _BACKENDS_FOR
+        config = get_config()
+        with _BACKENDS_LOCK:
+            if _BACKENDS_FOR is not config:
+                previous = _BACKENDS
+                backends = {}
+                for name, settings in config.backends.items():
+                    kept = previous.get(name)
+                    if kept is None or kept[0] != settings:
+                        kept = (settings, create_backend(settings))
+                    backends[name] = kept
+                _BACKENDS, _BACKENDS_FOR = backends, config
+                close_unused_connections(
+                    (settings.url, settings.token) for settings in config.backends.values()
+                )
+            return _BACKENDS
+
+
+    def get_backend(event_name: str) -> Backend:
+        """
+        The backend `event_name` is sent to.
+        """
+        name = get_config().backend_routes.get(event_name)
+        if name is None:
+            return IFTTT_BACKEND
+        return _configured_backends()[name][1]
+
+
+    def prewarm_backends() -> None:
+        """
+        Connect every backend in use ahead of the first trigger.
+        """
+        IFTTT_BACKEND.prewarm()
+        for _, backend in _configured_backends().values():
+            backend.prewarm()
+
+
+    # -------------------------
+    # Outbox Delivery
+    # -------------------------
+
+    _OUTBOX: Optional["Outbox"] = None
+    _OUTBOX_FLUSHER: Optional["OutboxFlusher"] = None
+    _OUTBOX_LOCK = threading.Lock()
+
+
+    def _deliver_from_outbox(event_name: str, payload: Dict[str, Any]) -> Tuple[bool, str, bool]:
+        result = deliver_ifttt_event(event_name, payload)
+        # Retry only what certainly did not go out, or what may safely run twice.
+        retry = result.get("sent") is False or is_idempotent_event(event_name)
+        return bool(result.get("success")), " ".join(result.get("message", "").split("\n")), retry
+
+
+    def get_outbox() -> "OutboxFlusher":
+        """
+        Open the outbox and start its background flusher on first use.
+        """
+        global _OUTBOX, _OUTBOX_FLUSHER
+        with _OUTBOX_LOCK:
+            if _OUTBOX_FLUSHER is None:
+                from homeflow.outbox import Outbox, OutboxFlusher
+
+                settings = get_config().outbox
+                _OUTBOX = Outbox(get_outbox_path())
+                _OUTBOX_FLUSHER = OutboxFlusher(
+                    _OUTBOX,
+                    _deliver_from_outbox,
+                    batch_size=settings.batch_size,
+                    concurrency=get_http_pool_size(),
+                    max_attempts=settings.max_attempts,
+                    retry_base_seconds=settings.retry_base_seconds,
+                    retry_max_seconds=settings.retry_max_seconds,
+                    retention_seconds=settings.retention_hours * 3600,
+                )
+                _OUTBOX_FLUSHER.start()
+                logging.info("Outbox opened at %s", _OUTBOX.path)
+        return _OUTBOX_FLUSHER
+
+
+    def queue_ifttt_event(event_name: str, payload: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        flusher = get_outbox()
+        delivery_id = flusher.outbox.enqueue(event_name, payload)
+        flusher.wake()
+        logging.info("Queued IFTTT event '%s' as delivery %s", event_name, delivery_id)
+        return {
+            "success": True,
+            "message": (
+                f"📨 Queued IFTTT event **{event_name}** for delivery.\n"
+                f"Delivery ID: `{delivery_id}` (ask for its delivery status to follow it)"
+            ),
+        }
+
+
+    # -------------------------
+    # Scheduler
+    # -------------------------
+
+    _SCHEDULER: Optional["Scheduler"] = None
+    _SCHEDULER_LOCK = threading.Lock()
+
+
+    def _run_scheduled_job(job: "Job") -> Dict[str, Any]:
+        """
+        Run a due job through the handler a user's command would use, under the
+        current config snapshot and a fresh command deadline.
+        """
+        config_token = _COMMAND_CONFIG.set(CONFIG)
+        token = current_deadline.set(Deadline(get_command_deadline_seconds()))
+        try:
+            if job.kind == "scene":
+                response = run_scene_command({"scene": job.target})
+            else:
+                params: Dict[str, Any] = {"action": job.target}
+                params.update(zip(("value1", "value2", "value3"), job.values))
+                response = run_mobility_action_command(params)
+        finally:
+            current_deadline.reset(token)
+            _COMMAND_CONFIG.reset(config_token)
+        logging.info(
+            "Scheduled %s '%s' (%s) ran: %s",
+            job.kind, job.target, job.job_id, " ".join(response.get("message", "").split("\n")),
+        )
+        return response
+
+
+    def get_scheduler() -> "Scheduler":
+        """
+        Load the saved schedules and start running them on first use.
+        """
+        global _SCHEDULER
+        with _SCHEDULER_LOCK:
+            if _SCHEDULER is None:
+                from homeflow.scheduler import JobStore, Scheduler
+
+                settings = get_config().scheduler
+                _SCHEDULER = Scheduler(
+                    _run_scheduled_job,
+                    JobStore(get_schedules_path()),
+                    concurrency=settings.concurrency,
+                    misfire_grace=settings.misfire_grace_seconds,
+                )
+                _SCHEDULER.start()
+                logging.info("Scheduler opened at %s with %d jobs", get_schedules_path(), len(_SCHEDULER))
+        return _SCHEDULER
+
+
+    def _describe_delivery(delivery: "Delivery") -> str:
+        from homeflow.outbox import DELIVERED, FAILED
+
+        icon = {DELIVERED: "✅", FAILED: "❌"}.get(delivery.status, "⏳")
+        line = (
+            f"- {icon} `{delivery.delivery_id}` **{delivery.event_name}**: {delivery.status}"
+            f" (attempts: {delivery.attempts})"
+        )
+        if delivery.last_error and delivery.status != DELIVERED:
+            line += f"\n  Last error: {delivery.last_error}"
+        return line
+
+
+    # -------------------------
+    # Name Lookup
+    # -------------------------
+
+    MOBILITY_PREFIXES = {
+        UAV: "🛸 UAV/Drone action",
+        EV: "🚗 EV action",
+        MOBILITY: "🚀 Mobility action",
+    }
+    MOBILITY_ICONS = {UAV: "🛸", EV: "🚗", MOBILITY: "🚀"}
+
+    def get_scene_index() -> NameIndex:
+        return get_config().scene_index
+
+
+    def get_mobility_action_index() -> NameIndex:
+        return get_config().mobility_action_index
+
+
+    def _describe_alternatives(kind: str, query: str, index: NameIndex) -> str:
+        """
+        Short inventories are listed in full; large ones only show the closest names.
+        """
+        if len(index) <= 20:
+            return f"Available {kind}: {', '.join(index.sorted_names)}."
+        closest = index.lookup(query, limit=5, min_score=0.2)
+        if not closest:
+            return f"{len(index)} {kind} are configured; none looks like this one."
+        return f"Closest {kind}: {', '.join(match.name for match in closest)}."
+
+
+    # Fuzzy matches scoring within this of the best one are too close to pick
+    # from: the command asks instead of firing an actuator that was not meant.
+    NEAR_TIE_MARGIN = 0.05
+
+
+    def _near_ties(matches: List[Match]) -> List[Match]:
+        """
+        The best match and the runners-up within NEAR_TIE_MARGIN of it, or []
+        when the best one is exact or clearly ahead.
+        """
+        best = matches[0]
+        if best.score >= 1.0:
+            return []
+        ties = [match for match in matches[1:] if best.score - match.score <= NEAR_TIE_MARGIN]
+        return [best] + ties if ties else []
+
+
+    def _did_you_mean(ties: List[Match]) -> str:
+        names = [f"**{match.name}**" for match in ties]
+        return f"Did you mean {', '.join(names[:-1])} or {names[-1]}?"
+
+
+    def _ambiguous_response(
+        label: str, query: str, ties: List[Match], outcome: str = "triggered"
+    ) -> Dict[str, Any]:
+        logging.info("%s '%s' is ambiguous: %s", label, query, [match.name for match in ties])
+        return {
+            "success": False,
+            "message": f"🤔 {label} **{query}** is ambiguous, so nothing was {outcome}.\n" + _did_you_mean(ties),
+        }
+
+
+    # -------------------------
+    # Command Implementations
+    # -------------------------
+
+    def initialize_command(
+        params: Optional[Dict[str, Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        system_info: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Optional initialize hook. Can be used by G-Assist to warm up the plugin.
+
+        Also resolves the IFTTT host and opens a pooled connection in the
+        background, so the first real trigger lands on a hot socket, and opens
+        the BACKENDS connections the same way. The HTTP stack is loaded on
+        that background thread too, so this answer never waits for it.
+        """
+        threading.Thread(target=prewarm_backends, name="homeflow-prewarm", daemon=True).start()
+
+        return cached_response(("initialize",), _render_initialize)
+
+
+    # Names listed in the initialize answer; the list commands page through the rest.
+    INITIALIZE_NAMES = 20
+
+
+    def _name_summary(names: Tuple[str, ...], none_text: str) -> str:
+        if not names:
+            return none_text
+        if len(names) <= INITIALIZE_NAMES:
+            return ", ".join(names)
+        return ", ".join(names[:INITIALIZE_NAMES]) + f", … and {len(names) - INITIALIZE_NAMES} more"
+
+
+    def _render_initialize() -> Dict[str, Any]:
+        config = get_config()
+        scenes = config.scene_index.sorted_names
+        mobility = config.mobility_action_index.sorted_names
+
+        scene_list = _name_summary(scenes, "no scenes configured")
+        mobility_list = _name_summary(mobility, "no mobility actions configured")
+
+        return {
+            "success": True,
+            "message": (
+                "AeroVolt HomeFlow initialized.\n"
+                f"- Scenes: {len(scenes)} ({scene_list})\n"
+                f"- Mobility actions (EV/UAV): {len(mobility)} ({mobility_list})"
+            ),
+        }
+
+
+    def shutdown_command(
+        params: Optional[Dict[str, Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        system_info: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        logging.info("Shutdown requested by G-Assist")
+        # G-Assist may end the process as soon as it has the answer.
+        flush_logging()
+        return {
+            "success": True,
+            "message": "AeroVolt HomeFlow shutting down.",
+        }
+
+
+    def run_scene_command(
+        params: Optional[Dict[str, Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        system_info: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        if params is None:
+            params = {}
+
+        scene_raw = params.get("scene", "")
+        if not isinstance(scene_raw, str) or not scene_raw.strip():
+            return {
+                "success": False,
+                "message": "❌ Missing required parameter `scene`.",
+            }
+
+        index = get_scene_index()
+        matches = index.lookup(scene_raw, limit=3)
+
+        if not matches:
+            if not len(index):
+                return {
+                    "success": False,
+                    "message": (
+                        "❌ No scenes configured yet. "
+                        "Please edit `config.json` and add entries under `SCENES`."
+                    ),
+                }
+            return {
+                "success": False,
+                "message": (
+                    f"❌ Scene **{scene_raw}** is not configured.\n"
+                    + _describe_alternatives("scenes", scene_raw, index)
+                ),
+            }
+
+        ties = _near_ties(matches)
+        if ties:
+            return _ambiguous_response("Scene", scene_raw, ties)
+
+        scene_key, event_name = matches[0].name, matches[0].value
+        if not isinstance(event_name, str):  # a macro scene
+            return run_macro_scene(event_name)
+
+        result = call_ifttt_event(event_name)
+        if result.get("success"):
+            result["message"] = (
+                f"🏠 Scene **{scene_key}** triggered "
+                f"(IFTTT event: `{event_name}`).\n" + result["message"]
+            )
+        return result
+
+
+    def trigger_ifttt_event_command(
+        params: Optional[Dict[str, Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        system_info: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        if params is None:
+            params = {}
 
         event_name = params.get("event_name", "")
         if not isinstance(event_name, str) or not event_name.strip():
@@ -371,8 +1310,13 @@
         context: Optional[Dict[str, Any]] = None,
         system_info: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
-        scenes = get_scenes()
-        if not scenes:
+        """
+        List the scenes, LISTING.PAGE_SIZE to a `page`; `filter` keeps the names
+        that contain it. Unfiltered pages are rendered once per config version.
+        """
+        scenes = get_config().sorted_scenes
+        macros = get_config().macros
+        if not scenes and not macros:
             return {
                 "success": True,
                 "message": (
@@ -387,14 +1331,50 @@
                 ),
             }
 
-        lines = ["✅ AeroVolt HomeFlow scenes:"]
-        for name, event in sorted(scenes.items()):
-            lines.append(f"- **{name}** → IFTTT event `{event}`")
+        return _listing_page("list_scenes", "scenes", _scene_entries, params or {})
 
-        return {
-            "success": True,
-            "message": "\n".join(lines),
-        }
+
+    def _scene_entries() -> Tuple[Tuple[str, str], ...]:
+        config = get_config()
+        entries = [
+            (name.lower(), f"- **{name}** → {get_backend(event).describe(event)}")
+            for name, event in config.sorted_scenes
+        ]
+        for name in sorted(config.macros):
+            macro = config.macros[name]
+            entries.append((
+                name.lower(),
+                f"- **{name}** → macro of {len(macro.steps)} steps: {macro.describe()}"
+                + (f" (at least {macro.min_seconds:g} s)" if macro.min_seconds else ""),
+            ))
+        return tuple(entries)
+
+
+    def trigger_mobility_action(
+        action_key: str,
+        event_name: str,
+        values: Optional[List[Optional[str]]] = None,
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Trigger a mobility action's event. Every path that runs an action goes
+        through here (the command, macro steps, batch items, scheduled jobs), so
+        the patrol action without an explicit value1 always carries its planned
+        route: waypoints, length, plan key. Returns the result and a description
+        of the route ("" when there is none).
+        """
+        values = list(values or []) + [None] * (3 - len(values or []))
+        route = ""
+        patrol = get_uav_patrol_settings()
+        if action_key == patrol.action and patrol.yard and values[0] is None:
+            from homeflow.coverage import CoverageError
+
+            try:
+                plan, cached = plan_patrol_route(patrol)
+            except CoverageError as e:
+                return {"success": False, "message": f"❌ Cannot plan the patrol route: {e}"}, ""
+            values = [plan.encode(), f"{plan.total_m:.0f}", plan.key]
+            route = "\n" + _describe_route(plan, cached)
+        return call_ifttt_event(event_name, value1=values[0], value2=values[1], value3=values[2]), route
 
 
     def run_mobility_action_command(
@@ -411,6 +1391,8 @@
           - ev_off_peak_schedule
           - uav_patrol_yard
           - uav_return_home
+
+        Optional value1..value3 are passed on to the IFTTT event.
         """
         if params is None:
             params = {}
@@ -422,50 +1404,42 @@
                 "message": "❌ Missing required parameter `action`.",
             }
 
-        action_key = action_raw.strip().lower()
-        actions = get_mobility_actions()
-        event_name = actions.get(action_key)
+        index = get_mobility_action_index()
+        matches = index.lookup(action_raw, limit=3)
 
-        if not event_name:
-            # Simple fuzzy match
-            candidates = [
-                name for name in actions.keys()
-                if action_key in name.lower() or name.lower() in action_key
-            ]
-            if candidates:
-                event_name = actions[candidates[0]]
-                action_key = candidates[0]
-            else:
-                if not actions:
-                    return {
-                        "success": False,
-                        "message": (
-                            "❌ No mobility actions configured yet. "
-                            "Please edit `config.json` and add entries under `MOBILITY_ACTIONS`."
-                        ),
-                    }
-                action_list = ", ".join(sorted(actions.keys()))
+        if not matches:
+            if not len(index):
                 return {
                     "success": False,
                     "message": (
-                        f"❌ Mobility action **{action_raw}** is not configured.\n"
-                        f"Available actions: {action_list}."
+                        "❌ No mobility actions configured yet. "
+                        "Please edit `config.json` and add entries under `MOBILITY_ACTIONS`."
                     ),
                 }
+            return {
+                "success": False,
+                "message": (
+                    f"❌ Mobility action **{action_raw}** is not configured.\n"
+                    + _describe_alternatives("actions", action_raw, index)
+                ),
+            }
 
-        result = call_ifttt_event(event_name)
-        if result.get("success"):
-            # 根据名字简单区分 EV / UAV 做一点文案润色
-            if "uav" in action_key or "drone" in action_key:
-                prefix = "🛸 UAV/Drone action"
-            elif "ev" in action_key or "charging" in action_key or "vehicle" in action_key:
-                prefix = "🚗 EV action"
-            else:
-                prefix = "🚀 Mobility action"
+        ties = _near_ties(matches)
+        if ties:
+            return _ambiguous_response("Mobility action", action_raw, ties)
 
+        match = matches[0]
+        action_key, event_name = match.name, match.value
+        result, route = trigger_mobility_action(
+            action_key, event_name, [params.get("value1"), params.get("value2"), params.get("value3")]
+        )
+        if result.get("success"):
+            # EV / UAV 分类在建索引时已预先算好
+            prefix = MOBILITY_PREFIXES.get(match.category or "", MOBILITY_PREFIXES[MOBILITY])
             result["message"] = (
                 f"{prefix} **{action_key}** triggered "
                 f"(IFTTT event: `{event_name}`).\n" + result["message"]
+                + route
             )
         return result
 
@@ -475,7 +1449,10 @@
         context: Optional[Dict[str, Any]] = None,
         system_info: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
-        actions = get_mobility_actions()
+        """
+        List the mobility actions, paged and filtered like `list_scenes`.
+        """
+        actions = get_config().sorted_mobility_actions
         if not actions:
             return {
                 "success": True,
@@ -491,91 +1468,1297 @@
                 ),
             }
 
-        lines = ["✅ AeroVolt HomeFlow mobility actions (EV/UAV):"]
-        for name, event in sorted(actions.items()):
-            if "uav" in name or "drone" in name:
-                icon = "🛸"
-            elif "ev" in name or "charging" in name or "vehicle" in name:
-                icon = "🚗"
-            else:
-                icon = "🚀"
-            lines.append(f"- {icon} **{name}** → IFTTT event `{event}`")
+        return _listing_page("list_mobility_actions", "mobility actions", _mobility_entries, params or {})
 
-        return {
-            "success": True,
-            "message": "\n".join(lines),
-        }
 
+    def _mobility_entries() -> Tuple[Tuple[str, str], ...]:
+        index = get_mobility_action_index()
+        entries = []
+        for name, event in get_config().sorted_mobility_actions:
+            icon = MOBILITY_ICONS.get(index.category(name) or "", MOBILITY_ICONS[MOBILITY])
+            entries.append((name.lower(), f"- {icon} **{name}** → {get_backend(event).describe(event)}"))
+        return tuple(entries)
 
-    # -------------------------
-    # Main Loop
-    # -------------------------
 
-    def main() -> None:
-        global CONFIG
+    LISTING_TITLES = {
+        "scenes": "✅ AeroVolt HomeFlow scenes",
+        "mobility actions": "✅ AeroVolt HomeFlow mobility actions (EV/UAV)",
+    }
 
-        setup_logging()
-        logging.info("AeroVolt HomeFlow plugin starting up.")
-        CONFIG = load_config()
 
-        commands = {
-            "initialize": initialize_command,
-            "shutdown": shutdown_command,
-            "run_scene": run_scene_command,
-            "trigger_ifttt_event": trigger_ifttt_event_command,
-            "list_scenes": list_scenes_command,
-            "run_mobility_action": run_mobility_action_command,
-            "list_mobility_actions": list_mobility_actions_command,
+    def _page_param(params: Dict[str, Any]) -> Optional[int]:
+        """
+        The 1-based `page` (1 when absent), or None when it is not a page number.
+        """
+        value = params.get("page", 1)
+        if isinstance(value, str) and value.strip().isdigit():
+            value = int(value)
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            return None
+        return value
+
+
+    def _listing_page(
+        command: str,
+        kind: str,
+        build_entries: Callable[[], Tuple[Tuple[str, str], ...]],
+        params: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """
+        One page of a listing of (lowercase name, line) entries. The entry lines are built
+        once per config version, and unfiltered pages are cached as encoded frames.
+        """
+        page = _page_param(params)
+        if page is None:
+            return {"success": False, "message": "❌ `page` must be a whole number, starting at 1."}
+        entries = cached((command, "entries"), build_entries)
+        query = _text_param(params, "filter")
+        if query is None:
+            if page > _page_count(len(entries)):
+                return _render_listing(kind, entries, page, None)
+            return cached_response((command, page), lambda: _render_listing(kind, entries, page, None))
+
+        needle = query.lower()
+        matching = tuple(entry for entry in entries if needle in entry[0])
+        if not matching:
+            return {"success": True, "message": f"ℹ️ No {kind} match `{query}`."}
+        return _render_listing(kind, matching, page, query)
+
+
+    def _page_count(entries: int) -> int:
+        size = get_config().listing_page_size
+        return max(1, -(-entries // size))
+
+
+    def _render_listing(
+        kind: str,
+        entries: Tuple[Tuple[str, str], ...],
+        page: int,
+        query: Optional[str],
+    ) -> Dict[str, Any]:
+        pages = _page_count(len(entries))
+        if page > pages:
+            return {
+                "success": False,
+                "message": f"❌ Page {page} does not exist; the {kind} fit on {pages} page(s).",
+            }
+        size = get_config().listing_page_size
+        first = (page - 1) * size
+        shown = entries[first:first + size]
+
+        title = LISTING_TITLES[kind] + (f" matching `{query}`:" if query else ":")
+        lines = [title]
+        lines.extend(line for _, line in shown)
+        if pages > 1:
+            footer = f"📄 Page {page} of {pages} ({first + 1}–{first + len(shown)} of {len(entries)} {kind})."
+            if page < pages:
+                footer += f" Ask for page {page + 1} for more, or filter by name."
+            lines.append(footer)
+
+        return {
+            "success": True,
+            "message": "\n".join(lines),
         }
 
-        while True:
-            command = read_command()
-            if command is None:
-                # No valid command received; continue waiting
-                continue
 
-            tool_calls = command.get("tool_calls", [])
-            if not isinstance(tool_calls, list):
-                logging.error("Invalid command: tool_calls is not a list")
+    def _trigger_macro_step(step: "MacroStep") -> Dict[str, Any]:
+        from homeflow.macros import ACTION
+
+        if step.kind == ACTION:
+            return trigger_mobility_action(step.target, step.event)[0]
+        return call_ifttt_event(step.event)
+
+
+    def _describe_macro_run(run: "MacroRun") -> str:
+        from homeflow.macros import OK, SKIPPED
+
+        ok = sum(result.status == OK for result in run.results)
+        lines = [
+            f"🧩 Macro **{run.macro.name}**: {ok}/{len(run.results)} steps succeeded · "
+            f"{run.elapsed:.2f} s total"
+        ]
+        if run.critical_path:
+            finished = run.results[run.critical_path[-1]].finished
+            path = " → ".join(run.macro.steps[i].name for i in run.critical_path)
+            lines.append(f"Critical path: {path} ({finished:.2f} s)")
+        for result in run.results:
+            step = result.step
+            source = (
+                f"{step.kind} `{step.target}` → `{step.event}`"
+                if step.kind != "event"
+                else f"event `{step.event}`"
+            )
+            if result.status == SKIPPED:
+                lines.append(f"- ⏭️ `{step.name}` skipped: {result.detail.get('message')}")
                 continue
+            line = (
+                f"- {'✅' if result.status == OK else '❌'} `{step.name}` ({source}) · "
+                f"{result.started:.2f}–{result.finished:.2f} s"
+            )
+            lines.append(line if result.status == OK else f"{line}: {_batch_error(result.detail)}")
+        return "\n".join(lines)
 
-            for tool_call in tool_calls:
-                func_name = tool_call.get("func")
-                params = tool_call.get("params", {})
 
-                if func_name == "shutdown":
-                    response = shutdown_command(params)
-                    write_response(response)
-                    logging.info("AeroVolt HomeFlow plugin exiting after shutdown.")
-                    return
+    def run_macro_scene(macro: "Macro") -> Dict[str, Any]:
+        """
+        Run a macro scene: independent steps side by side (see `_fan_out`),
+        dependent ones as soon as their dependencies succeeded and their delay
+        has passed.
+        """
+        from homeflow.macros import run_macro
 
-                func = commands.get(func_name)
-                if not func:
-                    logging.error("Unknown function requested: %s", func_name)
-                    write_response(
-                        {
-                            "success": False,
-                            "message": f"❌ Unknown function `{func_name}`.",
-                        }
-                    )
+        workers, deadline = _fan_out(len(macro.steps))
+        token = current_deadline.set(deadline)
+        try:
+            run = run_macro(macro, _trigger_macro_step, workers, deadline.remaining())
+        finally:
+            current_deadline.reset(token)
+        logging.info(
+            "Macro '%s' finished in %.2f s (critical path: %s)",
+            macro.name, run.elapsed, " -> ".join(macro.steps[i].name for i in run.critical_path),
+        )
+        return {"success": run.succeeded, "message": _describe_macro_run(run)}
+
+
+    def _fan_out(calls: int) -> Tuple[int, Deadline]:
+        """
+        Worker count and deadline for running `calls` IFTTT triggers side by side
+        inside one tool call: at most BATCH.MAX_CONCURRENCY and HTTP_POOL_SIZE at
+        a time, sharing what is left of the command deadline.
+        """
+        workers = max(1, min(get_batch_settings().max_concurrency, get_http_pool_size(), calls))
+        outer = current_deadline.get()
+        deadline = Deadline(
+            outer.remaining() if outer is not None else get_command_deadline_seconds(),
+            calls=calls,
+            concurrency=workers,
+        )
+        return workers, deadline
+
+
+    # (kind, name, IFTTT event or None when the name did not resolve, payload
+    # values, why it did not resolve). A macro scene has kind "macro" and its
+    # scene name as the event.
+    BatchItem = Tuple[str, str, Optional[str], Dict[str, Any], str]
+
+
+    def _batch_names(params: Dict[str, Any], key: str) -> List[str]:
+        names = params.get(key) or []
+        if isinstance(names, str):
+            # A comma-separated string is accepted as well as a list.
+            names = names.split(",")
+        if not isinstance(names, list):
+            raise ValueError(f"`{key}` must be a list of names")
+        return [name.strip() for name in names if isinstance(name, str) and name.strip()]
+
+
+    def _resolve_batch(params: Dict[str, Any]) -> List[BatchItem]:
+        items: List[BatchItem] = []
+        for kind, key, index in (
+            ("scene", "scenes", get_scene_index()),
+            ("action", "actions", get_mobility_action_index()),
+        ):
+            for name in _batch_names(params, key):
+                matches = index.lookup(name, limit=3)
+                ties = _near_ties(matches) if matches else []
+                if ties:
+                    items.append((kind, name, None, {}, "ambiguous. " + _did_you_mean(ties)))
+                elif matches and not isinstance(matches[0].value, str):  # a macro scene
+                    items.append(("macro", matches[0].name, matches[0].name, {}, ""))
+                elif matches:
+                    items.append((kind, matches[0].name, matches[0].value, {}, ""))
+                else:
+                    items.append((kind, name, None, {}, "not configured"))
+
+        events = params.get("events") or []
+        if not isinstance(events, list):
+            raise ValueError("`events` must be a list")
+        for entry in events:
+            if isinstance(entry, str):
+                entry = {"event_name": entry}
+            event_name = entry.get("event_name") if isinstance(entry, dict) else None
+            if not isinstance(event_name, str) or not event_name.strip():
+                items.append(("event", str(event_name or "?"), None, {}, "missing `event_name`"))
+                continue
+            values = {key: entry.get(key) for key in ("value1", "value2", "value3")}
+            items.append(("event", event_name.strip(), event_name.strip(), values, ""))
+        return items
+
+
+    def _run_batch_item(item: BatchItem, deadline: Deadline) -> Tuple[Dict[str, Any], float]:
+        """
+        Trigger one batch item; returns its result and latency in seconds.
+        Runs in a copy of the command's context, with the batch's own deadline.
+        """
+        kind, name, event_name, values, _ = item
+        current_deadline.set(deadline)
+        started = time.perf_counter()
+        try:
+            if kind == "macro":
+                result = run_macro_scene(get_config().macros[name])
+            elif kind == "action":
+                result, _ = trigger_mobility_action(name, event_name or name)
+            else:
+                result = call_ifttt_event(event_name or name, **values)
+        except Exception as e:
+            logging.exception("Error running batch item %s: %s", name, e)
+            result = {"success": False, "message": f"Error: `{e}`"}
+        return result, time.perf_counter() - started
+
+
+    def _batch_error(result: Dict[str, Any]) -> str:
+        lines = result.get("message", "").splitlines()
+        for line in lines:
+            if line.startswith("Error:"):
+                return line[len("Error:"):].strip()
+        return lines[0] if lines else "failed"
+
+
+    def run_batch_command(
+        params: Optional[Dict[str, Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        system_info: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Trigger many scenes, mobility actions and raw IFTTT events in one call.
+
+        Items run concurrently, at most BATCH.MAX_CONCURRENCY at a time (and never
+        more than HTTP_POOL_SIZE, which caps the open IFTTT connections), and
+        share what is left of the command deadline. Macro scenes count as one
+        item. The answer lists each item's status and latency under a
+        batch-level summary.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        try:
+            items = _resolve_batch(params or {})
+        except ValueError as e:
+            return {"success": False, "message": f"❌ {e}"}
+        if not items:
+            return {
+                "success": False,
+                "message": "❌ Nothing to run: pass `scenes`, `actions` and/or `events`.",
+            }
+        settings = get_batch_settings()
+        if len(items) > settings.max_items:
+            return {
+                "success": False,
+                "message": (
+                    f"❌ Batch of {len(items)} items is larger than "
+                    f"BATCH.MAX_ITEMS ({settings.max_items})."
+                ),
+            }
+        if not get_ifttt_api_key():
+            # Only the items sent to IFTTT need its key; macros check step by step.
+            routes = get_config().backend_routes
+            needs_key = [
+                i for i, (kind, _, event_name, _, _) in enumerate(items)
+                if kind != "macro" and event_name is not None and event_name not in routes
+            ]
+            if len(needs_key) == sum(1 for item in items if item[2] is not None):
+                return _missing_api_key_response()
+            for i in needs_key:
+                kind, name, _, values, _ = items[i]
+                items[i] = (kind, name, None, values, "IFTTT_API_KEY is not configured")
+
+        runnable = [i for i, item in enumerate(items) if item[2] is not None]
+        workers, deadline = _fan_out(len(runnable))
+
+        started = time.perf_counter()
+        results: Dict[int, Tuple[Dict[str, Any], float]] = {}
+        if runnable:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="homeflow-batch") as pool:
+                futures = {
+                    i: pool.submit(contextvars.copy_context().run, _run_batch_item, items[i], deadline)
+                    for i in runnable
+                }
+                results = {i: future.result() for i, future in futures.items()}
+        elapsed = time.perf_counter() - started
+
+        lines = []
+        failed = 0
+        for i, (kind, name, event_name, _, error) in enumerate(items):
+            if i not in results:
+                failed += 1
+                lines.append(f"- ❌ {kind} `{name}`: {error}")
+                continue
+            result, latency = results[i]
+            ok = bool(result.get("success"))
+            failed += not ok
+            line = f"- {'✅' if ok else '❌'} {kind} `{name}` → `{event_name}` · {latency * 1000:.0f} ms"
+            lines.append(line if ok else f"{line}: {_batch_error(result)}")
+
+        sequential = sum(latency for _, latency in results.values())
+        summary = (
+            f"📦 Batch of {len(items)}: {len(items) - failed} succeeded, {failed} failed · "
+            f"{elapsed * 1000:.0f} ms total ({sequential * 1000:.0f} ms one by one), "
+            f"concurrency {workers}"
+        )
+        logging.info(
+            "Batch of %d items finished in %.0f ms (%d failed)", len(items), elapsed * 1000, failed
+        )
+        return {"success": failed == 0, "message": "\n".join([summary] + lines)}
+
+
+    def get_delivery_status_command(
+        params: Optional[Dict[str, Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        system_info: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Report the state of one queued delivery, or summarize the outbox.
+        """
+        if params is None:
+            params = {}
+
+        if get_delivery_mode() != "outbox" and not os.path.exists(get_outbox_path()):
+            return {
+                "success": True,
+                "message": (
+                    "ℹ️ Outbox delivery is not enabled; IFTTT events are sent immediately. "
+                    "Set `\"DELIVERY_MODE\": \"outbox\"` in `config.json` to queue them."
+                ),
+            }
+
+        from homeflow.outbox import DELIVERED, FAILED, PENDING
+
+        outbox = get_outbox().outbox
+        delivery_id = params.get("delivery_id")
+        if isinstance(delivery_id, str) and delivery_id.strip():
+            delivery = outbox.get(delivery_id.strip())
+            if delivery is None:
+                return {
+                    "success": False,
+                    "message": f"❌ No delivery with ID `{delivery_id.strip()}`.",
+                }
+            return {"success": True, "message": _describe_delivery(delivery)}
+
+        counts = outbox.counts()
+        lines = [
+            "📨 AeroVolt HomeFlow outbox: "
+            f"{counts.get(PENDING, 0)} pending · "
+            f"{counts.get(DELIVERED, 0)} delivered · "
+            f"{counts.get(FAILED, 0)} failed"
+        ]
+        lines.extend(_describe_delivery(delivery) for delivery in outbox.recent())
+        return {"success": True, "message": "\n".join(lines)}
+
+
+    def get_coalescing_stats_command(
+        params: Optional[Dict[str, Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        system_info: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        stats = _COALESCER.stats()
+        enabled, window, opt_out = get_coalescing_settings()
+
+        lines = [
+            "♻️ AeroVolt HomeFlow trigger coalescing "
+            f"({'on' if enabled else 'off'}, window {window:g} s):",
+            f"- Triggers received: {stats.calls}",
+            f"- IFTTT requests sent: {stats.sent}",
+            f"- Coalesced: {stats.coalesced} "
+            f"({stats.shared_in_flight} in flight, {stats.shared_in_window} within the window)",
+        ]
+        for (event_name, _), count in _COALESCER.most_coalesced():
+            lines.append(f"  - `{event_name}`: {count} coalesced")
+        if opt_out:
+            lines.append(f"- Opted out: {', '.join(opt_out)}")
+
+        return {"success": True, "message": "\n".join(lines)}
+
+
+    def _text_param(params: Dict[str, Any], key: str) -> Optional[str]:
+        value = params.get(key)
+        return value.strip() if isinstance(value, str) and value.strip() else None
+
+
+    def schedule_action_command(
+        params: Optional[Dict[str, Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        system_info: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Schedule a scene or mobility action locally: once (`at`), repeatedly
+        (`every`, optionally from `start`) or on a `cron` expression. Due jobs
+        run through run_scene / run_mobility_action.
+        """
+        from homeflow.scheduler import ScheduleError, format_time, parse_trigger
+
+        if params is None:
+            params = {}
+
+        scene, action = _text_param(params, "scene"), _text_param(params, "action")
+        if bool(scene) == bool(action):
+            return {
+                "success": False,
+                "message": "❌ Pass either `scene` or `action` to schedule.",
+            }
+        kind, name, index = (
+            ("scene", scene, get_scene_index()) if scene else ("action", action, get_mobility_action_index())
+        )
+        label = "Scene" if scene else "Mobility action"
+        matches = index.lookup(name or "", limit=3)
+        if not matches:
+            return {
+                "success": False,
+                "message": (
+                    f"❌ {label} **{name}** is not configured.\n"
+                    + _describe_alternatives("scenes" if scene else "actions", name or "", index)
+                ),
+            }
+        # A recurring job would fire the wrong one every time, so ask first.
+        ties = _near_ties(matches)
+        if ties:
+            return _ambiguous_response(label, name or "", ties, "scheduled")
+        match = matches[0]
+
+        try:
+            trigger = parse_trigger(
+                time.time(),
+                at=_text_param(params, "at"),
+                every=_text_param(params, "every"),
+                start=_text_param(params, "start"),
+                cron=_text_param(params, "cron"),
+            )
+            job = get_scheduler().add(kind, match.name, trigger)
+        except ScheduleError as e:
+            return {"success": False, "message": f"❌ {e}"}
+
+        logging.info("Scheduled %s '%s' %s as %s", kind, match.name, trigger.describe(), job.job_id)
+        message = (
+            f"⏰ Scheduled {kind} **{match.name}** {trigger.describe()}.\n"
+            f"Schedule ID: `{job.job_id}` · next run {format_time(job.next_run)}"
+        )
+        if not get_config().daemon.enabled:
+            message += "\nℹ️ Schedules run while HomeFlow is running; daemon mode keeps it running."
+        return {"success": True, "message": message}
+
+
+    def list_schedules_command(
+        params: Optional[Dict[str, Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        system_info: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        from homeflow.scheduler import format_time
+
+        if params is None:
+            params = {}
+
+        if _SCHEDULER is None and not os.path.exists(get_schedules_path()):
+            return {"success": True, "message": "ℹ️ Nothing is scheduled yet."}
+
+        limit = params.get("limit", 20)
+        if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+            limit = 20
+        scheduler = get_scheduler()
+        jobs = scheduler.upcoming(limit)
+        if not jobs:
+            return {"success": True, "message": "ℹ️ Nothing is scheduled yet."}
+
+        lines = [f"⏰ AeroVolt HomeFlow schedules ({len(scheduler)}, soonest first):"]
+        for job in jobs:
+            values = f" ({', '.join(job.values)})" if job.values else ""
+            line = (
+                f"- `{job.job_id}` {job.kind} **{job.target}**{values} {job.trigger.describe()} · "
+                f"next {format_time(job.next_run)}"
+            )
+            if job.last_status:
+                line += f" · last run {job.last_status}"
+            lines.append(line)
+        if len(scheduler) > len(jobs):
+            lines.append(f"… and {len(scheduler) - len(jobs)} more")
+        return {"success": True, "message": "\n".join(lines)}
+
+
+    def cancel_schedule_command(
+        params: Optional[Dict[str, Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        system_info: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        if params is None:
+            params = {}
+
+        schedule_id = _text_param(params, "schedule_id")
+        if schedule_id is None:
+            return {"success": False, "message": "❌ Missing required parameter `schedule_id`."}
+        if _SCHEDULER is None and not os.path.exists(get_schedules_path()):
+            job = None
+        else:
+            job = get_scheduler().cancel(schedule_id)
+        if job is None:
+            return {"success": False, "message": f"❌ No schedule with ID `{schedule_id}`."}
+
+        logging.info("Cancelled schedule %s (%s '%s')", schedule_id, job.kind, job.target)
+        return {
+            "success": True,
+            "message": f"🗑️ Cancelled schedule `{schedule_id}`: {job.kind} **{job.target}** {job.trigger.describe()}.",
+        }
+
+
+    # -------------------------
+    # EV Charging Plans
+    # -------------------------
+
+    def _percent(value: Any, label: str) -> float:
+        if isinstance(value, str):
+            value = value.strip().rstrip("%").strip()
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 100:
+            raise ValueError(f"`{label}` must be a percentage between 0 and 100")
+        return float(value)
+
+
+    def _plan_vehicles(
+        params: Dict[str, Any], settings: EvChargingSettings, start: float, slot_seconds: float
+    ) -> List["Vehicle"]:
+        """
+        Vehicles to plan for: the `vehicles` list, or one vehicle described by
+        the top-level parameters. Capacity, rate and efficiency default to the
+        vehicle's EV_CHARGING.VEHICLES entry. Raises ValueError.
+        """
+        from homeflow.charging import Vehicle
+        from homeflow.scheduler import ScheduleError, parse_time
+
+        entries = params.get("vehicles")
+        if entries is None:
+            entries = [params]
+        if not isinstance(entries, list) or not entries or not all(isinstance(e, dict) for e in entries):
+            raise ValueError("`vehicles` must be a non-empty list of objects")
+
+        horizon_slots = int(settings.horizon_hours * 3600 // slot_seconds)
+        only_vehicle = next(iter(settings.vehicles)) if len(settings.vehicles) == 1 else None
+        vehicles = []
+        for entry in entries:
+            name = _text_param(entry, "vehicle") or _text_param(entry, "name") or only_vehicle
+            if name is None:
+                raise ValueError(
+                    f"Name the `vehicle` to plan for ({', '.join(settings.vehicles) or 'none configured'})"
+                )
+            profile = settings.vehicles.get(name, (None, None, 0.9))
+            capacity = entry.get("capacity_kwh", profile[0])
+            max_kw = entry.get("max_kw", profile[1])
+            if not all(isinstance(v, (int, float)) and not isinstance(v, bool) and v > 0 for v in (capacity, max_kw)):
+                raise ValueError(
+                    f"Vehicle **{name}** is not in EV_CHARGING.VEHICLES; pass `capacity_kwh` and `max_kw`"
+                )
+            if "soc" not in entry:
+                raise ValueError(f"Missing the current `soc` of **{name}**")
+
+            deadline_text = _text_param(entry, "deadline") or "07:00"
+            try:
+                deadline = parse_time(deadline_text, start)
+            except ScheduleError as e:
+                raise ValueError(str(e)) from None
+            deadline_slot = int((deadline - start) // slot_seconds)
+            if not 0 < deadline_slot <= horizon_slots:
+                raise ValueError(
+                    f"The deadline {deadline_text!r} for **{name}** must be within the next "
+                    f"{settings.horizon_hours:g} hours"
+                )
+            vehicles.append(Vehicle(
+                name=name,
+                soc=_percent(entry["soc"], "soc"),
+                target_soc=_percent(entry.get("target_soc", 80), "target_soc"),
+                capacity_kwh=float(capacity),
+                max_kw=float(max_kw),
+                deadline_slot=deadline_slot,
+                efficiency=profile[2],
+            ))
+        return vehicles
+
+
+    def _schedule_charge_plan(plan: "ChargePlan", start: float, slot_seconds: float) -> str:
+        """
+        Replace the vehicles' previously scheduled charge sessions with one
+        start trigger per change of rate (value1 = vehicle, value2 = kW,
+        value3 = target SOC) and a stop trigger after each session.
+        """
+        from homeflow.scheduler import OneShot, ScheduleError
+
+        settings = get_ev_charging_settings()
+        actions = get_mobility_actions()
+        for role in (settings.start_action, settings.stop_action):
+            if role not in actions:
+                return f"⚠️ Not scheduled: `{role}` is not in MOBILITY_ACTIONS."
+
+        scheduler = get_scheduler()
+        names = {vehicle.name for vehicle in plan.vehicles}
+        replaced = 0
+        for job in scheduler.upcoming(len(scheduler)):
+            if (
+                job.kind == "action"
+                and job.target in (settings.start_action, settings.stop_action)
+                and isinstance(job.trigger, OneShot)
+                and job.values[:1] and job.values[0] in names
+            ):
+                scheduler.cancel(job.job_id)
+                replaced += 1
+
+        added = 0
+        try:
+            for index, vehicle in enumerate(plan.vehicles):
+                sessions = plan.sessions(index)
+                for position, (first, end, rate) in enumerate(sessions):
+                    values = (vehicle.name, f"{rate:g}", f"{vehicle.target_soc:g}")
+                    scheduler.add("action", settings.start_action, OneShot(start + first * slot_seconds), values)
+                    added += 1
+                    if position + 1 == len(sessions) or sessions[position + 1][0] != end:
+                        scheduler.add(
+                            "action", settings.stop_action, OneShot(start + end * slot_seconds), (vehicle.name,)
+                        )
+                        added += 1
+        except ScheduleError as e:
+            return f"⚠️ Scheduling stopped after {added} triggers: {e}"
+
+        message = (
+            f"⏰ Scheduled {added} triggers of `{settings.start_action}` / `{settings.stop_action}` "
+            "(value1 = vehicle, value2 = kW, value3 = target SOC)."
+        )
+        if replaced:
+            message += f" Replaced {replaced} from an earlier plan."
+        return message
+
+
+    def plan_ev_charging_command(
+        params: Optional[Dict[str, Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        system_info: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Plan the cheapest charging for one or more EVs under the household
+        import limit (EV_CHARGING in config.json), in time-of-use tariff slots.
+        With `apply` the plan is scheduled as start/stop mobility actions.
+        """
+        from homeflow.charging import ChargePlanError, plan_charging, tariff_prices
+
+        if params is None:
+            params = {}
+
+        settings = get_ev_charging_settings()
+        slot_seconds = settings.slot_minutes * 60
+        # Slots are aligned to the clock; the plan starts with the next one.
+        start = (int(time.time()) // slot_seconds + 1) * slot_seconds
+        try:
+            vehicles = _plan_vehicles(params, settings, start, slot_seconds)
+            import_limit = params.get("import_limit_kw", settings.import_limit_kw)
+            if isinstance(import_limit, bool) or not isinstance(import_limit, (int, float)) or import_limit <= 0:
+                raise ValueError("`import_limit_kw` must be a positive number")
+            slots = max(vehicle.deadline_slot for vehicle in vehicles)
+            started = time.perf_counter()
+            plan = plan_charging(
+                tariff_prices(settings.tariff, start, slots, settings.slot_minutes),
+                vehicles,
+                float(import_limit),
+                slot_hours=settings.slot_minutes / 60,
+                base_load_kw=[settings.base_load_kw] * slots,
+            )
+            elapsed = time.perf_counter() - started
+        except (ChargePlanError, ValueError) as e:
+            return {"success": False, "message": f"❌ {e}"}
+        logging.info(
+            "Planned charging for %d vehicles over %d slots in %.1f ms", len(vehicles), slots, elapsed * 1000
+        )
+
+        def clock(slot: int) -> str:
+            return time.strftime("%H:%M", time.localtime(start + slot * slot_seconds))
+
+        lines = [
+            f"🔌 EV charging plan for {len(vehicles)} vehicle(s) · import limit {import_limit:g} kW "
+            f"({settings.base_load_kw:g} kW house load) · {settings.slot_minutes}-minute slots:"
+        ]
+        shown = 10
+        for index, vehicle in enumerate(vehicles[:shown]):
+            sessions = ", ".join(
+                f"{clock(first)}–{clock(end)} at {rate:g} kW" for first, end, rate in plan.sessions(index)
+            )
+            lines.append(
+                f"- **{vehicle.name}**: {vehicle.soc:.0f}% → {plan.final_soc(index):.0f}% "
+                f"by {clock(vehicle.deadline_slot)} · {plan.energy_kwh[index]:.1f} kWh · "
+                f"cost {plan.cost[index]:.2f}\n  {sessions or 'no charging needed'}"
+            )
+        if len(vehicles) > shown:
+            lines.append(f"… and {len(vehicles) - shown} more")
+        short = [(v.name, kwh) for v, kwh in zip(vehicles, plan.shortfall_kwh) if kwh > 0.05]
+        if short:
+            names = ", ".join(f"{name} ({kwh:.1f} kWh)" for name, kwh in short[:5])
+            more = f" and {len(short) - 5} more" if len(short) > 5 else ""
+            lines.append(f"⚠️ Cannot reach the target before the deadline: {names}{more}")
+        lines.append(f"Total cost {plan.total_cost:.2f} · peak charging load {plan.peak_kw:.1f} kW")
+
+        if params.get("apply"):
+            lines.append(_schedule_charge_plan(plan, start, slot_seconds))
+        else:
+            lines.append("ℹ️ Pass `apply: true` to schedule this plan.")
+        return {"success": True, "message": "\n".join(lines)}
+
+
+    # -------------------------
+    # UAV Patrol Routes
+    # -------------------------
+
+    _PATH_CACHE: Optional["PathCache"] = None
+    _PATH_CACHE_LOCK = threading.Lock()
+
+
+    def get_path_cache() -> "PathCache":
+        global _PATH_CACHE
+        with _PATH_CACHE_LOCK:
+            if _PATH_CACHE is None or _PATH_CACHE.directory != get_path_cache_dir():
+                from homeflow.coverage import PathCache
+
+                _PATH_CACHE = PathCache(get_path_cache_dir())
+            return _PATH_CACHE
+
+
+    def plan_patrol_route(
+        settings: UavPatrolSettings, overrides: Optional[Dict[str, Any]] = None
+    ) -> Tuple["CoveragePlan", bool]:
+        """
+        The coverage route for the configured yard, from the path cache when
+        the same inputs were planned before. `overrides` may change the
+        pattern, swath width and sweep angle. Raises CoverageError.
+        """
+        from homeflow.coverage import CoverageError, CoverageRequest
+
+        overrides = overrides or {}
+        if not settings.yard:
+            raise CoverageError("No yard configured; set UAV_PATROL.YARD in config.json")
+        swath = overrides.get("swath_meters", settings.swath_m)
+        angle = overrides.get("angle_degrees", settings.angle_degrees)
+        for label, value in (("swath_meters", swath), ("angle_degrees", angle)):
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise CoverageError(f"`{label}` must be a number")
+        request = CoverageRequest(
+            yard=settings.yard,
+            home=settings.home,
+            swath_m=float(swath),
+            range_m=settings.range_m,
+            keep_out=settings.keep_out,
+            pattern=_text_param(overrides, "pattern") or settings.pattern,
+            angle_degrees=None if angle is None else float(angle),
+        )
+        started = time.perf_counter()
+        plan, cached = get_path_cache().plan(request)
+        logging.info(
+            "Patrol route %s %s in %.2f ms",
+            plan.key, "read from cache" if cached else "planned", (time.perf_counter() - started) * 1000,
+        )
+        return plan, cached
+
+
+    def _describe_route(plan: "CoveragePlan", cached: bool) -> str:
+        sorties = f" in {len(plan.sorties)} sorties" if len(plan.sorties) > 1 else ""
+        angle = f" at {plan.angle_degrees:g}°" if plan.pattern != PERIMETER else ""
+        return (
+            f"🗺️ Route: {plan.pattern}{angle}, {len(plan.waypoints)} waypoints{sorties}, "
+            f"{plan.total_m:.0f} m ({plan.sweep_m:.0f} m sweeping) · "
+            f"{'cached' if cached else 'newly planned'} `{plan.key}`"
+        )
+
+
+    def plan_uav_patrol_command(
+        params: Optional[Dict[str, Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        system_info: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Preview the coverage route uav_patrol_yard would fly (UAV_PATROL in
+        config.json), optionally with another pattern, swath or sweep angle.
+        """
+        from homeflow.coverage import CoverageError
+
+        if params is None:
+            params = {}
+
+        try:
+            plan, cached = plan_patrol_route(get_uav_patrol_settings(), params)
+        except CoverageError as e:
+            return {"success": False, "message": f"❌ {e}"}
+
+        waypoints = plan.encode()
+        if len(waypoints) > 400:
+            waypoints = waypoints[:400].rsplit(" ", 1)[0] + " …"
+        return {
+            "success": True,
+            "message": f"{_describe_route(plan, cached)}\nWaypoints (x,y in metres): {waypoints}",
+        }
+
+
+    def _describe_latency(label: str, histogram: Histogram) -> str:
+        mean, p50, p95 = histogram.mean(), histogram.quantile(0.5), histogram.quantile(0.95)
+        return (
+            f"- {label}: {histogram.count} · mean {mean * 1000:.2f} ms · "
+            f"p50 {p50 * 1000:.2f} ms · p95 {p95 * 1000:.2f} ms"
+        )
+
+
+    def _describe_family(title: str, family: MetricFamily) -> List[str]:
+        lines = []
+        for values, series in family.series():
+            if isinstance(series, Histogram) and series.count:
+                label = " · ".join(f"`{value}`" for value in values) or "all"
+                lines.append(_describe_latency(label, series))
+        return [f"{title}:"] + lines if lines else []
+
+
+    def get_metrics_command(
+        params: Optional[Dict[str, Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        system_info: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        lines = ["📊 AeroVolt HomeFlow metrics since start (count · latency):"]
+        lines += _describe_family("Tool calls (function · outcome)", HANDLER_SECONDS)
+        lines += _describe_family("IFTTT requests (event · outcome)", IFTTT_SECONDS)
+        lines += _describe_family("Waiting for a tool call slot", DISPATCH_SECONDS)
+        lines += _describe_family("JSON parsing", PARSE_SECONDS)
+        lines += _describe_family("Frame reading", FRAME_READ_SECONDS)
+
+        rejected = [
+            f"  - `{event_name}` · {reason}: {counter.value:.0f}"
+            for (event_name, reason), counter in IFTTT_REJECTED.series()
+        ]
+        if rejected:
+            lines.append("IFTTT events not sent:")
+            lines.extend(rejected)
+        if len(lines) == 1:
+            lines.append("No commands recorded yet.")
+
+        return {"success": True, "message": "\n".join(lines)}
+
+
+    # -------------------------
+    # Main Loop
+    # -------------------------
+
+    async def execute_tool_call(
+        tool_call: Dict[str, Any],
+        command: Dict[str, Any],
+        commands: Dict[str, Callable[..., Awaitable[Dict[str, Any]]]],
+    ) -> Dict[str, Any]:
+        """
+        Run a single tool call and return its response (never raises).
+        """
+        func_name = tool_call.get("func")
+        params = tool_call.get("params", {})
+
+        func = commands.get(func_name)
+        started = time.perf_counter()
+        if not func:
+            # Not labelled by name: any string can be requested.
+            HANDLER_SECONDS.labels("unknown", "unknown").observe(0.0)
+            logging.error("Unknown function requested: %s", func_name)
+            response = {
+                "success": False,
+                "message": f"❌ Unknown function `{func_name}`.",
+            }
+        else:
+            try:
+                response = await func(
+                    params=params,
+                    context=command.get("context"),
+                    system_info=command.get("system_info"),
+                )
+            except Exception as e:
+                HANDLER_SECONDS.labels(func_name, "error").observe(time.perf_counter() - started)
+                logging.exception("Error executing function %s: %s", func_name, e)
+                response = {
+                    "success": False,
+                    "message": (
+                        f"❌ Internal error while executing `{func_name}`: `{e}`"
+                    ),
+                }
+            else:
+                outcome = "success" if response.get("success") else "failure"
+                HANDLER_SECONDS.labels(func_name, outcome).observe(time.perf_counter() - started)
+
+        publish_state(
+            "command",
+            func=func_name,
+            params=params,
+            success=bool(response.get("success")),
+            message=response.get("message"),
+            seconds=time.perf_counter() - started,
+        )
+        return response
+
+
+    async def run_tool_calls(
+        tool_calls: List[Dict[str, Any]],
+        command: Dict[str, Any],
+        commands: Dict[str, Callable[..., Awaitable[Dict[str, Any]]]],
+        write: Callable[[Dict[str, Any]], None] = write_response,
+    ) -> None:
+        """
+        Run independent tool calls concurrently, at most
+        MAX_CONCURRENT_TOOL_CALLS at a time, and write their responses either
+        in request order (default) or as each one completes.
+        """
+        import asyncio
+
+        if not tool_calls:
+            return
+
+        semaphore = asyncio.Semaphore(get_max_concurrent_tool_calls())
+
+        async def bounded(tool_call: Dict[str, Any]) -> Dict[str, Any]:
+            queued = time.perf_counter()
+            async with semaphore:
+                func_name = tool_call.get("func")
+                DISPATCH_SECONDS.labels(func_name if func_name in commands else "unknown").observe(
+                    time.perf_counter() - queued
+                )
+                return await execute_tool_call(tool_call, command, commands)
+
+        tasks = [asyncio.ensure_future(bounded(tool_call)) for tool_call in tool_calls]
+
+        if get_tool_call_response_order() == "completion":
+            for next_done in asyncio.as_completed(tasks):
+                write(await next_done)
+        else:
+            # Each response is written as soon as it and all earlier ones are done.
+            for task in tasks:
+                write(await task)
+
+
+    async def run_command(
+        command: Dict[str, Any],
+        commands: Dict[str, Callable[..., Awaitable[Dict[str, Any]]]],
+        write: Callable[[Dict[str, Any]], None] = write_response,
+    ) -> bool:
+        """
+        Execute every tool call of one command and pass a response for each to
+        `write` (stdout by default). Returns True when a shutdown was requested.
+
+        `shutdown` acts as a barrier: every tool call before it finishes and is
+        answered first, and tool calls after it are not run.
+
+        The command's IFTTT calls share one COMMAND_DEADLINE_SECONDS budget,
+        published to them through `current_deadline`, and all of its tool calls
+        see the config snapshot that was current when it arrived.
+        """
+        tool_calls = command.get("tool_calls", [])
+        if not isinstance(tool_calls, list):
+            logging.error("Invalid command: tool_calls is not a list")
+            return False
+
+        config_token = _COMMAND_CONFIG.set(CONFIG)
+        token = current_deadline.set(
+            Deadline(
+                get_command_deadline_seconds(),
+                calls=len(tool_calls),
+                concurrency=get_max_concurrent_tool_calls(),
+            )
+        )
+        try:
+            pending: List[Dict[str, Any]] = []
+            for tool_call in tool_calls:
+                if tool_call.get("func") == "shutdown":
+                    await run_tool_calls(pending, command, commands, write)
+                    response = shutdown_command(tool_call.get("params", {}))
+                    publish_state("command", func="shutdown", success=True, message=response["message"])
+                    write(response)
+                    logging.info("AeroVolt HomeFlow plugin exiting after shutdown.")
+                    flush_logging()
+                    return True
+                pending.append(tool_call)
+
+            await run_tool_calls(pending, command, commands, write)
+            return False
+        finally:
+            current_deadline.reset(token)
+            _COMMAND_CONFIG.reset(config_token)
+
+
+    def build_handlers(
+        commands: Dict[str, Callable[..., Dict[str, Any]]],
+    ) -> Tuple["ThreadPoolExecutor", Dict[str, Callable[..., Awaitable[Dict[str, Any]]]]]:
+        """
+        Coroutine versions of the command handlers, running on a worker pool
+        sized to MAX_CONCURRENT_TOOL_CALLS.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        from homeflow.eventloop import to_async
+
+        executor = ThreadPoolExecutor(
+            max_workers=get_max_concurrent_tool_calls(),
+            thread_name_prefix="homeflow-call",
+        )
+        return executor, {name: to_async(func, executor) for name, func in commands.items()}
+
+
+    async def serve(commands: Dict[str, Callable[..., Dict[str, Any]]]) -> None:
+        """
+        Event-driven main loop: wait for stdin frames through the event loop,
+        run each command's handlers as coroutines and return on shutdown or EOF.
+
+        Frames keep being read while a handler is busy (e.g. waiting on IFTTT);
+        commands are executed one after another in arrival order, while the
+        tool calls inside one command fan out concurrently.
+        """
+        from homeflow.eventloop import FrameStream
+
+        executor, handlers = build_handlers(commands)
+        stream = FrameStream(on_read=FRAME_READ_SECONDS.observe)
+        await stream.start(sys.stdin.fileno())
+
+        try:
+            while True:
+                frame = await stream.read_frame()
+                if frame is None:
+                    logging.info("stdin reached EOF; no more commands will arrive.")
+                    return
+
+                command = parse_command(frame)
+                if command is None:
+                    # No valid command received; continue waiting
                     continue
 
+                if await run_command(command, handlers):
+                    return
+        finally:
+            stream.close()
+            executor.shutdown(wait=False)
+
+
+    # -------------------------
+    # Daemon Mode
+    # -------------------------
+
+    async def serve_daemon(commands: Dict[str, Callable[..., Dict[str, Any]]]) -> None:
+        """
+        Long-lived mode (`plugin.py --daemon`): keep the connection pool, config
+        snapshot, caches and outbox warm, and run the commands forwarded by
+        short-lived plugin processes. Commands from different clients run side
+        by side; a `shutdown` only ends the forwarding client's session.
+
+        The daemon stops gracefully on SIGTERM (POSIX), Ctrl+C / Ctrl+Break when
+        it runs in a console (Windows), or `plugin.py --stop-daemon` anywhere.
+        """
+        import asyncio
+
+        executor, handlers = build_handlers(commands)
+        loop = asyncio.get_running_loop()
+
+        def handle(frame: str, send: Callable[[str], None]) -> bool:
+            command = parse_command(frame)
+            if command is None:
+                return False
+
+            def write(response: Dict[str, Any]) -> None:
+                payload = encode_response(response)
+                logging.info("Sending response to client: %s", log_payload(payload))
                 try:
-                    response = func(
-                        params=params,
-                        context=command.get("context"),
-                        system_info=command.get("system_info"),
-                    )
-                except Exception as e:
-                    logging.exception("Error executing function %s: %s", func_name, e)
-                    response = {
-                        "success": False,
-                        "message": (
-                            f"❌ Internal error while executing `{func_name}`: `{e}`"
-                        ),
-                    }
+                    send(payload)
+                except OSError as e:
+                    logging.warning("Client went away before its response was sent: %s", e)
+
+            return asyncio.run_coroutine_threadsafe(
+                run_command(command, handlers, write), loop
+            ).result()
+
+        stop = asyncio.Event()
+
+        def request_stop(*_: Any) -> None:
+            loop.call_soon_threadsafe(stop.set)
+
+        server = DaemonServer(get_config().daemon.address, load_authkey(), handle, request_stop)
+        try:
+            server.start()
+        except OSError as e:
+            logging.error("HomeFlow daemon not started: %s", e)
+            executor.shutdown(wait=False)
+            return
+        if sys.platform != "win32":
+            # Close the listener (and remove the socket file) on `kill` too.
+            loop.add_signal_handler(signal.SIGTERM, stop.set)
+        else:
+            # The event loop has no signal handlers on Windows; console control
+            # events arrive as SIGINT / SIGBREAK. A detached daemon has no
+            # console, so `--stop-daemon` is its graceful stop.
+            signal.signal(signal.SIGINT, request_stop)
+            signal.signal(signal.SIGBREAK, request_stop)  # type: ignore[attr-defined]
+        try:
+            await stop.wait()
+            logging.info("HomeFlow daemon stopping.")
+        finally:
+            server.close()
+            executor.shutdown(wait=False)
+
+
+    def connect_to_daemon() -> Optional[DaemonClient]:
+        """
+        Connect to the HomeFlow daemon. When none is running and DAEMON.AUTOSTART
+        is set, start one for the next invocations; this one runs in-process.
+        """
+        settings = get_config().daemon
+        client = DaemonClient.connect(
+            settings.address, load_authkey(), settings.response_timeout_seconds
+        )
+        if client is None and settings.autostart:
+            try:
+                spawn_daemon(daemon_command())
+            except OSError as e:
+                logging.error("Could not start the HomeFlow daemon: %s", e)
+        return client
+
+
+    def stop_daemon() -> bool:
+        """
+        `plugin.py --stop-daemon`: ask the running daemon to stop gracefully.
+        Returns False when none is listening or it did not acknowledge.
+        """
+        settings = get_config().daemon
+        client = DaemonClient.connect(
+            settings.address, load_authkey(), settings.response_timeout_seconds
+        )
+        if client is None:
+            logging.info("No HomeFlow daemon is running at %s", settings.address)
+            return False
+        try:
+            stopped = client.request_stop()
+        finally:
+            client.close()
+        logging.info(
+            "HomeFlow daemon at %s %s.", settings.address,
+            "is stopping" if stopped else "did not acknowledge the stop request",
+        )
+        return stopped
+
+
+    class _InProcessRunner:
+        """
+        Runs commands in this process, for a client whose daemon went away.
+        """
+
+        def __init__(self, commands: Dict[str, Callable[..., Dict[str, Any]]]) -> None:
+            import asyncio
+
+            self._loop = asyncio.new_event_loop()
+            self._executor, self._handlers = build_handlers(commands)
+
+        def run(self, command: Dict[str, Any]) -> bool:
+            return self._loop.run_until_complete(run_command(command, self._handlers))
+
+        def close(self) -> None:
+            self._executor.shutdown(wait=False)
+            self._loop.close()
+
+
+    def forward_to_daemon(
+        client: DaemonClient,
+        commands: Dict[str, Callable[..., Dict[str, Any]]],
+    ) -> None:
+        """
+        Thin client loop: relay each stdin frame to the daemon and its responses
+        to stdout. If the daemon disappears, the remaining commands run here.
+        """
+        logging.info("Forwarding commands to the HomeFlow daemon at %s", client.address)
+        reader = get_frame_reader()
+        daemon: Optional[DaemonClient] = client
+        local: Optional[_InProcessRunner] = None
+        try:
+            while True:
+                frame = reader.read_frame()
+                if frame is None:
+                    logging.info("stdin reached EOF; no more commands will arrive.")
+                    return
+
+                if daemon is not None:
+                    try:
+                        if daemon.forward(frame, write_payload):
+                            logging.info("AeroVolt HomeFlow plugin exiting after shutdown.")
+                            return
+                        continue
+                    except DaemonUnavailable as e:
+                        logging.warning("Daemon unavailable (%s); running commands in-process.", e)
+                    except DaemonConnectionLost as e:
+                        # The daemon may already have run it; running it again
+                        # here could fire its IFTTT events twice.
+                        logging.error("Lost the connection to the daemon: %s", e)
+                        write_response({
+                            "success": False,
+                            "message": (
+                                f"❌ Lost the connection to the HomeFlow daemon: `{e}`. "
+                                "The command may or may not have run."
+                            ),
+                        })
+                        daemon.close()
+                        daemon = None
+                        continue
+                    daemon.close()
+                    daemon = None
+
+                command = parse_command(frame)
+                if command is None:
+                    continue
+                if local is None:
+                    local = _InProcessRunner(commands)
+                if local.run(command):
+                    return
+        finally:
+            if daemon is not None:
+                daemon.close()
+            if local is not None:
+                local.close()
+
+
+    def main() -> None:
+        daemon_mode = "--daemon" in sys.argv[1:]
+
+        setup_logging()
+        logging.info(
+            "AeroVolt HomeFlow %s starting up.", "daemon" if daemon_mode else "plugin"
+        )
+        install_config(load_config())
+        if get_config().logging != LoggingSettings():
+            setup_logging(get_config().logging)
+        if "--stop-daemon" in sys.argv[1:]:
+            sys.exit(0 if stop_daemon() else 1)
+
+        commands = {
+            "initialize": initialize_command,
+            "shutdown": shutdown_command,
+            "run_scene": run_scene_command,
+            "trigger_ifttt_event": trigger_ifttt_event_command,
+            "run_batch": run_batch_command,
+            "list_scenes": list_scenes_command,
+            "run_mobility_action": run_mobility_action_command,
+            "list_mobility_actions": list_mobility_actions_command,
+            "get_delivery_status": get_delivery_status_command,
+            "get_coalescing_stats": get_coalescing_stats_command,
+            "get_metrics": get_metrics_command,
+            "schedule_action": schedule_action_command,
+            "list_schedules": list_schedules_command,
+            "cancel_schedule": cancel_schedule_command,
+            "plan_ev_charging": plan_ev_charging_command,
+            "plan_uav_patrol": plan_uav_patrol_command,
+        }
 
-                write_response(response)
+        if not daemon_mode and get_config().daemon.enabled:
+            client = connect_to_daemon()
+            if client is not None:
+                forward_to_daemon(client, commands)
+                return
+
+        import asyncio
+
+        start_config_watcher()
+        start_metrics_exporter()
+        if get_delivery_mode() == "outbox" or os.path.exists(get_outbox_path()):
+            # Resume deliveries left over from a previous run.
+            get_outbox()
+        if os.path.exists(get_schedules_path()):
+            get_scheduler()
+
+        if daemon_mode:
+            asyncio.run(serve_daemon(commands))
+        else:
+            asyncio.run(serve(commands))
 
 
     if __name__ == "__main__":